@@ -1,22 +1,122 @@
 import os
 import sys
-from logger import default_logger as logger
-import ctypes
-import subprocess
-
-ADMIN=True
-
-from custom_module import (
-    add_page_number_graph,
-    add_page_number,
-    re_2page_staple,
-    re_2page_nofold,
-    suit_normal_envelop,
-    suit_unifold_envelop
+import time
+import importlib
+import threading
+import contextlib
+import concurrent.futures
+from collections.abc import Mapping
+from typing import NamedTuple
+from logger import default_logger as logger, setup_logging
+
+import config
+from result_cache import ResultCache, output_candidates
+from tools.cancel import JobCancelled, cancel_scope
+from tools.profiling import ProfileReport, add_stage_time, file_profile
+from tools.progress import emit, make_event, progress_scope
+from tools.worker_pool import get_shared_worker_pool, resolve_pool_size, shared_worker_pool
+
+
+class CommandRegistry(Mapping):
+    """
+    Command name -> processing function, imported on first use.
+
+    Listing or checking names imports nothing; looking a command up imports
+    only the module that defines it (and whatever that module needs).
+    """
+
+    def __init__(self, specs):
+        """:param specs: {name: ("module:function", help text)}"""
+        self._specs = {name: spec for name, (spec, _) in specs.items()}
+        self._help = {name: text for name, (_, text) in specs.items()}
+        self._loaded = {}
+
+    def __getitem__(self, name):
+        function = self._loaded.get(name)
+        if function is None:
+            module_name, attr = self._specs[name].split(":")
+            function = self._loaded[name] = getattr(importlib.import_module(module_name), attr)
+        return function
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __len__(self):
+        return len(self._specs)
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def help_lines(self):
+        """Usage lines, one per function; aliases share a line ("clean/clear - ...")."""
+        groups = {}
+        for name, spec in self._specs.items():
+            groups.setdefault((spec, self._help[name]), []).append(name)
+        return [f"  {'/'.join(names)} - {text}" for (_, text), names in groups.items()]
+
+
+# 命令名 -> 处理函数 (批处理和监视模式共用)
+COMMANDS = CommandRegistry({
+    "add_page_number_graph": ("custom_module:add_page_number_graph", "Add graphical page numbers"),
+    "add_page_number": ("custom_module:add_page_number", "Add simple inverted page numbers"),
+    "re_2page_staple": ("custom_module:re_2page_staple", "Rearrange for 2-page stapling"),
+    "re_2page_nofold": ("custom_module:re_2page_nofold", "Rearrange for 2-page layout (no folding)"),
+    "suit_normal_envelop": ("custom_module:suit_normal_envelop", "Add page numbers + 2-page stapling"),
+    "suit_unifold_envelop": ("custom_module:suit_unifold_envelop",
+                             "Add page numbers + 2-page stapling (for unifold envelope)"),
+    "merge_4_in_1": ("custom_module:merge_4_in_1", "Place 4 pages on each sheet"),
+    "nup": ("custom_module:nup", "Place N pages on each sheet (see --nup/--order/--rotate)"),
+})
+
+# 不处理 input/ 中文件的命令, 在本进程内直接运行
+TOOL_COMMANDS = CommandRegistry({
+    "archive": ("file_manager:move_input_to_cache", "Move input files to cache"),
+    "clean": ("file_manager:clean_output_folder", "Clean output folder"),
+    "clear": ("file_manager:clean_output_folder", "Clean output folder"),
+    "watch": ("watch_daemon:run_daemon", "Keep running and process new files dropped into input/"),
+    "serve": ("job_server:run_server", "Run the HTTP job server (POST /jobs/<command>, GET /status)"),
+})
+
+# 命令行选项的说明 (选项本身在 parse_command_line_args 中解析)
+OPTION_HELP = (
+    ("--workers=<n>", "Folding worker processes (default: adaptive)"),
+    ("--chunk-pages=<n>", "Pages per folding job (default: adaptive)"),
+    ("--jobs=<n|auto>", "Process several files concurrently"),
+    ("--no-cache", "Reprocess every file instead of reusing cached results"),
+    ("--dry-run", "Print the imposition plan of each input file, write nothing"),
+    ("--nup=<2|4|6|8|9|16>", "Pages per sheet for the nup command"),
+    ("--order=<normal|booklet|saddle>", "Page order for the nup command"),
+    ("--rotate=<0|90|180|270|auto>", "Page rotation for the nup command"),
+    ("--port=<n>", "Port for the serve command (default 8765)"),
+    ("--log-level=<debug|info|warning>", "Log level (per-page messages are debug)"),
+    ("--log-json", "Write the log file as JSON lines (logs/print_tool_advanced.jsonl)"),
+    ("--profile[=stages|full]", "Time each stage per file, write a JSON-lines summary to logs/"),
 )
-import custom_module
 
 
+def load_command(name):
+    """The function behind any CLI command, importing only what it needs."""
+    return COMMANDS[name] if name in COMMANDS else TOOL_COMMANDS[name]
+
+
+# 排版命令 -> (no_folding, unipage), 用于 --dry-run
+IMPOSITION_COMMANDS = {
+    "re_2page_staple": (False, False),
+    "re_2page_nofold": (True, False),
+    "suit_normal_envelop": (False, False),
+    "suit_unifold_envelop": (False, True),
+}
+
+# 分段并行的折叠命令: 由持有进程池的线程处理, 各任务交错提交到共享进程池
+# (unipage 只有一个分段, 不在其中)
+CHUNKED_COMMANDS = {"re_2page_staple", "re_2page_nofold", "suit_normal_envelop"}
+
+# 多联排版命令 -> prepare_nup 的参数 (None 使用 config.NUP_*), 用于 --dry-run
+NUP_COMMANDS = {
+    "merge_4_in_1": {"n": 4, "order": "normal", "rotate": 0},
+    "nup": {},
+}
+
 
 def get_folders():
     """Get input and output folder paths."""
@@ -49,45 +149,357 @@ def get_output_filename(pdf_file, process_type):
     return f"{name}_processed{ext}"
 
 
-def process_single_pdf(input_path, output_path, process_type, custom_function=None):
-    """Process a single PDF file."""
+class FileResult(NamedTuple):
+    """Result of processing one PDF file."""
+    file: str
+    ok: bool
+    seconds: float
+    error: str | None = None
+    cached: bool = False
+    # 各阶段耗时和计数 (config.PROFILE 打开时, 见 tools/profiling.py)
+    profile: dict | None = None
+    # 被取消 (见 tools/cancel.py)
+    cancelled: bool = False
+
+
+def process_single_pdf(input_path, output_path, process_type, custom_function=None, cancel=None):
+    """
+    Process a single PDF file and return its FileResult.
+
+    :param cancel: CancelToken; once cancelled the file stops at the next page or
+                   sheet, and its incomplete output is removed
+    """
+    file_name = os.path.basename(input_path)
     if not custom_function:
         logger.error("No custom function provided for processing.")
-        return
+        return FileResult(file_name, False, 0.0, "no custom function")
+    if cancel is not None and cancel.cancelled:
+        return FileResult(file_name, False, 0.0, "cancelled", cancelled=True)
+    from tools.pdf_source import close_pdf_sources  # pylint: disable=C0415
+    start = time.perf_counter()
+    started_at = time.time()
+    error = None
+    cancelled = False
+    with cancel_scope(cancel), progress_scope(file_name), file_profile(file_name) as record:
+        try:
+            custom_function(input_path, output_path)
+        except JobCancelled:
+            logger.warning("Cancelled: %s", file_name)
+            error, cancelled = "cancelled", True
+        except Exception as e:  # pylint: disable=W0718
+            logger.error(f"Error processing file '{file_name}': {e}")
+            error = str(e)
+        finally:
+            # 释放该文件的内存映射 (Windows 上映射中的文件无法归档)
+            close_pdf_sources()
+    if cancelled:
+        remove_partial_outputs(output_path, started_at)
+    profile = record.as_dict() if record is not None else None
+    return FileResult(file_name, error is None, time.perf_counter() - start, error, profile=profile,
+                      cancelled=cancelled)
+
+
+def remove_partial_outputs(output_path, since):
+    """Remove the outputs a cancelled file had started writing."""
+    for path in output_candidates(output_path).values():
+        try:
+            if os.path.getmtime(path) >= since:
+                os.remove(path)
+        except OSError:
+            continue
+
+
+def config_snapshot():
+    """Current config values, so command-line overrides reach spawned workers."""
+    return {name: getattr(config, name) for name in dir(config) if name.isupper()}
+
+
+def _init_batch_worker(config_values):
+    """Pool initializer: apply the parent's config, no nested pools."""
+    for name, value in config_values.items():
+        setattr(config, name, value)
+    # 工作进程内部不再启动进程池
+    config.CHUNK_WORKERS = 1
+
+
+def resolve_batch_jobs(jobs=None):
+    """Resolve the number of concurrent files (config.BATCH_JOBS, 'auto' = cores)."""
+    jobs = config.BATCH_JOBS if jobs is None else jobs
+    if jobs == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(jobs))
+
+
+def batch_worker_pool(jobs=1, warm=True):
+    """
+    The shared, pre-warmed worker pool for one run (batch, watch daemon or job server).
+
+    :param jobs: files in flight at once; the pool has at least this many processes
+    """
+    return shared_worker_pool(
+        resolve_pool_size(jobs),
+        initializer=_init_batch_worker,
+        initargs=(config_snapshot(),),
+        max_tasks_per_child=config.BATCH_MAX_TASKS_PER_CHILD,
+        warm=warm)
+
+
+def chunks_in_parent(custom_function, input_path):
+    """Whether a file should be driven from this process, its chunks going to the pool."""
+    if custom_function.__name__ not in CHUNKED_COMMANDS or config.CHUNK_WORKERS == 1:
+        return False
+    from tools.pdf_source import close_pdf_sources, open_pdf_source  # pylint: disable=C0415
     try:
-        custom_function(input_path, output_path)
-    except Exception as e:
-        logger.error(f"Error processing file '{os.path.basename(input_path)}': {e}")
+        return open_pdf_source(input_path).page_count >= config.MIN_PARALLEL_PAGES
+    except Exception:  # pylint: disable=W0718
+        # 交给工作进程, 在那里报告错误
+        return False
+    finally:
+        close_pdf_sources()
+
+
+def run_pdf_job(input_path, output_path, custom_function, cancel=None):
+    """
+    Process one file using the shared worker pool.
+
+    Large folding jobs run in the calling thread and submit their chunks to
+    the pool, interleaved with other files; everything else runs whole in a
+    pool worker. Without a shared pool the file is processed in-process.
+
+    :param cancel: CancelToken, also seen by the pool worker running the file
+    """
+    pool = get_shared_worker_pool()
+    if pool is None or chunks_in_parent(custom_function, input_path):
+        return process_single_pdf(input_path, output_path, "custom", custom_function, cancel)
+    if cancel is not None and cancel.cancelled:
+        return FileResult(os.path.basename(input_path), False, 0.0, "cancelled", cancelled=True)
+    submitted = time.perf_counter()
+    result = pool.submit(process_single_pdf, input_path, output_path, "custom",
+                         custom_function, cancel).result()
+    if result.profile is not None:
+        # 排队等待工作进程和传回结果的时间
+        add_stage_time(result.profile, "pool_wait",
+                       max(0.0, time.perf_counter() - submitted - result.seconds))
+    return result
+
+
+def process_pdfs_concurrently(tasks, custom_function, jobs, progress=None, cancel=None):
+    """
+    Process several PDF files at once on the shared worker pool.
 
+    Files are scheduled largest first so the pool stays busy until the end.
+    At most ``jobs`` files are in flight (one driver thread each); their
+    work, down to single folding chunks, interleaves in the shared pool.
 
-def process_pdfs_in_folders(custom_function=None):
+    :param tasks: list of (input_path, output_path)
+    :param progress: BatchProgress told about every finished file
+    :param cancel: CancelToken; files not started yet are skipped once cancelled
+    :return: list of FileResult, in completion order
+    """
+    tasks = sorted(tasks, key=lambda task: os.path.getsize(task[0]), reverse=True)
+    results = []
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as drivers:
+        futures = {drivers.submit(run_pdf_job, input_path, output_path, custom_function, cancel): input_path
+                   for input_path, output_path in tasks}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:  # pylint: disable=W0718
+                result = FileResult(os.path.basename(futures[future]), False, 0.0, str(e))
+            results.append(result)
+            report_file_result(result, len(results), len(tasks), progress)
+
+    return results
+
+
+class BatchProgress:
+    """Batch-level progress events (stage "batch"): one per finished file, with its error if it failed."""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        emit(make_event("", "batch", 0, total, self.started))
+
+    def file_done(self, result):
+        with self._lock:
+            self.done += 1
+            event = make_event(result.file, "batch", self.done, self.total, self.started,
+                               error=result.error)
+        emit(event)
+
+
+def report_file_result(result, done, total, progress=None):
+    """Log the outcome of one file (and report it to the batch progress)."""
+    if progress is not None:
+        progress.file_done(result)
+    if result.cached:
+        logger.info("[%d/%d] Cached: %s", done, total, result.file)
+    elif result.cancelled:
+        logger.warning("[%d/%d] Cancelled: %s", done, total, result.file)
+    elif result.ok:
+        logger.info("[%d/%d] Done: %s (%.2fs)", done, total, result.file, result.seconds)
+    else:
+        logger.error("[%d/%d] Failed: %s (%s)", done, total, result.file, result.error)
+
+
+def process_pdfs_in_folders(custom_function=None, jobs=None, in_pool=False, cancel=None):
     """
     Automatically scan PDF files in the input folder, process them using a custom function, and save to output folder.
 
+    An already running shared worker pool (e.g. the GUI's) is reused;
+    otherwise one is started for this batch.
+
     :param custom_function: Custom processing function, defined in custom_module.py
+    :param jobs: Number of files processed concurrently (default config.BATCH_JOBS)
+    :param in_pool: Run every file in the worker pool, even one at a time, so the
+                    calling process stays responsive
+    :param cancel: CancelToken; once cancelled, running files stop at the next
+                   page, sheet or chunk and the remaining files are skipped
+    :return: list of FileResult
     """
     input_folder, output_folder = get_folders()
 
     if not check_folders(input_folder, output_folder):
-        return
+        return []
 
     pdf_files = get_pdf_files(input_folder)
 
     if not pdf_files:
         logger.warning("No PDF files found in input folder.")
-        return
+        return []
 
     logger.info("Found %s PDF files to process.", len(pdf_files))
 
+    tasks = []
     for pdf_file in pdf_files:
         input_path = os.path.join(input_folder, pdf_file)
         output_file = get_output_filename(pdf_file, "custom")
-        output_path = os.path.join(output_folder, output_file)
+        tasks.append((input_path, os.path.join(output_folder, output_file)))
+
+    batch_start = time.time()
+    report = ProfileReport(custom_function.__name__) if config.PROFILE else None
+    progress = BatchProgress(len(tasks))
+    cache = ResultCache() if config.RESULT_CACHE_ENABLED else None
+    cached_results, keys = [], {}
+    if cache is not None:
+        tasks, cached_results, keys = serve_from_cache(tasks, custom_function.__name__, cache, progress)
+
+    jobs = min(resolve_batch_jobs(jobs), len(tasks))
+    running_pool = get_shared_worker_pool()
+    if running_pool is not None:
+        pool_context = contextlib.nullcontext(running_pool)
+    else:
+        # 整个批次共用一个进程池; 逐个处理时只有分段并行的命令用到它, 其他情况不预先启动
+        warm = jobs > 1 or in_pool or (tasks and custom_function.__name__ in CHUNKED_COMMANDS)
+        pool_context = batch_worker_pool(jobs, warm=warm)
+    with pool_context:
+        if jobs > 1 or (in_pool and tasks):
+            if jobs > 1:
+                logger.info("Processing %d files concurrently.", jobs)
+            results = process_pdfs_concurrently(tasks, custom_function, jobs, progress, cancel)
+        else:
+            results = []
+            for input_path, output_path in tasks:
+                logger.info("Processing file: %s", os.path.basename(input_path))
+                result = process_single_pdf(input_path, output_path, "custom", custom_function, cancel)
+                results.append(result)
+                report_file_result(result, len(results), len(tasks), progress)
+
+    if cache is not None:
+        outputs = {os.path.basename(input_path): output_path for input_path, output_path in tasks}
+        for result in results:
+            if result.ok and result.file in keys:
+                cache.put(keys[result.file], outputs[result.file], since=batch_start)
+        cache.save()
+
+    results = cached_results + results
+    failed = [result for result in results if not result.ok]
+    logger.info("All files processed! %d succeeded (%d from cache), %d failed.",
+                len(results) - len(failed), len(cached_results), len(failed))
+    cancelled = sum(result.cancelled for result in results)
+    if cancelled:
+        logger.warning("Run cancelled: %d files not finished; finished folding chunks are "
+                       "checkpointed and reused on the next run.", cancelled)
+    if report is not None:
+        for result in results:
+            report.add_file(result)
+        report.close()
+    return results
+
+
+def serve_from_cache(tasks, command, cache, progress=None):
+    """
+    Restore unchanged jobs from the result cache.
 
-        logger.info("Processing file: %s", pdf_file)
-        process_single_pdf(input_path, output_path, "custom", custom_function)
+    :param progress: BatchProgress told about every cache hit
+    :return: (remaining tasks, FileResults of cache hits, {file name: cache key} of misses)
+    """
+    remaining, results, keys = [], [], {}
+    for input_path, output_path in tasks:
+        file_name = os.path.basename(input_path)
+        start = time.perf_counter()
+        key = cache.make_key(input_path, command)
+        if cache.get(key, output_path):
+            results.append(FileResult(file_name, True, time.perf_counter() - start, cached=True))
+            report_file_result(results[-1], len(results), len(tasks), progress)
+        else:
+            keys[file_name] = key
+            remaining.append((input_path, output_path))
+    return remaining, results, keys
+
+
+def dry_run(command):
+    """Print the imposition plan of every input file without processing it."""
+    if command not in IMPOSITION_COMMANDS and command not in NUP_COMMANDS:
+        logger.warning("%s does not rearrange pages, nothing to plan.", command)
+        return
+    input_folder, _ = get_folders()
+    if not os.path.exists(input_folder):
+        logger.error(f"Input folder '{input_folder}' does not exist.")
+        return
 
-    logger.info("All files processed!")
+    # pylint: disable=C0415
+    from tools.nup import prepare_nup
+    from tools.pdf_source import close_pdf_sources, open_pdf_source
+    for pdf_file in get_pdf_files(input_folder):
+        try:
+            # 只读取页数 (多联排版另外读取页面尺寸), 不生成页面
+            source = open_pdf_source(os.path.join(input_folder, pdf_file))
+            if command in NUP_COMMANDS:
+                plan = prepare_nup(source, **NUP_COMMANDS[command])[3]
+            else:
+                plan = _folding_dry_run_plan(command, source.page_count)
+            plan.validate()
+        except Exception as e:  # pylint: disable=W0718
+            logger.error("Cannot plan '%s': %s", pdf_file, e)
+            continue
+        finally:
+            close_pdf_sources()
+        print(f"{pdf_file}:")
+        print("\n".join(plan.describe(limit=config.DRY_RUN_SHEETS)))
+
+
+def _folding_dry_run_plan(command, page_count):
+    from tools.two_page import folding_plan  # pylint: disable=C0415
+    no_folding, unipage = IMPOSITION_COMMANDS[command]
+    split_page_num = config.NOFOLDING_PAGE_SPLIT if no_folding else config.NORMAL_PAGE_SPLIT
+    total_page = page_count + (-page_count % 4)
+    return folding_plan(total_page, split_page_num, no_folding, unipage, source_pages=page_count)
+
+
+def print_usage(options=True):
+    """Print the commands (from the registries) and, optionally, the options."""
+    print("Available commands:")
+    for registry in (COMMANDS, TOOL_COMMANDS):
+        for line in registry.help_lines():
+            print(line)
+    if options:
+        print("Options:")
+        for option, text in OPTION_HELP:
+            print(f"  {option} - {text}")
 
 
 def parse_command_line_args():
@@ -95,104 +507,71 @@ def parse_command_line_args():
 
     # other commands
     other_commands = sys.argv[1:] if len(sys.argv) > 2 else None
-    print(other_commands)
     if other_commands:
         for cmd in other_commands:
             match cmd:
-                case "noadmin":
-                    logger.debug("Setting ADMIN to False")
-                    custom_module.ADMIN=False
-    
-    def is_admin():
-        try:
-            return ctypes.windll.shell32.IsUserAnAdmin()
-        except Exception as e:  # pylint: disable=W0718
-            logger.error("Error checking admin privileges: %s", e)
-            return False
-
-    if not is_admin() and custom_module.ADMIN:
-        # Restart script with admin privileges
-        ctypes.windll.shell32.ShellExecuteW(
-            None, "runas", sys.executable, 
-            " ".join(sys.argv), None, 1
-        )
-        sys.exit(0)
+                case _ if cmd.startswith("--workers="):
+                    config.CHUNK_WORKERS = int(cmd.split("=", 1)[1])
+                case _ if cmd.startswith("--chunk-pages="):
+                    config.CHUNK_PAGES = int(cmd.split("=", 1)[1])
+                case "--no-cache":
+                    config.RESULT_CACHE_ENABLED = False
+                case "--dry-run":
+                    config.DRY_RUN = True
+                case _ if cmd.startswith("--nup="):
+                    config.NUP_PAGES = int(cmd.split("=", 1)[1])
+                case _ if cmd.startswith("--order="):
+                    config.NUP_ORDER = cmd.split("=", 1)[1]
+                case _ if cmd.startswith("--rotate="):
+                    value = cmd.split("=", 1)[1]
+                    config.NUP_ROTATE = value if value == "auto" else int(value)
+                case _ if cmd.startswith("--port="):
+                    config.SERVER_PORT = int(cmd.split("=", 1)[1])
+                case _ if cmd.startswith("--log-level="):
+                    config.LOG_LEVEL = cmd.split("=", 1)[1].upper()
+                case "--log-json":
+                    config.LOG_FORMAT = "json"
+                case "--profile":
+                    config.PROFILE = "stages"
+                case _ if cmd.startswith("--profile="):
+                    config.PROFILE = cmd.split("=", 1)[1]
+                case _ if cmd.startswith("--jobs="):
+                    value = cmd.split("=", 1)[1]
+                    config.BATCH_JOBS = value if value == "auto" else int(value)
+    # 应用 --log-level / --log-json
+    setup_logging()
 
     if len(sys.argv) <= 1:
         print("Usage: python batch_processor.py <command>")
-        print("Available commands:")
-        print("  add_page_number_graph - Add graphical page numbers")
-        print("  add_page_number - Add simple inverted page numbers")
-        print("  re_2page_staple - Rearrange for 2-page stapling")
-        print("  re_2page_nofold - Rearrange for 2-page layout (no folding)")
-        print("  suit_normal_envelop - Add page numbers + 2-page stapling")
-        print("  suit_unifold_envelop - Add page numbers + 2-page stapling (for unifold envelope)")
-        print("  archive - Move input files to cache")
-        print("  clean/clear - Clean output folder")
+        print_usage()
         sys.exit(1)
 
     custom_function = None  # pylint: disable=W0621
 
     arg = sys.argv[1].lower()
-    if arg == "add_page_number_graph":
-        custom_function = add_page_number_graph
-    elif arg == "add_page_number":
-        custom_function = add_page_number
-    elif arg == "re_2page_staple":
-        custom_function = re_2page_staple
-    elif arg == "re_2page_nofold":
-        custom_function = re_2page_nofold
-    elif arg == "suit_normal_envelop":
-        custom_function = suit_normal_envelop
-    elif arg == "suit_unifold_envelop":
-        custom_function = suit_unifold_envelop
-    elif arg in ["clean", "clear"]:
-        run_file_manager("clean")
-        return None
-    elif arg == "archive":
-        run_file_manager("archive")
+    if arg in COMMANDS:
+        custom_function = COMMANDS[arg]
+    elif arg in TOOL_COMMANDS:
+        # archive / clean / watch / serve 在本进程内运行
+        TOOL_COMMANDS[arg]()
         return None
     else:
         logger.error("Unknown command: %s", sys.argv[1])
-        print("Available commands:")
-        print("  add_page_number_graph - Add graphical page numbers")
-        print("  add_page_number - Add simple inverted page numbers")
-        print("  re_2page_staple - Rearrange for 2-page stapling")
-        print("  re_2page_nofold - Rearrange for 2-page layout (no folding)")
-        print("  suit_normal_envelop - Add page numbers + 2-page stapling")
-        print("  suit_unifold_envelop - Add page numbers + 2-page stapling (for unifold envelope)")
-        print("  archive - Move input files to cache")
-        print("  clean/clear - Clean output folder")
+        print_usage(options=False)
         sys.exit(1)
-                    
-
 
     return custom_function
 
 
-def run_file_manager(action):
-    """Run file_manager.py with the specified action."""
-    python_cmd = "python" if os.name == 'nt' else "python3"
-    result = subprocess.run(
-        [python_cmd, "file_manager.py", action],
-        capture_output=True,
-        text=True,
-        encoding='utf-8',
-        errors='replace',
-        check=True
-    )
-    print(result.stdout)
-    if result.stderr:
-        print(result.stderr)
-
-
 if __name__ == "__main__":
     necessary_folders = ["input", "output", "cache"]
     for folder in necessary_folders:
         if not os.path.exists(folder):
             os.makedirs(folder)
     custom_function = parse_command_line_args()
-    if custom_function is not None:
+    if custom_function is not None and config.DRY_RUN:
+        dry_run(custom_function.__name__)
+    elif custom_function is not None:
         try:
             process_pdfs_in_folders(custom_function)
         except Exception as e:  # pylint: disable=W0718
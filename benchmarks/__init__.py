@@ -0,0 +1,11 @@
+"""
+基准测试 (Benchmarks)
+
+用确定性的合成PDF语料测量各个工具和组合命令的性能:
+
+    python -m benchmarks.corpus                 # 只生成语料
+    python -m benchmarks.run                    # 生成语料并运行全部用例
+    python -m benchmarks.run --compare benchmarks/results/<old>.json
+
+结果 (页/秒, 峰值内存, 输出字节数) 保存为 JSON, 可以在两次运行之间比较。
+"""
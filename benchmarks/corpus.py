@@ -0,0 +1,116 @@
+"""
+合成PDF语料 (Synthetic corpus)
+
+生成确定性的测试PDF: 相同参数总是得到字节完全相同的文件。
+
+页面类型:
+    text   - 多行文字, 类似普通文档
+    image  - 整页灰度"扫描"图像 (伪随机噪声, 几乎无法压缩)
+    mixed  - 文字页和图像页交替, 并混合 A4/A5/Letter 页面尺寸
+"""
+
+import os
+import sys
+import random
+
+from PIL import Image
+from reportlab.lib.pagesizes import A4, A5, LETTER
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+# 默认的语料规模; 10000 页只在 --full 时生成
+DEFAULT_SIZES = (10, 100, 1000)
+FULL_SIZES = (10, 100, 1000, 10000)
+KINDS = ("text", "image", "mixed")
+
+# 扫描图像的像素尺寸和灰度级数, 决定图像页的体积 (约 20KB/页)
+SCAN_SIZE = (240, 340)
+SCAN_LEVELS = bytes(range(192, 256, 16))
+MIXED_PAGE_SIZES = (A4, A5, LETTER)
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing",
+         "elit", "sed", "do", "eiusmod", "tempor", "incididunt", "labore")
+
+
+def corpus_path(kind, pages, corpus_dir=None):
+    """语料文件路径"""
+    return os.path.join(corpus_dir or CORPUS_DIR, f"{kind}_{pages}.pdf")
+
+
+def _draw_text_page(c, rng, width, height, index):
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(50, height - 60, f"Synthetic page {index + 1}")
+    c.setFont("Helvetica", 9)
+    y = height - 90
+    while y > 50:
+        line = " ".join(rng.choice(WORDS) for _ in range(int((width - 100) / 32)))
+        c.drawString(50, y, line)
+        y -= 12
+
+
+def _scan_image(rng):
+    """一张伪随机的灰度扫描图像"""
+    table = bytes(SCAN_LEVELS[i % len(SCAN_LEVELS)] for i in range(256))
+    data = rng.randbytes(SCAN_SIZE[0] * SCAN_SIZE[1]).translate(table)
+    return ImageReader(Image.frombytes("L", SCAN_SIZE, data))
+
+
+def _draw_image_page(c, rng, width, height, index):
+    c.drawImage(_scan_image(rng), 20, 20, width - 40, height - 40)
+    c.setFont("Helvetica", 10)
+    c.drawString(30, 30, f"Scan {index + 1}")
+
+
+def generate_pdf(path, pages, kind="text", seed=0):
+    """
+    生成一个合成PDF
+
+    :param path: 输出路径
+    :param pages: 页数
+    :param kind: text / image / mixed
+    :param seed: 随机种子
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown corpus kind: {kind}")
+    rng = random.Random(f"{kind}-{pages}-{seed}")
+    # invariant 去掉时间戳和随机ID, 保证输出可重复
+    c = canvas.Canvas(path, invariant=1)
+    for i in range(pages):
+        if kind == "mixed":
+            width, height = MIXED_PAGE_SIZES[i % len(MIXED_PAGE_SIZES)]
+            draw = _draw_image_page if i % 2 else _draw_text_page
+        else:
+            width, height = A4
+            draw = _draw_image_page if kind == "image" else _draw_text_page
+        c.setPageSize((width, height))
+        draw(c, rng, width, height, i)
+        c.showPage()
+    c.save()
+    return path
+
+
+def ensure_corpus(sizes=DEFAULT_SIZES, kinds=KINDS, corpus_dir=None):
+    """
+    生成缺少的语料文件
+
+    :return: [(kind, pages, path)]
+    """
+    corpus_dir = corpus_dir or CORPUS_DIR
+    os.makedirs(corpus_dir, exist_ok=True)
+    corpus = []
+    for kind in kinds:
+        for pages in sizes:
+            path = corpus_path(kind, pages, corpus_dir)
+            if not os.path.exists(path):
+                print(f"Generating {os.path.basename(path)} ...", file=sys.stderr)
+                temp_path = path + ".tmp"
+                generate_pdf(temp_path, pages, kind)
+                os.replace(temp_path, path)
+            corpus.append((kind, pages, path))
+    return corpus
+
+
+if __name__ == "__main__":
+    ensure_corpus(FULL_SIZES if "--full" in sys.argv else DEFAULT_SIZES)
@@ -0,0 +1,318 @@
+"""
+基准测试运行器 (Benchmark runner)
+
+每个用例 (工具或组合命令 x 语料文件) 在独立的子进程中运行,
+这样峰值内存 (ru_maxrss) 只反映该用例本身。报告:
+
+    - pages/sec   输入页数 / 最快一次的耗时
+    - peak RSS    子进程 (含其工作进程) 的峰值常驻内存
+    - output      输出文件总字节数
+
+另外测量每个命令的冷启动时间: 新启动的解释器导入 batch_processor、加载命令
+并在 10 页的文本语料上运行一次的总耗时 (archive / clean / watch / serve 只加载,
+不运行)。命令只导入自己需要的模块, 冷启动时间反映了这部分开销。
+
+用法::
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 10,100 --kinds text --cases add_page_numbers_simple
+    python -m benchmarks.run --full --repeat 3
+    python -m benchmarks.run --compare benchmarks/results/20260101-120000.json
+    python -m benchmarks.run --startup-only
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from .corpus import DEFAULT_SIZES, FULL_SIZES, KINDS, ensure_corpus
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _number_simple(input_path, output_dir, pages):
+    from tools.page_number_simple import add_page_numbers_simple
+    add_page_numbers_simple(input_path, os.path.join(output_dir, "out.pdf"))
+
+
+def _number_graph(input_path, output_dir, pages):
+    from tools.page_number_graph import add_page_numbers_graph
+    add_page_numbers_graph(input_path, os.path.join(output_dir, "out.pdf"))
+
+
+def _fold(input_path, output_dir, pages):
+    import config
+    from tools.two_page import process_pdf_for_folding
+    # 与 re_2page_staple 相同: 补齐空白页, 按册子分段 (大文件并行), 输出 out_modified.pdf
+    process_pdf_for_folding(input_path, config.NORMAL_PAGE_SPLIT,
+                            output_path=os.path.join(output_dir, "out.pdf"))
+
+
+def _pipeline_number_fold(input_path, output_dir, pages):
+    import config
+    from tools.pipeline import PdfPipeline, impose_for_folding, number_pages_simple, pad_to_multiple
+    # 与 suit_normal_envelop 相同的内存流水线
+    PdfPipeline([
+        number_pages_simple(),
+        pad_to_multiple(4),
+        impose_for_folding(config.NORMAL_PAGE_SPLIT),
+    ]).run(input_path, os.path.join(output_dir, "out.pdf"))
+
+
+def _add_blank_pages(input_path, output_dir, pages):
+    from tools.two_page import add_blank_pages_to_pdf
+    add_blank_pages_to_pdf(input_path, os.path.join(output_dir, "out.pdf"), 3)
+
+
+def _merge_4_in_1(input_path, output_dir, pages):
+    from tools.four_paper import merge_pdf_pages_4_in_1_refactored
+    merge_pdf_pages_4_in_1_refactored(input_path, os.path.join(output_dir, "out.pdf"))
+
+
+def _command(name):
+    def run_command(input_path, output_dir, pages):
+        import custom_module
+        getattr(custom_module, name)(input_path, os.path.join(output_dir, "out.pdf"))
+    return run_command
+
+
+# 用例名 -> 函数(input_path, output_dir, pages)
+CASES = {
+    "add_page_numbers_simple": _number_simple,
+    "add_page_numbers_graph": _number_graph,
+    "process_pdf_for_folding": _fold,
+    "pipeline:number+fold": _pipeline_number_fold,
+    "add_blank_pages_to_pdf": _add_blank_pages,
+    "merge_pdf_pages_4_in_1": _merge_4_in_1,
+}
+for _name in ("add_page_number_graph", "add_page_number", "re_2page_staple",
+              "re_2page_nofold", "suit_normal_envelop", "suit_unifold_envelop",
+              "merge_4_in_1", "nup"):
+    CASES[f"cmd:{_name}"] = _command(_name)
+
+
+# 冷启动子进程: 和命令行一样导入 batch_processor 并加载命令, 处理命令再运行一次
+STARTUP_SCRIPT = """
+import os, sys, shutil, logging, tempfile
+logging.disable(logging.WARNING)
+import batch_processor
+command, input_path = sys.argv[1], sys.argv[2]
+function = batch_processor.load_command(command)
+if command in batch_processor.COMMANDS:
+    output_dir = tempfile.mkdtemp(prefix="txprints_startup_")
+    try:
+        function(input_path, os.path.join(output_dir, "out.pdf"))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+"""
+STARTUP_COMMANDS = ("add_page_number_graph", "add_page_number", "re_2page_staple",
+                    "re_2page_nofold", "suit_normal_envelop", "suit_unifold_envelop",
+                    "merge_4_in_1", "nup", "archive", "clean", "watch", "serve")
+
+
+def measure_startup(command, input_path, repeat=3):
+    """新解释器中运行一次命令的总耗时 (取最快的一次)"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, command, input_path],
+                              cwd=REPO_DIR, capture_output=True, text=True, check=False)
+        if proc.returncode != 0:
+            return {"command": command, "error": proc.stderr.strip()[-2000:]}
+        runs.append(time.perf_counter() - start)
+    return {"command": command, "seconds": min(runs), "repeat": repeat}
+
+
+def print_startup(results):
+    print(f"\n{'cold start':<32} {'seconds':>9}")
+    for result in results:
+        value = "    ERROR" if "error" in result else f"{result['seconds']:9.3f}"
+        print(f"{result['command']:<32} {value}")
+
+
+def peak_rss_bytes():
+    """当前进程及已结束子进程的峰值常驻内存 (不支持的平台返回 None)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Linux 上 ru_maxrss 的单位是 KB, macOS 上是字节
+    scale = 1 if sys.platform == "darwin" else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+
+
+def run_child(case, input_path, pages):
+    """子进程: 运行一次用例并以 JSON 输出测量结果"""
+    # 日志输出不计入测量
+    logging.disable(logging.WARNING)
+    output_dir = tempfile.mkdtemp(prefix="txprints_bench_")
+    try:
+        # 先导入所有工具, 导入时间不计入
+        import custom_module  # noqa: F401  pylint: disable=W0611,C0415
+        start = time.perf_counter()
+        CASES[case](input_path, output_dir, pages)
+        seconds = time.perf_counter() - start
+        output_bytes = sum(os.path.getsize(os.path.join(output_dir, f)) for f in os.listdir(output_dir))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    print(json.dumps({"seconds": seconds, "peak_rss": peak_rss_bytes(), "output_bytes": output_bytes}))
+
+
+def measure(case, kind, pages, input_path, repeat=1):
+    """在子进程中运行 repeat 次, 取最快的一次"""
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", "--child", case, input_path, str(pages)],
+            cwd=REPO_DIR, capture_output=True, text=True, check=False)
+        if proc.returncode != 0:
+            return {"case": case, "kind": kind, "pages": pages, "error": proc.stderr.strip()[-2000:]}
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda r: r["seconds"])
+    return {
+        "case": case,
+        "kind": kind,
+        "pages": pages,
+        "seconds": best["seconds"],
+        "pages_per_sec": pages / best["seconds"] if best["seconds"] else None,
+        "peak_rss": max((r["peak_rss"] or 0) for r in runs) or None,
+        "output_bytes": best["output_bytes"],
+        "repeat": repeat,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_row(result):
+    if "error" in result:
+        return f"{result['case']:<32} {result['kind']:<6} {result['pages']:>6}  ERROR"
+    rss = f"{result['peak_rss'] / 2**20:8.1f}" if result["peak_rss"] else "     n/a"
+    return (f"{result['case']:<32} {result['kind']:<6} {result['pages']:>6} "
+            f"{result['seconds']:9.3f} {result['pages_per_sec']:10.1f} {rss} "
+            f"{result['output_bytes'] / 2**20:9.2f}")
+
+
+def print_results(results):
+    print(f"{'case':<32} {'kind':<6} {'pages':>6} {'seconds':>9} {'pages/s':>10} "
+          f"{'RSS MB':>8} {'out MB':>9}")
+    for result in results:
+        print(_format_row(result))
+
+
+def compare_results(old_path, results):
+    """与以前保存的结果比较, 打印耗时和内存的变化比例"""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {(r["case"], r["kind"], r["pages"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {old_path} (new / old):")
+    print(f"{'case':<32} {'kind':<6} {'pages':>6} {'time':>7} {'RSS':>7} {'output':>7}")
+    for result in results:
+        before = old.get((result["case"], result["kind"], result["pages"]))
+        if not before or "error" in before or "error" in result:
+            continue
+
+        def ratio(key):
+            if not before.get(key) or result.get(key) is None:
+                return "    n/a"
+            return f"{result[key] / before[key]:7.2f}"
+        print(f"{result['case']:<32} {result['kind']:<6} {result['pages']:>6} "
+              f"{ratio('seconds')} {ratio('peak_rss')} {ratio('output_bytes')}")
+
+
+def compare_startup(old_path, startup):
+    """冷启动时间的变化比例"""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = {r["command"]: r for r in json.load(f).get("startup", [])}
+    if not old:
+        return
+    print(f"\n{'cold start':<32} {'time':>7}")
+    for result in startup:
+        before = old.get(result["command"])
+        if before and "error" not in before and "error" not in result:
+            print(f"{result['command']:<32} {result['seconds'] / before['seconds']:7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TxPrints benchmark suite")
+    parser.add_argument("--sizes", help="comma separated page counts (default: 10,100,1000)")
+    parser.add_argument("--full", action="store_true", help="include the 10000-page corpus")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="text,image,mixed")
+    parser.add_argument("--cases", help="comma separated case names (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, fastest is kept")
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", help="previous result JSON to compare against")
+    parser.add_argument("--list", action="store_true", help="list case names and exit")
+    parser.add_argument("--no-startup", action="store_true", help="skip cold-start measurements")
+    parser.add_argument("--startup-only", action="store_true", help="only measure cold starts")
+    parser.add_argument("--child", nargs=3, metavar=("CASE", "INPUT", "PAGES"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        case, input_path, pages = args.child
+        run_child(case, input_path, int(pages))
+        return
+    if args.list:
+        print("\n".join(CASES))
+        return
+
+    if args.sizes:
+        sizes = tuple(int(s) for s in args.sizes.split(","))
+    else:
+        sizes = FULL_SIZES if args.full else DEFAULT_SIZES
+    kinds = tuple(args.kinds.split(","))
+    cases = args.cases.split(",") if args.cases else list(CASES)
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    results, startup = [], []
+    if not args.startup_only:
+        corpus = ensure_corpus(sizes, kinds)
+        for case in cases:
+            for kind, pages, path in corpus:
+                results.append(measure(case, kind, pages, path, args.repeat))
+                print(_format_row(results[-1]), file=sys.stderr)
+        print_results(results)
+
+    if not args.no_startup:
+        (_, _, startup_input), = ensure_corpus((10,), ("text",))
+        startup = [measure_startup(command, startup_input, max(args.repeat, 3))
+                   for command in STARTUP_COMMANDS]
+        print_startup(startup)
+    output_path = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "revision": _git_revision(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "results": results,
+            "startup": startup,
+        }, f, indent=2)
+    print(f"\nSaved results to {output_path}")
+
+    if args.compare:
+        compare_results(args.compare, results)
+        compare_startup(args.compare, startup)
+
+
+if __name__ == "__main__":
+    main()
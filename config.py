@@ -3,4 +3,124 @@
 # 这里是逻辑分页 就是原来为转化的时候是多少页
 # This is logical pagination, i.e., the original page count before conversion
 NOFOLDING_PAGE_SPLIT = 80
-NORMAL_PAGE_SPLIT = 80
\ No newline at end of file
+NORMAL_PAGE_SPLIT = 80
+
+# 页码添加方式: fast 直接写入内容流 / overlay 合并叠加层
+# Page numbering mode: "fast" appends content streams, "overlay" merges overlay pages
+PAGE_NUMBER_MODE = "fast"
+
+# 纯文字页码的字体: 依次尝试的 TTF 文件名, 都找不到时使用 Helvetica
+# Page-number font: TTF file names tried in order (falls back to Helvetica)
+PAGE_NUMBER_FONT_NAME = "CustomConsolas"
+PAGE_NUMBER_FONT_FILES = ("consola.ttf",)
+# 额外的字体目录, 优先于系统字体目录 (Windows / fontconfig / macOS) 搜索
+# Extra font folders, searched before the system font folders
+FONT_SEARCH_PATH = []
+
+# 排版后端: xobject 把源页面包装为共享的 Form XObject / merge 复制内容流
+# Imposition backend: "xobject" places shared Form XObjects, "merge" copies content streams
+IMPOSITION_BACKEND = "xobject"
+
+# 流式输出: True / False / "auto" (输入超过 STREAMING_MIN_BYTES 时启用)
+# Streaming output writes finished pages incrementally to keep memory flat;
+# "auto" enables it for inputs of at least STREAMING_MIN_BYTES
+STREAMING_OUTPUT = "auto"
+STREAMING_MIN_BYTES = 256 * 1024 * 1024
+
+# 多联排版 (nup 命令): 每张输出页的页数 2/4/6/8/9/16
+# N-up imposition: pages per output sheet (2, 4, 6, 8, 9 or 16)
+NUP_PAGES = 4
+# 页序: normal 顺序 / booklet 按 NORMAL_PAGE_SPLIT 分册骑马钉 / saddle 整本骑马钉
+# Page order: "normal", "booklet" (saddle-stitched per NORMAL_PAGE_SPLIT pages) or "saddle"
+NUP_ORDER = "normal"
+# 页面旋转: 0 / 90 / 180 / 270 / "auto" (选择页面最大的网格方向)
+# Page rotation in degrees, or "auto" to pick the orientation with the largest pages
+NUP_ROTATE = "auto"
+
+# 只打印排版计划, 不处理文件 (--dry-run), 每个文件最多列出 DRY_RUN_SHEETS 张
+# Print imposition plans instead of processing files (--dry-run)
+DRY_RUN = False
+DRY_RUN_SHEETS = 20
+
+# 折叠排版并行参数 (None 表示自动决定)
+# Folding worker pool overrides (None = decide adaptively)
+CHUNK_WORKERS = None
+CHUNK_PAGES = None
+# 少于该页数时不启动进程池
+# Below this page count the folding runs in-process
+MIN_PARALLEL_PAGES = 160
+# 每个工作进程分到的任务数, 用于负载均衡
+# Jobs per worker, for load balancing
+TARGET_JOBS_PER_WORKER = 3
+# 单个任务的最小页数和最大数据量 (字节)
+# Minimum pages and maximum bytes per job
+MIN_CHUNK_PAGES = 40
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+# 同时处理的文件数: 1 为逐个处理, "auto" 为CPU核数
+# Files processed concurrently by batch_processor (1 = sequential, "auto" = cores)
+BATCH_JOBS = 1
+# 每个工作进程处理多少个文件后重启, 限制内存增长
+# Recycle batch workers after this many files to bound memory use
+BATCH_MAX_TASKS_PER_CHILD = 20
+
+# 日志级别 (--log-level), 每页/每张的消息为 DEBUG
+# Log level; per-page and per-sheet messages are logged at DEBUG
+LOG_LEVEL = "INFO"
+# 日志文件格式: text / json (logs/*.jsonl, 每行一个 JSON 对象, --log-json)
+# Log file format: "text" or "json" (one JSON object per line in logs/*.jsonl)
+LOG_FORMAT = "text"
+# 日志目录 (日志文件和分段决策记录, None 为程序目录下的 logs/)
+# Folder for the log file and the chunk-plan records (None = logs/ next to the program)
+LOG_DIR = None
+
+# 同一文件两次进度事件的最小间隔 (秒), 每个阶段的开始和结束总会报告
+# Minimum seconds between progress events of one file (stage start and end always report)
+PROGRESS_INTERVAL = 0.2
+
+# 性能分析 (--profile): None 关闭 / "stages" 记录每个文件各阶段的耗时和计数 /
+# "full" 另外运行 cProfile 和 tracemalloc (会拖慢处理)
+# Profiling: None = off, "stages" = per-file stage timers and counters,
+# "full" = also cProfile and tracemalloc per file (slows processing down)
+PROFILE = None
+# JSON lines 摘要和 .prof 文件的目录 (None 为 logs/), 摘要中列出的 cProfile 函数数
+# Folder for the JSON-lines summary and .prof files (None = logs/), functions listed per file
+PROFILE_DIR = None
+PROFILE_TOP_FUNCTIONS = 15
+
+# 处理结果缓存 (cache/results), 超过大小后按 LRU 淘汰
+# Result cache under cache/results, evicted LRU above the size limit
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# 并行折叠排版的分段检查点 (cache/checkpoints), 中断后重新运行只处理缺少的分段
+# Checkpoint finished folding chunks so an interrupted run resumes where it stopped
+CHECKPOINT_ENABLED = True
+# 检查点目录 (None 为 cache/checkpoints), 超过该天数未更新的检查点被清理
+# Checkpoint folder (None = cache/checkpoints); stale checkpoints are removed after this many days
+CHECKPOINT_DIR = None
+CHECKPOINT_MAX_AGE_DAYS = 7
+
+# 任务服务 (python batch_processor.py serve), 默认只监听本机
+# Job server: HTTP API on SERVER_HOST:SERVER_PORT (localhost only by default)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+# 进程池大小: 整数或 "auto" (CPU核数)
+# Worker processes for the job server ("auto" = cores)
+SERVER_WORKERS = "auto"
+# 排队和处理中的任务上限, 超过后返回 503
+# Queued plus running jobs before new uploads are rejected with 503
+SERVER_MAX_QUEUE = 16
+# 单个上传文件的大小上限 (字节)
+# Largest accepted upload in bytes
+SERVER_MAX_UPLOAD_BYTES = 1024 * 1024 * 1024
+
+# 监视模式 (python batch_processor.py watch)
+# Watch mode: files in input/<command>/ use that command; WATCH_RULES maps
+# fnmatch patterns to commands; other files use WATCH_DEFAULT_COMMAND (None = ignore)
+WATCH_RULES = []
+WATCH_DEFAULT_COMMAND = None
+# 无法使用 inotify 时的轮询间隔 (秒)
+# Polling interval in seconds when inotify is unavailable
+WATCH_POLL_INTERVAL = 2.0
+WATCH_FORCE_POLLING = False
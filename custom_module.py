@@ -1,22 +1,15 @@
 import logging
-import os
-
-from mem_disk import MemDisk
 
 from tools import (
     add_graphical_page_numbers,
     add_simple_page_numbers,
     rearrange_for_stapling,
-    merge_4_in_1
+    number_and_rearrange_for_stapling,
+    impose_nup
 )
 
-# 配置日志记录器
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-ADMIN = True
-
-
 def add_page_number_graph(input_pdf_path: str, output_pdf_path: str):
     """Add graphical page numbers (circles with adaptive sizing)"""
     logger.info("Adding graphical page numbers to: %s", input_pdf_path)
@@ -48,49 +41,23 @@ def re_2page_nofold(input_pdf_path: str, output_pdf_path: str):
 def suit_normal_envelop(input_pdf_path: str, output_pdf_path: str):
     """Add page numbers + rearrange for 2-page stapling (suitable for normal envelopes)"""
     logger.info("Processing for normal envelope: %s", input_pdf_path)
-    if not ADMIN:
-        temp_path = output_pdf_path.replace('.pdf', '_temp.pdf')
-        add_simple_page_numbers(input_pdf_path, temp_path)
-        # Then rearrange for stapling
-        rearrange_for_stapling(temp_path, output_pdf_path, no_folding=False)
-    else:
-        # 使用内存盘做缓冲
-        mem_disk = MemDisk(size="512MB", driver_letter="Z")
-        try:
-            mem_disk.mount_mem_disk()
-            temp_path = output_pdf_path.replace('.pdf', '_temp.pdf')
-            temp_path_file_name = os.path.basename(temp_path)
-            temp_path = mem_disk.get_file_path(temp_path_file_name)
-            add_simple_page_numbers(input_pdf_path, temp_path)
-            # Then rearrange for stapling
-            rearrange_for_stapling(temp_path, output_pdf_path, no_folding=False)
-        finally:
-            mem_disk.unmount_mem_disk()
-    # Clean up temp file
-    if os.path.exists(temp_path):
-        os.remove(temp_path)
+    # 全程在内存中完成, 不再需要 _temp.pdf 缓冲
+    number_and_rearrange_for_stapling(input_pdf_path, output_pdf_path, no_folding=False)
+
 
 def suit_unifold_envelop(input_pdf_path: str, output_pdf_path: str):
     """Add page numbers + rearrange for 2-page stapling (suitable for normal envelopes)"""
     logger.info("Processing for unfold envelope: %s", input_pdf_path)
-    if not ADMIN:
-        temp_path = output_pdf_path.replace('.pdf', '_temp.pdf')
-        add_simple_page_numbers(input_pdf_path, temp_path)
-        # Then rearrange for stapling
-        rearrange_for_stapling(temp_path, output_pdf_path, no_folding=False, unipage=True)
-    else:
-        # 使用内存盘做缓冲
-        mem_disk = MemDisk(size="512MB", driver_letter="Z")
-        try:
-            mem_disk.mount_mem_disk()
-            temp_path = output_pdf_path.replace('.pdf', '_temp.pdf')
-            temp_path_file_name = os.path.basename(temp_path)
-            temp_path = mem_disk.get_file_path(temp_path_file_name)
-            add_simple_page_numbers(input_pdf_path, temp_path)
-            # Then rearrange for stapling
-            rearrange_for_stapling(temp_path, output_pdf_path, no_folding=False, unipage=True)
-        finally:
-            mem_disk.unmount_mem_disk()
-    # Clean up temp file
-    if os.path.exists(temp_path):
-        os.remove(temp_path)
\ No newline at end of file
+    number_and_rearrange_for_stapling(input_pdf_path, output_pdf_path, no_folding=False, unipage=True)
+
+
+def merge_4_in_1(input_pdf_path: str, output_pdf_path: str):
+    """Place every 4 pages on one sheet (2x2, reading order)"""
+    logger.info("Merging 4 pages per sheet: %s", input_pdf_path)
+    impose_nup(input_pdf_path, output_pdf_path, n=4, order="normal", rotate=0)
+
+
+def nup(input_pdf_path: str, output_pdf_path: str):
+    """Place N pages on each sheet (config.NUP_PAGES / NUP_ORDER / NUP_ROTATE)"""
+    logger.info("N-up imposition: %s", input_pdf_path)
+    impose_nup(input_pdf_path, output_pdf_path)
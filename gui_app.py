@@ -1,50 +1,98 @@
-from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QPushButton, QTextEdit, QLabel, QMessageBox
-from PyQt6.QtCore import QThread, pyqtSignal
-import subprocess
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QPushButton, QTextEdit, QLabel, QProgressBar
+from PyQt6.QtCore import QThread, QTimer, pyqtSignal
 import os
 import sys
-import ctypes
-from logger import default_logger as logger
+import logging
+import threading
+import contextlib
+from collections import deque
 
+from logger import add_log_handler, date_format, log_format, remove_log_handler
+from tools.cancel import CancelToken
+from tools.progress import set_progress_sink
 
-ADMIN = True
 
-def is_admin():
-    try:
-        return ctypes.windll.shell32.IsUserAnAdmin()
-    except:
-        return False
+# 界面刷新间隔 (毫秒): 日志和进度先缓冲, 定时一次性显示, 大文件不会卡住界面
+REFRESH_INTERVAL_MS = 200
+# 输出框最多保留的行数
+MAX_OUTPUT_LINES = 5000
+
+class BufferedLogHandler(logging.Handler):
+    """在日志监听线程中只把消息放入缓冲, 由界面定时取出"""
+
+    def __init__(self, level=logging.INFO):
+        super().__init__(level)
+        self.setFormatter(logging.Formatter(log_format, datefmt=date_format))
+        self.lines = deque(maxlen=MAX_OUTPUT_LINES)
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+    def drain(self):
+        lines = []
+        while True:
+            try:
+                lines.append(self.lines.popleft())
+            except IndexError:
+                return lines
+
+
+class ProgressState:
+    """进度订阅者: 保存批次进度和每个处理中文件的最新事件 (在处理线程中调用)"""
+
+    def __init__(self):
+        self.batch = None
+        self.files = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            if event.stage == "batch":
+                self.batch = event
+                self.files.pop(event.file, None)
+            else:
+                self.files[event.file] = event
+
+    def reset(self):
+        with self._lock:
+            self.batch = None
+            self.files = {}
+
+    def snapshot(self):
+        """(整体完成比例, 说明文字)"""
+        with self._lock:
+            batch, files = self.batch, list(self.files.values())
+        if batch is None or not batch.total:
+            return 0.0, ""
+        # 已完成的文件加上处理中文件的当前阶段进度
+        fraction = (batch.done + sum(event.fraction for event in files)) / batch.total
+        parts = [f"Files {batch.done}/{batch.total}"]
+        for event in files:
+            eta = f", ETA {event.eta:.0f}s" if event.eta is not None else ""
+            parts.append(f"{event.file}: {event.stage} {event.done}/{event.total}{eta}")
+        return min(1.0, fraction), " | ".join(parts)
 
 
 class Worker(QThread):
+    """在本进程中运行命令, 文件交给常驻的预热进程池处理"""
     output_signal = pyqtSignal(str)
     finished = pyqtSignal()
 
-    def __init__(self, command_args):
+    def __init__(self, command):
         super().__init__()
-        self.command_args = command_args
+        self.command = command
+        # 取消按钮: 处理中的文件在下一页/下一张停止, 完成的分段保存在检查点中
+        self.cancel_token = CancelToken()
 
     def run(self):
+        # pylint: disable=C0415
+        from batch_processor import COMMANDS, TOOL_COMMANDS, process_pdfs_in_folders
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            process = subprocess.Popen(
-                ["python", "batch_processor.py"] + self.command_args,
-                cwd=script_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                bufsize=1
-            )
-            
-            while True:
-                line = process.stdout.readline()
-                if not line:
-                    break
-                self.output_signal.emit(line.rstrip())
-            
-            process.wait()
+            if self.command in TOOL_COMMANDS:
+                TOOL_COMMANDS[self.command]()
+            else:
+                process_pdfs_in_folders(COMMANDS[self.command], in_pool=True,
+                                        cancel=self.cancel_token)
         except Exception as e:
             self.output_signal.emit(f"Error: {str(e)}")
         finally:
@@ -54,11 +102,19 @@ class Worker(QThread):
 class BatchProcessorGUI(QWidget):
     def __init__(self):
         super().__init__()
-        self.initUI()
         self.worker = None
+        self.log_handler = BufferedLogHandler()
+        self.progress_state = ProgressState()
+        self.resources = contextlib.ExitStack()
+        self.initUI()
+        self.start_backend()
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(REFRESH_INTERVAL_MS)
 
     def initUI(self):
-        self.setWindowTitle("Batch Processor GUI" + (" (Admin)" if ADMIN else " (No Admin)"))
+        self.setWindowTitle("Batch Processor GUI")
         self.setGeometry(100, 100, 600, 400)
 
         layout = QVBoxLayout()
@@ -84,16 +140,45 @@ class BatchProcessorGUI(QWidget):
         self.run_button.clicked.connect(self.run_command)
         hbox.addWidget(self.run_button)
 
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_command)
+        hbox.addWidget(self.cancel_button)
+
         layout.addLayout(hbox)
 
+        # Progress
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setTextVisible(False)
+        layout.addWidget(self.progress_bar)
+        self.progress_label = QLabel("")
+        layout.addWidget(self.progress_label)
+
         # Output
         layout.addWidget(QLabel("Output:"))
         self.output_text = QTextEdit()
         self.output_text.setReadOnly(True)
+        self.output_text.document().setMaximumBlockCount(MAX_OUTPUT_LINES)
         layout.addWidget(self.output_text)
 
         self.setLayout(layout)
 
+    def start_backend(self):
+        """启动常驻的进程池 (后台预热), 接入日志和进度"""
+        # pylint: disable=C0415
+        from batch_processor import batch_worker_pool, resolve_batch_jobs
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        for folder in ("input", "output", "cache"):
+            os.makedirs(os.path.join(script_dir, folder), exist_ok=True)
+        pool = self.resources.enter_context(batch_worker_pool(resolve_batch_jobs(), warm=False))
+        threading.Thread(target=pool.warm_up, name="pool-warm-up", daemon=True).start()
+
+        add_log_handler(self.log_handler)
+        self.resources.callback(remove_log_handler, self.log_handler)
+        set_progress_sink(self.progress_state)
+        self.resources.callback(set_progress_sink, None)
+
     def run_command(self):
         selected_command = self.command_combo.currentText()
         if not selected_command:
@@ -101,43 +186,55 @@ class BatchProcessorGUI(QWidget):
             return
 
         command_arg = self.commands[selected_command]
-        if not ADMIN:
-            command_args = [command_arg, "noadmin"]
-        else:
-            command_args = [command_arg]
         self.output_text.clear()
-        self.output_text.append(f"Running: python batch_processor.py {command_arg}")
+        self.output_text.append(f"Running: {command_arg}")
         self.run_button.setEnabled(False)
+        self.cancel_button.setEnabled(command_arg not in ("archive", "clean"))
+        self.progress_state.reset()
+        self.progress_bar.setValue(0)
 
-        self.worker = Worker(command_args)
+        self.worker = Worker(command_arg)
         self.worker.output_signal.connect(self.update_output)
         self.worker.finished.connect(self.worker_finished)
         self.worker.start()
 
+    def cancel_command(self):
+        if self.worker is not None:
+            self.worker.cancel_token.cancel()
+            self.cancel_button.setEnabled(False)
+            self.output_text.append("Cancelling...")
+
+    def refresh(self):
+        """定时把缓冲的日志一次性追加到输出框, 并更新进度条"""
+        lines = self.log_handler.drain()
+        if lines:
+            self.output_text.append("\n".join(lines))
+        fraction, text = self.progress_state.snapshot()
+        self.progress_bar.setValue(int(fraction * 1000))
+        self.progress_label.setText(text)
+
     def update_output(self, output):
-        logger.info(output)
         self.output_text.append(output)
-    
+
     def worker_finished(self):
+        self.refresh()
+        if self.progress_state.batch is not None:
+            self.progress_bar.setValue(1000)
         self.run_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
+    def closeEvent(self, event):
+        if self.worker is not None:
+            # 关闭窗口时停止处理, 下次运行从检查点继续
+            self.worker.cancel_token.cancel()
+            self.worker.wait()
+        self.refresh_timer.stop()
+        self.resources.close()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    if not is_admin():
-        msg = QMessageBox()
-        msg.setIcon(QMessageBox.Icon.Warning)
-        msg.setText("使用管理员可以使用MemDisk。")
-        msg.setInformativeText("是否以管理员身份重启？")
-        msg.setWindowTitle("需要管理员权限")
-        msg.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-        if msg.exec() == QMessageBox.StandardButton.Yes:
-            script_path = os.path.abspath(__file__)
-            subprocess.run(['powershell', 'Start-Process', 'python', f'"{script_path}"', '-Verb', 'RunAs'], check=True)
-            sys.exit(0)
-        else:
-            ADMIN = False
-            
     window = BatchProcessorGUI()
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
@@ -0,0 +1,313 @@
+"""
+排版任务服务 (Job server)
+
+常驻运行的本地 HTTP 服务: 上传一个 PDF 和命令名, 返回处理结果。
+解释器、模块和进程池只启动一次, 不必为每批文件运行一次 batch_processor.py。
+
+接口::
+
+    POST /jobs/<command>   请求体为 PDF (需要 Content-Length), 返回处理后的 PDF
+    GET  /status           队列和进程池状态 (JSON)
+
+CPU 密集的处理在预热的共享进程池中运行 (config.SERVER_WORKERS 个进程,
+见 tools/worker_pool.py), 大文件的折叠任务与其他任务交错执行。
+背压:
+
+- 排队和处理中的任务超过 config.SERVER_MAX_QUEUE 时直接返回 503 (带 Retry-After),
+  请求体不会被读取
+- 上传按块读取并写入临时文件, 读取速度受磁盘和 TCP 窗口限制, 不会整体读入内存
+- 结果按块发送, 每块等待客户端接收 (drain) 后再读下一块
+
+只使用标准库, 可以直接对 localhost 测试::
+
+    python batch_processor.py serve
+    curl --data-binary @in.pdf -H "Content-Type: application/pdf" \\
+         http://127.0.0.1:8765/jobs/re_2page_staple -o out.pdf
+    curl http://127.0.0.1:8765/status
+"""
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import concurrent.futures
+from urllib.parse import urlsplit
+
+import config
+from logger import default_logger as logger
+from result_cache import output_candidates
+from batch_processor import COMMANDS, batch_worker_pool, run_pdf_job
+
+# 读写请求体和结果的块大小
+CHUNK_SIZE = 256 * 1024
+# 请求行和请求头的最大长度
+MAX_HEADER_BYTES = 64 * 1024
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    """以 JSON 错误响应结束请求"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def resolve_server_workers(workers=None):
+    """进程池大小 (config.SERVER_WORKERS, 'auto' = CPU核数)"""
+    workers = config.SERVER_WORKERS if workers is None else workers
+    if workers == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+async def read_request_head(reader):
+    """
+    读取请求行和请求头
+
+    :return: (method, path, headers), 连接在请求前关闭时返回 None
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise HttpError(400, "incomplete request head") from e
+    except asyncio.LimitOverrunError as e:
+        raise HttpError(400, "request head too large") from e
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError as e:
+        raise HttpError(400, "malformed request line") from e
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return method.upper(), urlsplit(target).path, headers
+
+
+async def write_response(writer, status, body=b"", content_type="application/json", headers=None):
+    """写出一个完整的小响应 (状态、错误)"""
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}",
+             "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+async def write_json(writer, status, data, headers=None):
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    await write_response(writer, status, body, "application/json; charset=utf-8", headers)
+
+
+async def receive_body(reader, length, path):
+    """把 length 字节的请求体按块写入 path"""
+    remaining = length
+    with open(path, "wb") as f:
+        while remaining:
+            chunk = await reader.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise HttpError(400, f"request body ended {remaining} bytes early")
+            f.write(chunk)
+            remaining -= len(chunk)
+
+
+async def send_file(writer, path, filename):
+    """按块发送结果文件, 每块等待客户端接收"""
+    size = os.path.getsize(path)
+    head = ["HTTP/1.1 200 OK",
+            "Content-Type: application/pdf",
+            f"Content-Length: {size}",
+            f'Content-Disposition: attachment; filename="{filename}"',
+            "Connection: close"]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            writer.write(chunk)
+            await writer.drain()
+
+
+class JobServer:
+    """asyncio HTTP 服务, 任务在有界进程池中处理"""
+
+    def __init__(self, host=None, port=None, workers=None, max_queue=None):
+        self.host = host or config.SERVER_HOST
+        self.port = config.SERVER_PORT if port is None else port
+        self.workers = resolve_server_workers(workers)
+        self.max_queue = config.SERVER_MAX_QUEUE if max_queue is None else max_queue
+        self.executor = None
+        self.server = None
+        # 同时交给进程池的任务数, 其余任务在事件循环中等待
+        self.slots = None
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.started = time.time()
+
+    @property
+    def in_flight(self):
+        return self.queued + self.running
+
+    def status(self):
+        """GET /status 的内容"""
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "uptime": round(time.time() - self.started, 1),
+            "commands": sorted(COMMANDS),
+        }
+
+    async def handle(self, reader, writer):
+        """处理一个连接 (一个请求)"""
+        try:
+            request = await read_request_head(reader)
+            if request is not None:
+                await self.dispatch(reader, writer, *request)
+        except HttpError as e:
+            await write_json(writer, e.status, {"error": str(e)}, e.headers)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            logger.debug("Client disconnected")
+        except Exception as e:  # pylint: disable=W0718
+            logger.error("Request failed: %s", e, exc_info=True)
+            try:
+                await write_json(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, reader, writer, method, path, headers):
+        if path == "/status":
+            if method != "GET":
+                raise HttpError(405, "use GET", {"Allow": "GET"})
+            await write_json(writer, 200, self.status())
+            return
+
+        parts = path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "jobs":
+            raise HttpError(404, f"no such endpoint: {path}")
+        if method != "POST":
+            raise HttpError(405, "use POST", {"Allow": "POST"})
+        command = parts[1]
+        if command not in COMMANDS:
+            raise HttpError(404, f"unknown command: {command}")
+        await self.run_job(reader, writer, command, headers)
+
+    async def run_job(self, reader, writer, command, headers):
+        """接收上传、排队、在进程池中处理, 然后把结果发回"""
+        if "content-length" not in headers:
+            raise HttpError(411, "Content-Length is required")
+        try:
+            length = int(headers["content-length"])
+        except ValueError as e:
+            raise HttpError(400, "invalid Content-Length") from e
+        if length <= 0:
+            raise HttpError(400, "empty request body")
+        if length > config.SERVER_MAX_UPLOAD_BYTES:
+            raise HttpError(413, f"upload exceeds {config.SERVER_MAX_UPLOAD_BYTES} bytes")
+        # 队列已满: 不读取请求体, 立即拒绝
+        if self.in_flight >= self.max_queue:
+            self.rejected += 1
+            raise HttpError(503, "job queue is full", {"Retry-After": "5"})
+
+        self.queued += 1
+        waiting = True
+        job_dir = tempfile.mkdtemp(prefix="txprints-job-")
+        try:
+            input_path = os.path.join(job_dir, "input.pdf")
+            output_path = os.path.join(job_dir, "output.pdf")
+            await receive_body(reader, length, input_path)
+
+            async with self.slots:
+                self.queued -= 1
+                waiting = False
+                self.running += 1
+                try:
+                    logger.info("Job %s started (%d bytes)", command, length)
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        self.executor, run_pdf_job, input_path, output_path, COMMANDS[command])
+                finally:
+                    self.running -= 1
+
+            if not result.ok:
+                self.failed += 1
+                raise HttpError(500, result.error or "processing failed")
+            produced = [p for p in output_candidates(output_path).values() if os.path.exists(p)]
+            if not produced:
+                self.failed += 1
+                raise HttpError(500, f"{command} produced no output")
+            self.completed += 1
+            logger.info("Job %s finished in %.2fs", command, result.seconds)
+            await send_file(writer, produced[-1], f"{command}.pdf")
+        finally:
+            if waiting:
+                self.queued -= 1
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    async def serve(self, ready=None):
+        """
+        运行服务直到被取消
+
+        :param ready: 可选的 asyncio.Event, 开始监听后设置 (测试时使用)
+        """
+        self.slots = asyncio.Semaphore(self.workers)
+        self.server = await asyncio.start_server(
+            self.handle, self.host, self.port, limit=MAX_HEADER_BYTES)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info("Job server listening on http://%s:%d (%d workers, queue %d)",
+                    self.host, self.port, self.workers, self.max_queue)
+        if ready is not None:
+            ready.set()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def run(self):
+        """启动进程池, 运行服务直到 Ctrl+C"""
+        try:
+            # 每个处理中的任务占用一个线程, 实际工作在共享进程池中完成
+            with batch_worker_pool(self.workers), \
+                    concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+                self.executor = executor
+                asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            logger.info("Stopping job server.")
+        finally:
+            self.executor = None
+
+
+def run_server():
+    """命令行入口"""
+    JobServer().run()
+
+
+if __name__ == "__main__":
+    run_server()
@@ -1,50 +1,231 @@
-import logging
+"""
+日志 (Logging)
+
+所有日志记录器都把记录交给根记录器上的 QueueHandler, 只是放入队列,
+由后台线程 (QueueListener) 负责格式化和写入文件/控制台,
+处理PDF的线程不会因为格式化和刷新日志而变慢。
+
+- 文件 logs/print_tool_advanced.log; config.LOG_FORMAT = "json" 时改为
+  logs/print_tool_advanced.jsonl, 每行一个 JSON 对象 (包括 extra 字段);
+  目录可由 config.LOG_DIR 指定, 第一次写入时才创建文件
+- 工作进程用 attach_worker_logging 把记录发回主进程的同一个监听线程
+- 每页/每张的消息只用 DEBUG, 默认级别 (config.LOG_LEVEL) 下直接丢弃
+- add_log_handler 可以再接入一个处理器 (如 GUI 的输出框), 同样在监听线程中调用
+"""
+
 import os
-from datetime import datetime
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
 
-# 创建logs目录（如果不存在）
-logs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
-if not os.path.exists(logs_dir):
-    os.makedirs(logs_dir)
+import config
 
 # 配置日志格式
 log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 date_format = '%Y-%m-%d %H:%M:%S'
 
+# 日志文件名 (不含扩展名)
+LOG_NAME = "print_tool_advanced"
+
+# LogRecord 自带的属性, 其余属性是 extra 字段
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录一行 JSON, extra 字段原样保留"""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record, date_format),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """同一进程内的队列: 不在调用线程中格式化, 由监听线程完成"""
+
+    def prepare(self, record):
+        return record
+
+
+# 主进程的监听线程和它的处理器
+_listener = None
+_handlers = {}
+# add_log_handler 添加的处理器 (如 GUI 的输出框)
+_extra_handlers = []
+# 工作进程使用的跨进程队列 (第一次启动进程池时创建)
+_worker_queue = None
+_worker_listener = None
+_setup_lock = threading.Lock()
+
+
+def _level(level=None):
+    level = config.LOG_LEVEL if level is None else level
+    return logging.getLevelName(level.upper()) if isinstance(level, str) else level
+
+
+def log_dir():
+    """日志目录: config.LOG_DIR, 默认为程序目录下的 logs/ (不存在时创建)"""
+    path = config.LOG_DIR or os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _log_path(fmt):
+    extension = "jsonl" if fmt == "json" else "log"
+    return os.path.join(log_dir(), f"{LOG_NAME}.{extension}")
+
+
+def _file_handler(path, fmt):
+    # delay: 第一次写入记录时才打开文件
+    handler = logging.FileHandler(path, encoding='utf-8', delay=True)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(log_format, datefmt=date_format))
+    return handler
+
+
+def setup_logging(level=None, fmt=None):
+    """
+    配置 (或重新配置) 本进程的日志: 根记录器 -> 队列 -> 监听线程 -> 文件和控制台
+
+    :param level: 日志级别, 默认 config.LOG_LEVEL
+    :param fmt: 文件格式 text / json, 默认 config.LOG_FORMAT
+
+    格式或 config.LOG_DIR 改变后换用新的日志文件。
+    """
+    global _listener  # pylint: disable=W0603
+    level = _level(level)
+    fmt = fmt or config.LOG_FORMAT
+    with _setup_lock:
+        path = _log_path(fmt)
+        if _handlers.get("path") != path:
+            if _listener is not None:
+                _listener.stop()
+                _handlers["file"].close()
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter(log_format, datefmt=date_format))
+            _handlers.update(path=path, file=_file_handler(path, fmt), console=console)
+            _listener = logging.handlers.QueueListener(
+                queue.SimpleQueue(), *_all_handlers(), respect_handler_level=True)
+            _listener.start()
+            if _worker_listener is not None:
+                _worker_listener.handlers = _all_handlers()
+
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(_LocalQueueHandler(_listener.queue))
+        logging.getLogger().setLevel(level)
+
+
+def _all_handlers():
+    return (_handlers["file"], _handlers["console"], *_extra_handlers)
+
+
+def add_log_handler(handler):
+    """
+    再添加一个处理器 (在监听线程中调用, 主进程和工作进程的记录都会收到)
+
+    handler.emit 应尽快返回, 如只把消息放入缓冲。
+    """
+    if not _handlers:
+        setup_logging()
+    with _setup_lock:
+        _extra_handlers.append(handler)
+        for listener in (_listener, _worker_listener):
+            if listener is not None:
+                listener.handlers = _all_handlers()
+
+
+def remove_log_handler(handler):
+    with _setup_lock:
+        if handler in _extra_handlers:
+            _extra_handlers.remove(handler)
+        for listener in (_listener, _worker_listener):
+            if listener is not None and _handlers:
+                listener.handlers = _all_handlers()
+
+
+def stop_logging():
+    """写出队列中剩余的记录并停止监听线程 (退出时自动调用)"""
+    global _listener, _worker_listener  # pylint: disable=W0603
+    with _setup_lock:
+        for listener in (_worker_listener, _listener):
+            if listener is not None:
+                listener.stop()
+        _listener = _worker_listener = None
+        for handler in list(logging.getLogger().handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                logging.getLogger().removeHandler(handler)
+        if "file" in _handlers:
+            _handlers["file"].close()
+        _handlers.clear()
+
+
+atexit.register(stop_logging)
+
+
+def worker_log_queue():
+    """
+    工作进程发回日志记录的队列 (传给进程池的 initializer)
+
+    第一次调用时创建, 并启动把它转交给本进程处理器的监听线程。
+    """
+    global _worker_queue, _worker_listener  # pylint: disable=W0603
+    import multiprocessing  # pylint: disable=C0415
+    with _setup_lock:
+        if _worker_queue is None:
+            # spawn 上下文的队列也可以传给 fork 的进程 (设置了 max_tasks_per_child 的进程池使用 spawn)
+            _worker_queue = multiprocessing.get_context("spawn").Queue()
+        if _worker_listener is None and _handlers:
+            _worker_listener = logging.handlers.QueueListener(
+                _worker_queue, *_all_handlers(), respect_handler_level=True)
+            _worker_listener.start()
+    return _worker_queue
+
+
+def attach_worker_logging(log_queue, level=None):
+    """
+    工作进程: 所有记录放入 log_queue, 由主进程写出
+
+    替换从父进程继承 (fork) 的处理器, 它们的监听线程不在本进程中。
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(_level(level))
+
+
 # 创建日志记录器
-def get_logger(name=__name__, level=logging.INFO):
+def get_logger(name=__name__, level=None):
     """
     获取配置好的日志记录器
-    
+
     :param name: 日志记录器名称
-    :param level: 日志级别
+    :param level: 日志级别, 默认跟随 config.LOG_LEVEL
     :return: 配置好的日志记录器
     """
+    if not _handlers:
+        setup_logging()
     logger = logging.getLogger(name)
-    logger.setLevel(level)
-
-    
-    # 避免重复添加处理器
-    if not logger.handlers:
-        # 创建文件处理器
-        log_file = os.path.join(logs_dir, f"{name}.log")
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(level)
-        
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(level)
-        
-        # 创建格式化器并添加到处理器
-        formatter = logging.Formatter(log_format, datefmt=date_format)
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-        
-        # 添加处理器到日志记录器
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-    
+    if level is not None:
+        logger.setLevel(level)
     return logger
 
 # 创建默认日志记录器
-default_logger = get_logger("print_tool_advanced")
+default_logger = get_logger(LOG_NAME)
@@ -24,5 +24,5 @@ class MemDisk:
     def get_file_path(self, filename: str) -> str:
         if not self.is_mounted:
             raise RuntimeError("Memory disk is not mounted.")
-        return f"{self.driver_letter}:{'\\'}{filename}"
+        return f"{self.driver_letter}:\\{filename}"
     
\ No newline at end of file
@@ -0,0 +1,161 @@
+"""
+处理结果缓存 (Result cache)
+
+以 "输入文件内容哈希 + 命令名 + 影响输出的配置" 作为键, 把处理结果保存在
+cache/results/ 下。再次运行同一个文件和命令时直接从缓存复制结果, 不再重新处理。
+
+- 输入文件的哈希按 (路径, 大小, 修改时间) 记忆, 未变化的文件不需要重新计算
+- 缓存总大小超过 config.RESULT_CACHE_MAX_BYTES 时按最近最少使用 (LRU) 淘汰
+- 与 file_manager.move_input_to_cache 使用同一个 cache/ 目录
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+
+import config
+from logger import default_logger as logger
+from tools.fonts import page_number_font_file
+
+# 工具的输出格式变化时递增, 使旧缓存失效
+CACHE_VERSION = 1
+
+# 会影响输出结果的配置项
+OUTPUT_CONFIG_KEYS = (
+    "NORMAL_PAGE_SPLIT",
+    "NOFOLDING_PAGE_SPLIT",
+    "PAGE_NUMBER_MODE",
+    "PAGE_NUMBER_FONT_NAME",
+    "PAGE_NUMBER_FONT_FILES",
+    "FONT_SEARCH_PATH",
+    "IMPOSITION_BACKEND",
+    "NUP_PAGES",
+    "NUP_ORDER",
+    "NUP_ROTATE",
+)
+
+# 命令可能产生的输出文件后缀 (折叠排版会追加 _modified)
+OUTPUT_SUFFIXES = ("", "_modified")
+
+
+def get_cache_folder():
+    """cache/ 目录 (与 file_manager 相同)"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(script_dir, "cache")
+
+
+def output_candidates(output_path):
+    """命令可能写出的文件: {后缀: 路径}"""
+    name, ext = os.path.splitext(output_path)
+    return {suffix: f"{name}{suffix}{ext}" for suffix in OUTPUT_SUFFIXES}
+
+
+class ResultCache:
+    """基于内容哈希的处理结果缓存"""
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.path.join(get_cache_folder(), "results")
+        self.max_bytes = config.RESULT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.hashes_path = os.path.join(self.cache_dir, "hashes.json")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.index = self._load(self.index_path)
+        self.hashes = self._load(self.hashes_path)
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """写回索引文件"""
+        for path, data in ((self.index_path, self.index), (self.hashes_path, self.hashes)):
+            temp_path = path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+
+    def file_hash(self, path):
+        """输入文件的 sha256, 文件未变化时使用记忆的结果"""
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        memo = self.hashes.get(os.path.abspath(path))
+        if memo and memo[0] == stamp:
+            return memo[1]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        self.hashes[os.path.abspath(path)] = [stamp, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def make_key(self, input_path, command):
+        """缓存键: 内容哈希 + 命令名 + 相关配置 + 实际找到的页码字体文件"""
+        settings = {key: getattr(config, key, None) for key in OUTPUT_CONFIG_KEYS}
+        # 字体也会在当前目录中查找, 同样的配置在不同目录下可能使用不同的字体
+        settings["font_file"] = page_number_font_file()
+        payload = json.dumps([CACHE_VERSION, self.file_hash(input_path), command, settings],
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, output_path):
+        """
+        命中时把缓存的结果复制到输出位置
+
+        :return: 是否命中
+        """
+        entry = self.index.get(key)
+        if not entry:
+            return False
+        candidates = output_candidates(output_path)
+        blobs = {suffix: os.path.join(self.cache_dir, blob) for suffix, blob in entry["files"].items()}
+        if not all(os.path.exists(blob) for blob in blobs.values()):
+            self._evict(key)
+            return False
+        for suffix, blob in blobs.items():
+            shutil.copyfile(blob, candidates[suffix])
+        entry["last_used"] = time.time()
+        return True
+
+    def put(self, key, output_path, since=0.0):
+        """
+        保存一次处理的结果
+
+        :param since: 只保存该时间之后写出的文件
+        """
+        files, size = {}, 0
+        for suffix, path in output_candidates(output_path).items():
+            if os.path.exists(path) and os.path.getmtime(path) >= since:
+                blob = f"{key}{suffix}.pdf"
+                shutil.copyfile(path, os.path.join(self.cache_dir, blob))
+                files[suffix] = blob
+                size += os.path.getsize(path)
+        if not files:
+            return
+        self.index[key] = {"files": files, "size": size, "last_used": time.time()}
+        self._enforce_limit()
+
+    def _evict(self, key):
+        entry = self.index.pop(key, None)
+        if not entry:
+            return
+        for blob in entry["files"].values():
+            try:
+                os.remove(os.path.join(self.cache_dir, blob))
+            except OSError:
+                pass
+
+    def _enforce_limit(self):
+        total = sum(entry["size"] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]["size"]
+            logger.debug("Evicting cached result %s", key)
+            self._evict(key)
@@ -0,0 +1,76 @@
+"""
+测试的公共夹具 (Shared fixtures)
+
+- make_pdf  生成每页印有页码文字的测试PDF (可以指定每页尺寸)
+- ttf_font  使用 reportlab 自带的 Vera.ttf 作为页码字体, 不依赖系统字体
+"""
+
+import io
+import os
+import sys
+
+import pytest
+from reportlab.pdfgen import canvas
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+
+
+def pdf_bytes(page_count, sizes=None):
+    """
+    测试PDF: 第 i 页印有 "Source <i>"
+
+    :param sizes: 每页尺寸列表 (循环使用), 默认 A4
+    """
+    sizes = sizes or [(595, 842)]
+    packet = io.BytesIO()
+    c = canvas.Canvas(packet)
+    for i in range(page_count):
+        width, height = sizes[i % len(sizes)]
+        c.setPageSize((width, height))
+        c.setFont("Helvetica", 14)
+        c.drawString(72, height / 2, f"Source {i + 1}")
+        c.showPage()
+    c.save()
+    return packet.getvalue()
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """make_pdf(page_count, name=None, sizes=None) -> 路径"""
+    def make(page_count, name=None, sizes=None):
+        path = tmp_path / (name or f"in{page_count}.pdf")
+        path.write_bytes(pdf_bytes(page_count, sizes))
+        return str(path)
+    return make
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(monkeypatch, tmp_path):
+    """每个测试使用独立的日志/缓存/检查点目录, 不启动进程池, 不使用共享的 PdfSource"""
+    from logger import setup_logging
+    from tools.pdf_source import close_pdf_sources
+    monkeypatch.setattr(config, "LOG_DIR", str(tmp_path / "logs"))
+    setup_logging()
+    monkeypatch.setattr(config, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(config, "CHUNK_WORKERS", None)
+    monkeypatch.setattr(config, "CHUNK_PAGES", None)
+    yield
+    close_pdf_sources()
+
+
+@pytest.fixture
+def ttf_font(monkeypatch):
+    """以 Vera.ttf 作为纯文字页码字体, 返回注册后的字体名"""
+    import reportlab
+    from tools.fonts import page_number_font
+    monkeypatch.setattr(config, "FONT_SEARCH_PATH",
+                        [os.path.join(os.path.dirname(reportlab.__file__), "fonts")])
+    monkeypatch.setattr(config, "PAGE_NUMBER_FONT_NAME", "TestVera")
+    monkeypatch.setattr(config, "PAGE_NUMBER_FONT_FILES", ("Vera.ttf",))
+    font_name = page_number_font()
+    assert font_name == "TestVera"
+    return font_name
@@ -0,0 +1,188 @@
+"""批处理: 每个文件的处理结果"""
+
+import os
+
+import pytest
+
+import batch_processor
+import config
+import custom_module
+from conftest import pdf_bytes
+
+
+@pytest.mark.parametrize("command", ["re_2page_staple", "add_page_number", "merge_4_in_1",
+                                     "suit_normal_envelop"])
+def test_failed_file_is_reported(command, tmp_path):
+    input_path = tmp_path / "broken.pdf"
+    input_path.write_bytes(b"not a pdf")
+
+    result = batch_processor.process_single_pdf(
+        str(input_path), str(tmp_path / "out.pdf"), "custom", getattr(custom_module, command))
+
+    assert not result.ok
+    assert result.error
+
+
+def test_processed_file_is_reported(make_pdf, tmp_path):
+    result = batch_processor.process_single_pdf(
+        make_pdf(8), str(tmp_path / "out.pdf"), "custom", custom_module.re_2page_staple)
+
+    assert result.ok
+    assert (tmp_path / "out_modified.pdf").exists()
+
+
+def test_usage_lists_every_command(capsys):
+    batch_processor.print_usage()
+    out = capsys.readouterr().out
+
+    for name in list(batch_processor.COMMANDS) + list(batch_processor.TOOL_COMMANDS):
+        assert name in out
+    assert "clean/clear - Clean output folder" in out
+
+
+@pytest.fixture
+def batch_folders(tmp_path, monkeypatch):
+    """input/ output/ cache/ 都放在临时目录中"""
+    import result_cache
+    input_folder, output_folder = tmp_path / "input", tmp_path / "output"
+    input_folder.mkdir()
+    monkeypatch.setattr(batch_processor, "get_folders", lambda: (str(input_folder), str(output_folder)))
+    monkeypatch.setattr(result_cache, "get_cache_folder", lambda: str(tmp_path / "cache"))
+    return input_folder, output_folder
+
+
+def _run(command="add_page_number"):
+    results = batch_processor.process_pdfs_in_folders(getattr(custom_module, command), jobs=1)
+    return {result.file: result for result in results}
+
+
+def test_cache_hit_and_invalidation(batch_folders, monkeypatch):
+    input_folder, output_folder = batch_folders
+    (input_folder / "a.pdf").write_bytes(pdf_bytes(3))
+    output_path = output_folder / "a_processed.pdf"
+
+    first = _run()["a.pdf"]
+    assert first.ok and not first.cached
+    expected = output_path.read_bytes()
+    output_path.unlink()
+
+    # 输入、命令和配置都没有变化: 从缓存恢复同样的输出
+    second = _run()["a.pdf"]
+    assert second.ok and second.cached
+    assert output_path.read_bytes() == expected
+
+    # 其他命令、影响输出的配置或输入内容变化后重新处理
+    assert not _run("add_page_number_graph")["a.pdf"].cached
+    monkeypatch.setattr(config, "PAGE_NUMBER_MODE", "overlay")
+    assert not _run()["a.pdf"].cached
+    (input_folder / "a.pdf").write_bytes(pdf_bytes(5))
+    assert not _run()["a.pdf"].cached
+
+
+def test_failed_file_is_not_cached(batch_folders):
+    input_folder, _ = batch_folders
+    (input_folder / "broken.pdf").write_bytes(b"not a pdf")
+
+    assert not _run()["broken.pdf"].ok
+    result = _run()["broken.pdf"]
+    assert not result.ok and not result.cached
+
+
+# 每个影响输出的配置项改成另一个值
+CHANGED_CONFIG = {
+    "NORMAL_PAGE_SPLIT": 40,
+    "NOFOLDING_PAGE_SPLIT": 40,
+    "PAGE_NUMBER_MODE": "overlay",
+    "PAGE_NUMBER_FONT_NAME": "OtherFont",
+    "PAGE_NUMBER_FONT_FILES": ("other.ttf",),
+    "FONT_SEARCH_PATH": ["fonts"],
+    "IMPOSITION_BACKEND": "merge",
+    "NUP_PAGES": 8,
+    "NUP_ORDER": "saddle",
+    "NUP_ROTATE": 90,
+}
+
+
+def test_every_output_config_key_changes_the_cache_key(make_pdf, tmp_path, monkeypatch):
+    from result_cache import OUTPUT_CONFIG_KEYS, ResultCache
+    assert set(CHANGED_CONFIG) == set(OUTPUT_CONFIG_KEYS)
+    cache = ResultCache(str(tmp_path / "cache"))
+    input_path = make_pdf(3)
+    key = cache.make_key(input_path, "add_page_number")
+
+    for name, value in CHANGED_CONFIG.items():
+        with monkeypatch.context() as patch:
+            patch.setattr(config, name, value)
+            assert cache.make_key(input_path, "add_page_number") != key, name
+    assert cache.make_key(input_path, "add_page_number") == key
+
+
+def test_font_found_in_working_directory_changes_the_cache_key(make_pdf, tmp_path, monkeypatch):
+    import reportlab
+    from result_cache import ResultCache
+    from tools.fonts import find_font_file
+    monkeypatch.setattr(config, "PAGE_NUMBER_FONT_FILES", ("Vera.ttf",))
+    cache = ResultCache(str(tmp_path / "cache"))
+    input_path = make_pdf(3)
+
+    keys = []
+    for folder in (tmp_path / "empty", os.path.join(os.path.dirname(reportlab.__file__), "fonts")):
+        os.makedirs(folder, exist_ok=True)
+        monkeypatch.chdir(folder)
+        find_font_file.cache_clear()
+        keys.append(cache.make_key(input_path, "add_page_number"))
+    find_font_file.cache_clear()
+    # 同样的配置, 只是当前目录中有没有 Vera.ttf
+    assert keys[0] != keys[1]
+
+
+@pytest.mark.parametrize("command, header", [
+    ("re_2page_staple", "fold: 6 pages + 2 filler, 4 sheets"),
+    ("nup", "4-up normal: 6 pages + 0 filler, 2 sheets"),
+])
+def test_dry_run_prints_plan_and_writes_nothing(command, header, batch_folders, monkeypatch, capsys):
+    input_folder, output_folder = batch_folders
+    (input_folder / "a.pdf").write_bytes(pdf_bytes(6))
+    monkeypatch.setattr(config, "DRY_RUN", False)
+    monkeypatch.setattr(config, "NUP_PAGES", 4)
+    monkeypatch.setattr(config, "NUP_ORDER", "normal")
+    monkeypatch.setattr("sys.argv", ["batch_processor.py", command, "--dry-run"])
+
+    custom_function = batch_processor.parse_command_line_args()
+    assert config.DRY_RUN
+    batch_processor.dry_run(custom_function.__name__)
+
+    out = capsys.readouterr().out
+    assert out.startswith(f"a.pdf:\n{header}")
+    assert "sheet      1:" in out
+    assert not output_folder.exists() or not list(output_folder.rglob("*.pdf"))
+    assert [path.name for path in input_folder.iterdir()] == ["a.pdf"]
+
+
+def test_progress_events_for_a_batch(batch_folders, monkeypatch):
+    from tools.progress import set_progress_sink
+    input_folder, _ = batch_folders
+    (input_folder / "a.pdf").write_bytes(pdf_bytes(3))
+    (input_folder / "b.pdf").write_bytes(b"not a pdf")
+    monkeypatch.setattr(config, "PROGRESS_INTERVAL", 0)
+
+    events = []
+    previous = set_progress_sink(events.append)
+    try:
+        _run()
+    finally:
+        set_progress_sink(previous)
+
+    # 批次开始, a.pdf 逐页的进度, 每个文件完成一条批次事件, 失败的文件带有错误信息
+    assert [event[:4] for event in events] == [
+        ("", "batch", 0, 2),
+        ("a.pdf", "overlay", 0, 3),
+        ("a.pdf", "overlay", 1, 3),
+        ("a.pdf", "overlay", 2, 3),
+        ("a.pdf", "overlay", 3, 3),
+        ("a.pdf", "batch", 1, 2),
+        ("b.pdf", "batch", 2, 2),
+    ]
+    assert [event.error for event in events[:-1]] == [None] * 6
+    assert events[-1].error
+    assert events[-1].fraction == 1.0
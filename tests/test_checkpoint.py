@@ -0,0 +1,87 @@
+"""分段检查点: 中断后重新运行只处理缺少的分段, 输入变化后不再使用旧检查点, 取消时不留下不完整的输出"""
+
+import os
+
+import pytest
+from pypdf import PdfReader
+
+import config
+from tools import two_page
+from tools.cancel import CancelToken, JobCancelled, cancel_scope
+from tools.checkpoint import ChunkCheckpoint, open_checkpoint
+from tools.two_page import folding_plan, plan_folding, process_pdf_for_folding
+
+SPLIT = 8
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    """32 页分为 4 个任务, 由 2 个工作进程处理"""
+    monkeypatch.setattr(config, "CHUNK_WORKERS", 2)
+    monkeypatch.setattr(config, "CHUNK_PAGES", 8)
+
+
+def _contents(path):
+    return [page.get_contents().get_data() for page in PdfReader(path).pages]
+
+
+def _checkpoint(input_path):
+    imposition = folding_plan(32, SPLIT)
+    plan = plan_folding(32, SPLIT)
+    return open_checkpoint(input_path, f"fold:{SPLIT}:False:False", plan, imposition)
+
+
+def test_resume_only_redoes_missing_chunks(parallel, make_pdf, tmp_path, monkeypatch):
+    input_path = make_pdf(32)
+    process_pdf_for_folding(input_path, SPLIT, output_path=str(tmp_path / "ref.pdf"))
+    # 成功写出后检查点已删除
+    assert _checkpoint(input_path).done == []
+
+    # 所有分段都已完成, 但输出目录不存在, 写出失败
+    with pytest.raises(OSError):
+        process_pdf_for_folding(input_path, SPLIT, output_path=str(tmp_path / "missing" / "out.pdf"))
+    assert _checkpoint(input_path).done == [0, 1, 2, 3]
+
+    def no_submit(*args, **kwargs):
+        raise AssertionError("finished chunks must not be processed again")
+    monkeypatch.setattr(two_page, "submit_recorded", no_submit)
+    process_pdf_for_folding(input_path, SPLIT, output_path=str(tmp_path / "out.pdf"))
+
+    assert _contents(tmp_path / "out_modified.pdf") == _contents(tmp_path / "ref_modified.pdf")
+    assert _checkpoint(input_path).done == []
+
+
+def test_modified_input_does_not_resume(parallel, make_pdf, tmp_path):
+    input_path = make_pdf(32)
+    checkpoint = _checkpoint(input_path)
+    checkpoint.save(0, b"%PDF-1.7 chunk", 2)
+    assert _checkpoint(input_path).done == [0]
+
+    stat = os.stat(input_path)
+    os.utime(input_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert _checkpoint(input_path).done == []
+
+
+def test_cancelled_run_leaves_no_output_and_resumes_identically(parallel, make_pdf, tmp_path, monkeypatch):
+    input_path = make_pdf(32)
+    process_pdf_for_folding(input_path, SPLIT, output_path=str(tmp_path / "ref.pdf"))
+
+    # 第一个分段保存到检查点后取消
+    token = CancelToken()
+    save = ChunkCheckpoint.save
+
+    def save_then_cancel(self, *args):
+        save(self, *args)
+        token.cancel()
+    monkeypatch.setattr(ChunkCheckpoint, "save", save_then_cancel)
+    with pytest.raises(JobCancelled), cancel_scope(token):
+        process_pdf_for_folding(input_path, SPLIT, output_path=str(tmp_path / "out.pdf"))
+    monkeypatch.setattr(ChunkCheckpoint, "save", save)
+
+    assert not (tmp_path / "out_modified.pdf").exists()
+    done = _checkpoint(input_path).done
+    assert 1 <= len(done) < 4
+
+    process_pdf_for_folding(input_path, SPLIT, output_path=str(tmp_path / "out.pdf"))
+    assert (tmp_path / "out_modified.pdf").read_bytes() == (tmp_path / "ref_modified.pdf").read_bytes()
+    assert _checkpoint(input_path).done == []
@@ -0,0 +1,73 @@
+"""自适应分段: 并行的页数门槛、任务边界与输出页对齐、任务数与进程数"""
+
+import json
+
+import pytest
+
+import config
+from tools.chunking import SIGNATURE_PAGES, plan_chunks
+from tools.imposition_plan import folding_parts
+from tools.two_page import folding_plan
+
+SPLIT = 8
+
+
+def _job_ranges(plan):
+    """每个任务的 (第一页, 页数), 页码从 1 开始"""
+    return [(job[0][0], sum(n * 2 for _, n in job)) for job in plan.jobs]
+
+
+@pytest.mark.parametrize("no_folding", [False, True])
+def test_parallel_threshold(no_folding):
+    assert config.MIN_PARALLEL_PAGES == 160
+    below = 156 if not no_folding else 159
+    small = plan_chunks(below, folding_parts(156, SPLIT), no_folding, cpu_count=4)
+    large = plan_chunks(160, folding_parts(160, SPLIT), no_folding, cpu_count=4)
+
+    assert small.workers == 1 and not small.parallel
+    assert len(small.jobs) == 1
+    assert large.workers == 4 and large.parallel
+
+
+@pytest.mark.parametrize("no_folding", [False, True])
+@pytest.mark.parametrize("chunk_pages", [None, 20, 44])
+def test_chunk_boundaries_align_with_sheets(no_folding, chunk_pages):
+    total = 400
+    plan = plan_chunks(total, folding_parts(total, SPLIT), no_folding, cpu_count=4,
+                       chunk_pages=chunk_pages)
+    unit = SIGNATURE_PAGES if no_folding else SPLIT
+    ranges = _job_ranges(plan)
+
+    # 任务按顺序无缝覆盖全部页面, 每个任务都是完整的册子 (不折叠时为4页的整数倍)
+    expected_start = 1
+    for start, pages in ranges:
+        assert start == expected_start
+        assert pages % unit == 0
+        expected_start += pages
+    assert expected_start == total + 1
+
+    # 每个任务的输出页只用到该任务自己的页面
+    imposition = folding_plan(total, SPLIT, no_folding)
+    job_sheets = imposition.job_sheets(plan.jobs)
+    assert sum(count for _, count in job_sheets) == imposition.sheet_count
+    for (start, pages), (first_sheet, sheet_count) in zip(ranges, job_sheets):
+        slots = imposition.job_slots(first_sheet, sheet_count, page_offset=start - 1)
+        assert sorted(slots) == list(range(pages))
+
+
+def test_job_count_respects_pool_size():
+    parts = folding_parts(2000, SPLIT)
+    plan = plan_chunks(2000, parts, cpu_count=4)
+    assert plan.workers == 4
+    assert plan.workers <= len(plan.jobs) <= plan.workers * config.TARGET_JOBS_PER_WORKER
+
+    # 进程数不超过任务数
+    forced = plan_chunks(2000, parts, workers=8, chunk_pages=800)
+    assert len(forced.jobs) == 3
+    assert forced.workers == 3
+
+
+def test_plan_is_recorded_in_log_dir(tmp_path):
+    plan = plan_chunks(160, folding_parts(160, SPLIT), cpu_count=2)
+    records = (tmp_path / "logs" / "chunk_plans.jsonl").read_text(encoding="utf-8").splitlines()
+    assert json.loads(records[-1]) == plan.as_dict()
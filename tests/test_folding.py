@@ -0,0 +1,88 @@
+"""折叠排版: 张数和页序与原来的实现一致, 流式输出可以严格解析"""
+
+import pytest
+from pypdf import PdfReader
+
+import config
+from tools.filler import FILLER_TEXT
+from tools.pdf_source import open_pdf_source
+from tools.pipeline import PdfPipeline, impose_for_folding, number_pages_simple, pad_to_multiple
+from tools.two_page import folding_output_path, process_pdf_for_folding
+
+SPLIT = 80
+
+
+def baseline_sheets(page_count, split_page_num=SPLIT, no_folding=False):
+    """
+    原来的实现 (补空白页文件 + 每 split_page_num 页一个 _modified_N 文件) 的页序,
+    各部分按顺序拼接。每张为 (左, 右), 值为源页码, None 为空白页
+    """
+    labels = list(range(1, page_count + 1))
+    if page_count % 4:
+        # 空白页插在最后一页之前
+        labels = labels[:-1] + [None] * (4 - page_count % 4) + labels[-1:]
+    total = len(labels)
+    numbers = []
+    parts = range(1, total + 1, split_page_num) if total > split_page_num else [1]
+    for start in parts:
+        pages = min(start + split_page_num, total) - start if total > split_page_num else total
+        one_side = (pages + 1) // 2
+        if no_folding:
+            numbers += range(start, start + one_side * 2)
+            continue
+        for i in range(one_side):
+            left, right = start + i, start + one_side * 2 - 1 - i
+            numbers += [left, right] if i % 2 else [right, left]
+    return [(labels[a - 1], labels[b - 1]) for a, b in zip(numbers[::2], numbers[1::2])]
+
+
+def sheet_labels(path, strict=False):
+    """输出中每张的 (左, 右) 源页码"""
+    sheets = []
+    for page in PdfReader(path, strict=strict).pages:
+        texts = []
+        page.extract_text(visitor_text=lambda text, *args: texts.append(text.strip()) if text.strip() else None)
+        sheets.append(tuple(None if text == FILLER_TEXT else int(text.split()[1]) for text in texts))
+    return sheets
+
+
+@pytest.mark.parametrize("page_count", [1, 3, 13, 101])
+@pytest.mark.parametrize("no_folding", [False, True])
+def test_sheet_order_matches_baseline(page_count, no_folding, make_pdf):
+    input_path = make_pdf(page_count)
+    process_pdf_for_folding(input_path, SPLIT, no_folding=no_folding)
+
+    sheets = sheet_labels(folding_output_path(input_path))
+    assert len(sheets) == (page_count + 3) // 4 * 2
+    assert sheets == baseline_sheets(page_count, no_folding=no_folding)
+
+
+@pytest.mark.parametrize("page_count", [13, 101])
+def test_streamed_output_parses_strictly(page_count, make_pdf, monkeypatch):
+    monkeypatch.setattr(config, "STREAMING_OUTPUT", True)
+    input_path = make_pdf(page_count)
+    process_pdf_for_folding(input_path, SPLIT)
+
+    assert sheet_labels(folding_output_path(input_path), strict=True) == baseline_sheets(page_count)
+
+
+def test_streamed_pipeline_parses_strictly(make_pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STREAMING_OUTPUT", True)
+    output_path = str(tmp_path / "out.pdf")
+    PdfPipeline([number_pages_simple(), pad_to_multiple(4), impose_for_folding(SPLIT)]).run(
+        make_pdf(13), output_path)
+
+    reader = PdfReader(output_path, strict=True)
+    assert len(reader.pages) == 8
+    assert "Source 13" in reader.pages[0].extract_text()
+
+
+def test_source_is_closed_after_folding(make_pdf):
+    input_path = make_pdf(8)
+    source = open_pdf_source(input_path)
+
+    process_pdf_for_folding(input_path)
+
+    # 输入已关闭, 再次打开得到新的文档
+    assert open_pdf_source(input_path) is not source
+    assert open_pdf_source(folding_output_path(input_path)).page_count == 4
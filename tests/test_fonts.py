@@ -0,0 +1,56 @@
+"""页码字体: 快速模式嵌入的应是 TTF 子集, 与叠加层模式使用同一字体"""
+
+import config
+from pypdf import PdfReader
+
+from tools.fonts import subset_font
+from tools.page_number_simple import add_page_numbers_simple
+from tools.stamp import RESOURCE_PREFIX
+
+
+def _page_fonts(page):
+    return {str(name): font.get_object() for name, font in page["/Resources"]["/Font"].items()}
+
+
+def _stamped(make_pdf, tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(config, "PAGE_NUMBER_MODE", mode)
+    output = str(tmp_path / f"{mode}.pdf")
+    add_page_numbers_simple(make_pdf(3), output)
+    return PdfReader(output)
+
+
+def test_subset_font_is_the_ttf_subset(ttf_font):
+    font = subset_font(ttf_font)
+    assert str(font["/BaseFont"]).endswith("+BitstreamVeraSans-Roman")
+    assert font["/Subtype"] == "/TrueType"
+
+
+def test_fast_mode_embeds_ttf_subset(ttf_font, make_pdf, tmp_path, monkeypatch):
+    reader = _stamped(make_pdf, tmp_path, monkeypatch, "fast")
+    for number, page in enumerate(reader.pages, 1):
+        stamp_fonts = {name: font for name, font in _page_fonts(page).items()
+                       if name.startswith(RESOURCE_PREFIX)}
+        assert [str(font["/BaseFont"]) for font in stamp_fonts.values()] == \
+            ["/AAAAAA+BitstreamVeraSans-Roman"]
+        assert f"{number} / 3" in page.extract_text()
+
+
+def test_fast_mode_matches_overlay_mode(ttf_font, make_pdf, tmp_path, monkeypatch):
+    fast = _stamped(make_pdf, tmp_path, monkeypatch, "fast").pages[0]
+    overlay = _stamped(make_pdf, tmp_path, monkeypatch, "overlay").pages[0]
+
+    def ttf(page):
+        fonts = [font for font in _page_fonts(page).values()
+                 if str(font["/BaseFont"]).endswith("BitstreamVeraSans-Roman")]
+        assert fonts
+        return fonts[0]
+
+    fast_font, overlay_font = ttf(fast), ttf(overlay)
+    # 同一子集: 相同的字形宽度, 页码字符的编码相同
+    first = fast_font["/FirstChar"]
+    widths = dict(enumerate(fast_font["/Widths"], first))
+    overlay_widths = dict(enumerate(overlay_font["/Widths"], overlay_font["/FirstChar"]))
+    for char in "0123456789 /":
+        assert widths[ord(char)] == overlay_widths[ord(char)]
+    assert "1 / 3" in fast.extract_text()
+    assert "1 / 3" in overlay.extract_text()
@@ -0,0 +1,47 @@
+"""排版计划: 序列化往返、处理前的检查和覆盖统计"""
+
+import pytest
+
+from tools.imposition_plan import BLANK, ImpositionPlan
+from tools.nup import NupLayout, nup_plan
+from tools.two_page import folding_plan
+
+
+@pytest.fixture(params=["fold", "nofold", "nup"])
+def plan(request):
+    if request.param == "nup":
+        return nup_plan(12, NupLayout(3, 3, rotate=90), "normal", source_pages=11)
+    return folding_plan(20, 8, no_folding=request.param == "nofold", source_pages=18)
+
+
+def test_dict_round_trip(plan):
+    restored = ImpositionPlan.from_dict(plan.as_dict())
+    assert restored == plan
+    assert list(restored.slots) == list(plan.slots)
+    assert (restored.cells, restored.parts, restored.mode) == (plan.cells, plan.parts, plan.mode)
+    assert (restored.page_count, restored.source_pages) == (plan.page_count, plan.source_pages)
+
+
+def test_save_and_load(plan, tmp_path):
+    path = tmp_path / "plan.json"
+    plan.save(str(path))
+    assert ImpositionPlan.load(str(path)) == plan
+
+
+def test_validate_rejects_bad_plans():
+    with pytest.raises(ValueError, match="for 4 pages"):
+        ImpositionPlan([3, 0, 1, 2], 4).validate(8)
+    with pytest.raises(ValueError, match="do not fill"):
+        ImpositionPlan([3, 0, 1], 4).validate()
+    with pytest.raises(ValueError, match="exceeds"):
+        ImpositionPlan([4, 0, 1, 2], 4).validate()
+    with pytest.raises(ValueError, match="invalid page index"):
+        ImpositionPlan([-2, 0, 1, 2], 4).validate()
+    ImpositionPlan([3, 0, 1, BLANK], 4).validate()
+
+
+def test_check_coverage_counts_missing_and_repeated_pages(plan):
+    assert plan.check_coverage() == (0, 0)
+    # 第 3 页缺少, 第 1 页用了两次
+    assert ImpositionPlan([3, 0, 1, 0], 4).check_coverage() == (1, 1)
+    assert ImpositionPlan([3, BLANK, 1, 2], 4).check_coverage() == (1, 0)
@@ -0,0 +1,117 @@
+"""排版任务服务: 上传处理、错误状态码和队列满时的背压"""
+
+import io
+import time
+import asyncio
+import socket
+import threading
+import concurrent.futures
+
+import pytest
+from pypdf import PdfReader
+
+import config
+import job_server
+from conftest import pdf_bytes
+
+
+@pytest.fixture
+def server():
+    """在后台线程的事件循环中运行 JobServer(port=0), 任务在线程池中处理 (不启动进程池)"""
+    srv = job_server.JobServer(host="127.0.0.1", port=0, workers=1, max_queue=1)
+    srv.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    tasks = []
+
+    async def main():
+        ready = asyncio.Event()
+        tasks.append(asyncio.create_task(srv.serve(ready)))
+        await ready.wait()
+        started.set()
+        try:
+            await tasks[0]
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(main(),), daemon=True)
+    thread.start()
+    assert started.wait(10)
+    yield srv
+    loop.call_soon_threadsafe(tasks[0].cancel)
+    thread.join(10)
+    loop.close()
+    srv.executor.shutdown(wait=True)
+
+
+def request(port, head, body=b""):
+    """发送原始 HTTP 请求, 返回 (状态码, 响应头, 响应体)"""
+    with socket.create_connection(("127.0.0.1", port), timeout=30) as sock:
+        sock.sendall(head.encode("latin-1") + b"\r\n\r\n" + body)
+        response = b""
+        while chunk := sock.recv(65536):
+            response += chunk
+    raw_head, _, content = response.partition(b"\r\n\r\n")
+    lines = raw_head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, content
+
+
+def post(port, command, body):
+    return request(port, f"POST /jobs/{command} HTTP/1.1\r\nHost: localhost\r\n"
+                         f"Content-Length: {len(body)}", body)
+
+
+def test_post_returns_processed_pdf(server):
+    status, headers, content = post(server.port, "add_page_number", pdf_bytes(3))
+    assert status == 200
+    assert headers["Content-Type"] == "application/pdf"
+    assert len(PdfReader(io.BytesIO(content)).pages) == 3
+    assert server.completed == 1 and server.in_flight == 0
+
+
+@pytest.mark.parametrize("head, status", [
+    ("POST /jobs/bogus HTTP/1.1\r\nContent-Length: 4", 404),
+    ("POST /nothing HTTP/1.1\r\nContent-Length: 4", 404),
+    ("GET /jobs/add_page_number HTTP/1.1", 405),
+    ("POST /status HTTP/1.1\r\nContent-Length: 4", 405),
+    ("POST /jobs/add_page_number HTTP/1.1", 411),
+])
+def test_error_status(server, head, status):
+    assert request(server.port, head)[0] == status
+
+
+def test_upload_too_large_is_rejected_before_reading(server, monkeypatch):
+    monkeypatch.setattr(config, "SERVER_MAX_UPLOAD_BYTES", 100)
+    status, _, content = request(server.port, "POST /jobs/add_page_number HTTP/1.1\r\nContent-Length: 101")
+    assert status == 413
+    assert b"100 bytes" in content
+
+
+def test_full_queue_returns_503(server, monkeypatch):
+    release = threading.Event()
+    run_pdf_job = job_server.run_pdf_job
+
+    def blocked_job(*args):
+        release.wait(30)
+        return run_pdf_job(*args)
+    monkeypatch.setattr(job_server, "run_pdf_job", blocked_job)
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(post(server.port, "add_page_number", pdf_bytes(2))))
+    first.start()
+    try:
+        for _ in range(1000):
+            if server.running:
+                break
+            time.sleep(0.01)
+        assert server.in_flight == server.max_queue
+
+        status, headers, _ = post(server.port, "add_page_number", pdf_bytes(2))
+        assert status == 503
+        assert headers["Retry-After"] == "5"
+        assert server.rejected == 1
+    finally:
+        release.set()
+        first.join(30)
+    assert results[0][0] == 200
@@ -0,0 +1,118 @@
+"""多联排版: 格子顺序、网格选择、页序, 以及每个源页面在输出页上的格子"""
+
+import re
+
+import pytest
+from pypdf import PdfReader
+from pypdf.generic import ContentStream
+
+from tools.nup import GRIDS, NupLayout, cell_order, choose_layout, nup_pdf, nup_plan
+
+A4 = (595, 842)
+
+
+@pytest.mark.parametrize("rotate, expected", [
+    (0, ((0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1))),
+    (90, ((0, 1), (0, 0), (1, 1), (1, 0), (2, 1), (2, 0))),
+    (180, ((2, 1), (1, 1), (0, 1), (2, 0), (1, 0), (0, 0))),
+    (270, ((2, 0), (2, 1), (1, 0), (1, 1), (0, 0), (0, 1))),
+])
+def test_cell_order(rotate, expected):
+    assert cell_order(3, 2, rotate) == expected
+
+
+@pytest.mark.parametrize("n, portrait, landscape", [
+    (2, (1, 2, 90), (2, 1, 90)),
+    (4, (2, 2, 0), (2, 2, 0)),
+    (6, (2, 3, 90), (3, 2, 90)),
+    (8, (2, 4, 90), (4, 2, 90)),
+    (9, (3, 3, 0), (3, 3, 0)),
+    (16, (4, 4, 0), (4, 4, 0)),
+])
+def test_choose_layout_auto(n, portrait, landscape):
+    for page_size, expected in ((A4, portrait), (A4[::-1], landscape)):
+        layout = choose_layout(n, page_size, "auto")
+        assert (layout.cols, layout.rows, layout.rotate) == expected
+        assert layout.per_sheet == n
+
+
+def test_choose_layout_fixed_rotation_and_errors():
+    layout = choose_layout(6, A4, 180)
+    assert (layout.cols, layout.rows, layout.rotate) == (*GRIDS[6], 180)
+    with pytest.raises(ValueError):
+        choose_layout(5, A4)
+
+
+@pytest.mark.parametrize("order, expected", [
+    ("normal", [0, 1, 2, 3, 4, 5, 6, 7]),
+    # 每 4 页一个册子
+    ("booklet", [3, 0, 1, 2, 7, 4, 5, 6]),
+    # 整本一个骑马钉册子
+    ("saddle", [7, 0, 1, 6, 5, 2, 3, 4]),
+])
+def test_nup_plan_orders(order, expected):
+    plan = nup_plan(8, NupLayout(2, 1), order, split_page_num=4)
+    assert list(plan.slots) == expected
+    plan.check_coverage()
+
+
+def test_nup_plan_pads_last_sheet_and_rejects_odd_booklets():
+    assert list(nup_plan(5, NupLayout(2, 2)).slots) == [0, 1, 2, 3, 4, -1, -1, -1]
+    with pytest.raises(ValueError):
+        nup_plan(8, NupLayout(3, 3), "saddle")
+    with pytest.raises(ValueError):
+        nup_plan(6, NupLayout(2, 1), "booklet")
+
+
+def _placed_cells(page, layout):
+    """输出页上每个源页面 ("Source <i>") 的中心落在哪个格子: {i: (列, 行)}"""
+    width, height = float(page.mediabox.width), float(page.mediabox.height)
+    xobjects = page["/Resources"]["/XObject"]
+    cells = {}
+    matrix = None
+    for operands, operator in ContentStream(page.get_contents(), None).operations:
+        if operator == b"cm":
+            matrix = [float(value) for value in operands]
+        elif operator == b"Do":
+            xobject = xobjects[operands[0]].get_object()
+            label = re.search(rb"Source (\d+)", xobject.get_data())
+            if label is None:
+                # 填充页
+                continue
+            left, bottom, right, top = (float(value) for value in xobject["/BBox"])
+            x, y = (left + right) / 2, (bottom + top) / 2
+            a, b, c, d, e, f = matrix
+            center_x, center_y = a * x + c * y + e, b * x + d * y + f
+            col = int(center_x // (width / layout.cols))
+            row = layout.rows - 1 - int(center_y // (height / layout.rows))
+            cells[int(label.group(1))] = (col, row)
+    return cells
+
+
+@pytest.mark.parametrize("n", sorted(GRIDS))
+def test_nup_pdf_places_pages_in_reading_order(n, make_pdf, tmp_path):
+    input_path = make_pdf(n + 1)
+    output_path = str(tmp_path / "out.pdf")
+
+    assert nup_pdf(input_path, output_path, n=n, order="normal", rotate="auto") == 2
+
+    layout = choose_layout(n, A4, "auto")
+    pages = PdfReader(output_path).pages
+    assert len(pages) == 2
+    assert _placed_cells(pages[0], layout) == {i + 1: cell for i, cell in enumerate(layout.cells)}
+    assert _placed_cells(pages[1], layout) == {n + 1: layout.cells[0]}
+
+
+def test_nup_pdf_saddle_pads_to_multiple_of_four(make_pdf, tmp_path):
+    input_path = make_pdf(6)
+    output_path = str(tmp_path / "out.pdf")
+
+    assert nup_pdf(input_path, output_path, n=2, order="saddle", rotate=0) == 4
+
+    layout = NupLayout(2, 1)
+    pages = PdfReader(output_path).pages
+    # 8 页的骑马钉: (8, 1) (2, 7) (6, 3) (4, 5); 最后一页仍在最后, 第 6、7 页为填充页
+    assert _placed_cells(pages[0], layout) == {6: (0, 0), 1: (1, 0)}
+    assert _placed_cells(pages[1], layout) == {2: (0, 0)}
+    assert _placed_cells(pages[2], layout) == {3: (1, 0)}
+    assert _placed_cells(pages[3], layout) == {4: (0, 0), 5: (1, 0)}
@@ -0,0 +1,25 @@
+"""内存流水线: 失败时不复用被修改过的源文档, 也不留下不完整的输出"""
+
+import os
+
+import pytest
+
+from tools.pdf_source import open_pdf_source
+from tools.pipeline import PdfPipeline, number_pages_simple
+
+
+def _failing_stage(pages, context):
+    raise RuntimeError("stage failed")
+
+
+def test_failed_run_discards_modified_source(make_pdf, tmp_path):
+    input_path = make_pdf(3)
+    output_path = str(tmp_path / "out.pdf")
+    source = open_pdf_source(input_path)
+
+    with pytest.raises(RuntimeError):
+        PdfPipeline([number_pages_simple(), _failing_stage]).run(input_path, output_path)
+
+    # 加过页码的源页面不能被之后的命令复用
+    assert open_pdf_source(input_path) is not source
+    assert not os.path.exists(output_path)
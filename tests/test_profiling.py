@@ -0,0 +1,47 @@
+"""性能分析: 打开时按阶段记录折叠排版, 关闭时不产生任何记录"""
+
+import json
+import os
+
+import batch_processor
+import config
+import custom_module
+from tools.profiling import ProfileReport, current_record, file_profile, stage
+
+
+def _fold(make_pdf, tmp_path):
+    return batch_processor.process_single_pdf(
+        make_pdf(8), str(tmp_path / "out.pdf"), "custom", custom_module.re_2page_staple)
+
+
+def test_profiled_folding_run_records_write_and_output_bytes(make_pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE", "stages")
+    result = _fold(make_pdf, tmp_path)
+
+    assert result.ok
+    assert result.profile["stages"]["write"]["calls"] >= 1
+    assert result.profile["counters"]["output_bytes"] == os.path.getsize(tmp_path / "out_modified.pdf")
+
+    report = ProfileReport("re_2page_staple", str(tmp_path))
+    report.add_file(result)
+    report.close()
+    with open(report.path, encoding="utf-8") as f:
+        file_line, run_line = [json.loads(line) for line in f]
+    assert file_line["event"] == "file" and "write" in file_line["stages"]
+    assert run_line["event"] == "run"
+    assert run_line["counters"]["output_bytes"] == result.profile["counters"]["output_bytes"]
+
+
+def test_disabled_profiling_adds_no_record(make_pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROFILE", None)
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path / "profiles"))
+
+    with file_profile("a.pdf") as record:
+        assert record is None
+        with stage("write"):
+            assert current_record() is None
+
+    result = _fold(make_pdf, tmp_path)
+    assert result.ok
+    assert result.profile is None
+    assert not os.path.exists(tmp_path / "profiles")
@@ -0,0 +1,30 @@
+"""监视文件夹: 启动时已有的文件按子文件夹选择命令, 只处理一次"""
+
+import contextlib
+
+import config
+import watch_daemon
+from conftest import pdf_bytes
+
+
+def test_startup_file_is_processed_once_with_polling(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "WATCH_FORCE_POLLING", True)
+    monkeypatch.setattr(config, "WATCH_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(config, "RESULT_CACHE_ENABLED", False)
+    # 文件在本进程中处理, 不启动进程池
+    monkeypatch.setattr(watch_daemon, "batch_worker_pool", lambda jobs: contextlib.nullcontext())
+    results = []
+    monkeypatch.setattr(watch_daemon, "report_file_result", lambda result, *args: results.append(result))
+
+    input_folder, output_folder = tmp_path / "input", tmp_path / "output"
+    (input_folder / "add_page_number").mkdir(parents=True)
+    (input_folder / "add_page_number" / "a.pdf").write_bytes(pdf_bytes(3))
+    # 没有匹配的子文件夹或规则, 忽略
+    (input_folder / "b.pdf").write_bytes(pdf_bytes(3))
+
+    daemon = watch_daemon.WatchDaemon(str(input_folder), str(output_folder), jobs=1)
+    daemon.run(stop_after=1)
+
+    assert [(result.file, result.ok) for result in results] == [("a.pdf", True)]
+    assert sorted(path.name for path in output_folder.iterdir()) == [".partial", "a_processed.pdf"]
+    assert not list((output_folder / ".partial").iterdir())
@@ -6,11 +6,38 @@ with consistent naming and default output suffixes.
 """
 
 import os
+import importlib
 import config
-from .page_number_graph import add_page_numbers_graph
-from .page_number_simple import add_page_numbers_simple
-from .two_page import process_pdf_for_folding
-from .four_paper import merge_pdf_pages_4_in_1_compatible
+
+# 子模块在第一次使用时才导入 (pypdf / reportlab 的导入开销较大),
+# 只清理输出文件夹等不处理PDF的命令不必加载它们。
+# 公开名称 -> 所在子模块
+_LAZY_EXPORTS = {
+    "add_page_numbers_graph": ".page_number_graph",
+    "add_page_numbers_simple": ".page_number_simple",
+    "process_pdf_for_folding": ".two_page",
+    "folding_output_path": ".two_page",
+    "merge_pdf_pages_4_in_1_compatible": ".four_paper",
+    "nup_pdf": ".nup",
+    "PdfPipeline": ".pipeline",
+    "number_pages_simple": ".pipeline",
+    "number_pages_graph": ".pipeline",
+    "pad_to_multiple": ".pipeline",
+    "impose_for_folding": ".pipeline",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
 
 
 def add_graphical_page_numbers(input_path, output_path=None):
@@ -22,6 +49,7 @@ def add_graphical_page_numbers(input_path, output_path=None):
     """
     if output_path is None:
         output_path = _generate_output_path(input_path, "graphical")
+    from .page_number_graph import add_page_numbers_graph  # pylint: disable=C0415
     add_page_numbers_graph(input_path, output_path)
     return output_path
 
@@ -35,6 +63,7 @@ def add_simple_page_numbers(input_path, output_path=None):
     """
     if output_path is None:
         output_path = _generate_output_path(input_path, "simple")
+    from .page_number_simple import add_page_numbers_simple  # pylint: disable=C0415
     add_page_numbers_simple(input_path, output_path)
     return output_path
 
@@ -53,11 +82,42 @@ def rearrange_for_stapling(input_path, output_path=None, no_folding=False, unipa
         output_path = _generate_output_path(input_path, suffix)
     
     split_page_num = config.NOFOLDING_PAGE_SPLIT if no_folding else config.NORMAL_PAGE_SPLIT
+    from .two_page import process_pdf_for_folding  # pylint: disable=C0415
     process_pdf_for_folding(input_path, split_page_num=split_page_num, 
                           output_path=output_path, no_folding=no_folding, unipage=unipage)
     return output_path
 
 
+def number_and_rearrange_for_stapling(input_path, output_path=None, no_folding=False, unipage=False):
+    """
+    Add simple page numbers and rearrange for 2-page stapling in one pass.
+
+    Runs entirely in memory: the input is parsed once and the result is
+    serialized once, without intermediate PDF files.
+
+    :param input_path: Input PDF file path
+    :param output_path: Output PDF file path (auto-generated if None)
+    :param no_folding: If True, no folding rearrangement
+    :param unipage: If True, rearrange for unipage layout
+    :return: Path of the written file (with the same ``_modified`` suffix
+             as :func:`rearrange_for_stapling`)
+    """
+    if output_path is None:
+        suffix = "nofold" if no_folding else "staple"
+        output_path = _generate_output_path(input_path, suffix)
+
+    split_page_num = config.NOFOLDING_PAGE_SPLIT if no_folding else config.NORMAL_PAGE_SPLIT
+    # pylint: disable=C0415
+    from .pipeline import PdfPipeline, impose_for_folding, number_pages_simple, pad_to_multiple
+    from .two_page import folding_output_path
+    pipeline = PdfPipeline([
+        number_pages_simple(),
+        pad_to_multiple(4),
+        impose_for_folding(split_page_num, no_folding=no_folding, unipage=unipage),
+    ])
+    return pipeline.run(input_path, folding_output_path(input_path, output_path))
+
+
 def merge_4_in_1(input_path, output_path=None):
     """
     Merge PDF pages 4-in-1 format.
@@ -67,10 +127,29 @@ def merge_4_in_1(input_path, output_path=None):
     """
     if output_path is None:
         output_path = _generate_output_path(input_path, "4in1")
+    from .four_paper import merge_pdf_pages_4_in_1_compatible  # pylint: disable=C0415
     merge_pdf_pages_4_in_1_compatible(input_path, output_path)
     return output_path
 
 
+def impose_nup(input_path, output_path=None, n=None, order=None, rotate=None):
+    """
+    Place n pages on each output sheet (2, 4, 6, 8, 9 or 16 per sheet).
+
+    :param input_path: Input PDF file path
+    :param output_path: Output PDF file path (auto-generated if None)
+    :param n: Pages per sheet (defaults to config.NUP_PAGES)
+    :param order: "normal", "booklet" or "saddle" (defaults to config.NUP_ORDER)
+    :param rotate: 0, 90, 180, 270 or "auto" (defaults to config.NUP_ROTATE)
+    """
+    n = n or config.NUP_PAGES
+    if output_path is None:
+        output_path = _generate_output_path(input_path, f"{n}up")
+    from .nup import nup_pdf  # pylint: disable=C0415
+    nup_pdf(input_path, output_path, n=n, order=order, rotate=rotate)
+    return output_path
+
+
 def _generate_output_path(input_path, suffix):
     """
     Generate output path with default suffix.
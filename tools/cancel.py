@@ -0,0 +1,132 @@
+"""
+协作式取消 (Cooperative cancellation)
+
+长时间的处理 (加页码、折叠排版) 在逐页/逐张的循环中检查取消标记,
+收到取消请求后在下一页/下一张抛出 JobCancelled, 不必等整个文件处理完:
+
+- CancelToken  由发起方 (如 GUI 的取消按钮) 持有, cancel() 请求取消
+- cancel_scope(token)  batch_processor 为每个文件开启, 范围外的检查直接忽略
+- check_cancelled() / iter_cancellable()  处理循环中的检查点
+
+标记放在与工作进程共享的内存中 (见 worker_pool), 令牌可以随任务传给工作进程,
+主进程请求取消后, 工作进程中正在处理的文件和分段也会停止。
+
+JobCancelled 与 KeyboardInterrupt 一样继承 BaseException,
+各处理函数中 "except Exception" 的错误处理不会把取消当作普通错误吞掉。
+
+用法::
+
+    for sheet in iter_cancellable(sheets):
+        ...
+"""
+
+import itertools
+import threading
+import contextlib
+
+# 共享标记的个数; 令牌循环使用这些位置, 同时进行的任务远少于这个数
+_SLOTS = 256
+# 等待工作进程时检查取消请求的间隔 (秒)
+CANCEL_POLL_INTERVAL = 0.2
+
+_local = threading.local()
+# 与工作进程共享的标记 (主进程第一次使用时创建, 工作进程由 initializer 传入)
+_flags = None
+_flags_lock = threading.Lock()
+_next_slot = itertools.count()
+
+
+class JobCancelled(BaseException):
+    """处理被取消"""
+
+
+def worker_cancel_flags():
+    """
+    主进程: 与工作进程共享的取消标记 (传给进程池的 initializer)
+
+    第一次调用时创建。
+    """
+    global _flags  # pylint: disable=W0603
+    with _flags_lock:
+        if _flags is None:
+            import multiprocessing  # pylint: disable=C0415
+            # spawn 上下文的共享内存也可以传给 fork 的进程
+            _flags = multiprocessing.get_context("spawn").RawArray("b", _SLOTS)
+    return _flags
+
+
+def attach_worker_cancel_flags(flags):
+    """工作进程: 使用主进程的取消标记"""
+    global _flags  # pylint: disable=W0603
+    _flags = flags
+
+
+class CancelToken:
+    """一次运行的取消标记, 可以传给工作进程 (只传递标记的位置)"""
+
+    def __init__(self):
+        flags = worker_cancel_flags()
+        self.slot = next(_next_slot) % _SLOTS
+        flags[self.slot] = 0
+
+    def __getstate__(self):
+        return {"slot": self.slot}
+
+    def __setstate__(self, state):
+        self.slot = state["slot"]
+
+    def cancel(self):
+        """请求取消, 正在处理的循环在下一页/下一张停止"""
+        worker_cancel_flags()[self.slot] = 1
+
+    @property
+    def cancelled(self):
+        # 没有共享标记的进程 (不是由共享进程池启动) 无法收到取消请求
+        return _flags is not None and _flags[self.slot] != 0
+
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+
+@contextlib.contextmanager
+def cancel_scope(token):
+    """在当前线程中使用 token (None 为不可取消)"""
+    previous = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def current_token():
+    """当前线程的 CancelToken, 没有时为 None"""
+    return getattr(_local, "token", None)
+
+
+def cancel_requested():
+    """当前线程的处理是否已被请求取消"""
+    token = getattr(_local, "token", None)
+    return token is not None and token.cancelled
+
+
+def check_cancelled():
+    """检查点: 已请求取消时抛出 JobCancelled"""
+    token = getattr(_local, "token", None)
+    if token is not None:
+        token.check()
+
+
+def iter_cancellable(iterable):
+    """每一项之前检查取消请求的迭代器; 不可取消时原样返回 iterable"""
+    token = getattr(_local, "token", None)
+    if token is None:
+        return iterable
+    return _iter_cancellable(iterable, token)
+
+
+def _iter_cancellable(iterable, token):
+    for item in iterable:
+        token.check()
+        yield item
@@ -0,0 +1,180 @@
+"""
+分段检查点 (Chunk checkpoints)
+
+并行折叠排版时, 每个完成的分段 (工作进程返回的排版结果) 立即保存到
+cache/checkpoints/<键>/ 下, 文件名为 <文件名>_modified_<N>.pdf, 并记录在
+manifest.json 中。处理失败或被取消后, 对同一个输入重新运行同一个命令时
+只处理缺少的分段, 已完成的分段直接读取。
+
+- 键: 输入文件 (路径, 大小, 修改时间) + 命令 + 影响分段结果的配置 + 分段方式,
+  任何一项变化都不会用到旧的检查点。与 ResultCache 记忆内容哈希的条件相同,
+  打开检查点时不需要读取整个输入
+- 整个文件成功写出后 (finish) 删除检查点
+- 超过 config.CHECKPOINT_MAX_AGE_DAYS 天未更新的检查点在下次使用时清理
+
+用法::
+
+    checkpoint = open_checkpoint(input_path, "fold", plan, imposition)
+    sheets = impose_chunked(pages, plan, imposition, checkpoint=checkpoint)
+    ...  # 写出输出文件
+    if checkpoint is not None:
+        checkpoint.finish()
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# 分段结果的格式变化时递增, 使旧检查点失效
+CHECKPOINT_VERSION = 1
+
+# 会影响分段结果的配置项 (分册页数已包含在分段方式中)
+CHECKPOINT_CONFIG_KEYS = (
+    "PAGE_NUMBER_MODE",
+    "PAGE_NUMBER_FONT_FILES",
+    "IMPOSITION_BACKEND",
+)
+
+MANIFEST_NAME = "manifest.json"
+
+
+def checkpoint_root():
+    """检查点目录: config.CHECKPOINT_DIR, 默认为程序目录下的 cache/checkpoints"""
+    return config.CHECKPOINT_DIR or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "checkpoints")
+
+
+def file_stamp(path):
+    """输入文件的 (绝对路径, 大小, 修改时间), 文件被替换或修改后随之变化"""
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def checkpoint_key(input_path, command, plan, imposition):
+    """检查点的键"""
+    settings = {key: getattr(config, key, None) for key in CHECKPOINT_CONFIG_KEYS}
+    payload = json.dumps([CHECKPOINT_VERSION, file_stamp(input_path), command, settings,
+                          imposition.mode, imposition.page_count, plan.jobs],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChunkCheckpoint:
+    """一个文件一次折叠排版的已完成分段"""
+
+    def __init__(self, directory, input_path, command, jobs):
+        """
+        :param directory: 本检查点的目录
+        :param jobs: 分段 (任务) 数
+        """
+        self.directory = directory
+        self.name = os.path.basename(input_path)
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+        if self.manifest.get("jobs") != jobs:
+            self.manifest = {"version": CHECKPOINT_VERSION, "input": self.name,
+                             "command": command, "jobs": jobs, "parts": {}}
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        self.manifest["updated"] = time.time()
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False)
+        os.replace(temp_path, self.manifest_path)
+
+    def part_path(self, index):
+        """第 index 个分段的文件 (与 folding_output_path 的 _modified_N 命名一致)"""
+        stem = os.path.splitext(self.name)[0]
+        return os.path.join(self.directory, f"{stem}_modified_{index}.pdf")
+
+    @property
+    def done(self):
+        """已完成的分段编号"""
+        return sorted(int(index) for index in self.manifest["parts"])
+
+    def load(self, index):
+        """已完成分段的排版结果, 没有或不完整时为 None"""
+        entry = self.manifest["parts"].get(str(index))
+        if entry is None:
+            return None
+        try:
+            with open(self.part_path(index), "rb") as f:
+                data = f.read()
+        except OSError:
+            data = b""
+        if len(data) != entry["bytes"]:
+            logger.warning("检查点分段 %d 不完整, 重新处理", index)
+            del self.manifest["parts"][str(index)]
+            return None
+        return data
+
+    def save(self, index, data, sheets):
+        """保存一个完成的分段 (先写文件, 再记入清单)"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.part_path(index)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        self.manifest["parts"][str(index)] = {"bytes": len(data), "sheets": sheets}
+        self._save_manifest()
+
+    def finish(self):
+        """整个文件已成功写出, 删除检查点"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def prune_checkpoints(root=None, max_age_days=None):
+    """删除长时间未更新的检查点"""
+    root = root or checkpoint_root()
+    max_age_days = config.CHECKPOINT_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    if not max_age_days or not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age_days * 86400
+    for name in os.listdir(root):
+        directory = os.path.join(root, name)
+        try:
+            if os.path.getmtime(directory) < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+                logger.debug("已清理过期检查点: %s", name)
+        except OSError:
+            continue
+
+
+def open_checkpoint(input_path, command, plan, imposition):
+    """
+    一次并行折叠排版的检查点
+
+    :param input_path: 输入文件
+    :param command: 命令 (处理步骤), 同一输入的不同命令使用不同的检查点
+    :param plan: chunking.plan_chunks 的返回值
+    :param imposition: 已检查过的 ImpositionPlan
+    :return: ChunkCheckpoint; 未启用或不分段时为 None
+    """
+    if not config.CHECKPOINT_ENABLED or not plan.parallel:
+        return None
+    root = checkpoint_root()
+    prune_checkpoints(root)
+    try:
+        key = checkpoint_key(input_path, command, plan, imposition)
+    except OSError as e:
+        logger.warning("无法创建检查点: %s", e)
+        return None
+    checkpoint = ChunkCheckpoint(os.path.join(root, key), input_path, command, len(plan.jobs))
+    if checkpoint.done:
+        logger.info("从检查点恢复 %d/%d 个分段: %s",
+                    len(checkpoint.done), len(plan.jobs), checkpoint.name)
+    return checkpoint
@@ -0,0 +1,151 @@
+"""
+自适应分段 (Adaptive chunk sizing)
+
+根据页数、平均每页字节数和CPU核数决定折叠排版的工作进程数和每个任务的页数。
+
+注意两种模式的区别:
+    - 折叠模式: config.NORMAL_PAGE_SPLIT 是一个"册子"(独立折叠装订的一叠纸)的页数,
+      改变它会改变输出结果, 因此这里不改变册子大小, 只决定每个任务包含几个册子。
+    - 不折叠模式: 页面按顺序两两合并, 分段方式不影响结果, 任务页数可以自由选择
+      (保持为4的整数倍)。
+
+每次的决策都会记录到日志和 logs/chunk_plans.jsonl 中, 方便调优。
+"""
+
+import os
+import json
+import math
+import logging
+
+import config
+from logger import log_dir
+
+logger = logging.getLogger(__name__)
+
+# 册子/签名对齐单位
+SIGNATURE_PAGES = 4
+
+
+class ChunkPlan:
+    """一次折叠排版的分段决策"""
+
+    def __init__(self, total_pages, avg_page_bytes, cpu_count, workers, chunk_pages, jobs, reasons):
+        self.total_pages = total_pages
+        self.avg_page_bytes = avg_page_bytes
+        self.cpu_count = cpu_count
+        self.workers = workers
+        self.chunk_pages = chunk_pages
+        # 每个任务是若干个 (start_page, one_side_phy_page_num) 分段
+        self.jobs = jobs
+        self.reasons = reasons
+
+    @property
+    def parallel(self):
+        return self.workers > 1 and len(self.jobs) > 1
+
+    def as_dict(self):
+        return {
+            "total_pages": self.total_pages,
+            "avg_page_bytes": self.avg_page_bytes,
+            "cpu_count": self.cpu_count,
+            "workers": self.workers,
+            "chunk_pages": self.chunk_pages,
+            "jobs": len(self.jobs),
+            "job_pages": [sum(n * 2 for _, n in job) for job in self.jobs],
+            "reasons": self.reasons,
+        }
+
+
+def _round_up(value, unit):
+    return max(unit, int(math.ceil(value / unit)) * unit)
+
+
+def _group_parts(parts, chunk_pages):
+    """把连续的分段合并成任务, 每个任务约 chunk_pages 页"""
+    jobs, current, current_pages = [], [], 0
+    for part in parts:
+        part_pages = part[1] * 2
+        if current and current_pages + part_pages > chunk_pages:
+            jobs.append(current)
+            current, current_pages = [], 0
+        current.append(part)
+        current_pages += part_pages
+    if current:
+        jobs.append(current)
+    return jobs
+
+
+def plan_chunks(total_pages, parts, no_folding=False, avg_page_bytes=0,
+                cpu_count=None, workers=None, chunk_pages=None):
+    """
+    决定工作进程数和分段方式
+
+    :param total_pages: 总页数 (已补齐为4的整数倍)
+    :param parts: folding_parts 的返回值 (折叠模式下每个分段是一个册子)
+    :param no_folding: 是否为不折叠模式
+    :param avg_page_bytes: 平均每页字节数, 用于限制单个任务的内存
+    :param cpu_count: CPU核数, 默认 os.cpu_count()
+    :param workers: 强制指定工作进程数 (默认 config.CHUNK_WORKERS)
+    :param chunk_pages: 强制指定每个任务的页数 (默认 config.CHUNK_PAGES)
+    :return: ChunkPlan
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    workers = workers if workers is not None else config.CHUNK_WORKERS
+    chunk_pages = chunk_pages if chunk_pages is not None else config.CHUNK_PAGES
+    reasons = []
+
+    # 折叠模式下任务必须由完整的册子组成
+    unit = SIGNATURE_PAGES
+    if not no_folding and len(parts) > 1:
+        unit = max(unit, parts[0][1] * 2)
+
+    if workers:
+        reasons.append(f"workers overridden to {workers}")
+    elif total_pages < config.MIN_PARALLEL_PAGES:
+        workers = 1
+        reasons.append(f"{total_pages} pages < MIN_PARALLEL_PAGES, run in-process")
+    else:
+        workers = cpu_count
+        reasons.append(f"using {cpu_count} cores")
+
+    if chunk_pages:
+        chunk_pages = _round_up(chunk_pages, unit)
+        reasons.append(f"chunk_pages overridden, rounded to {chunk_pages}")
+    elif workers <= 1:
+        chunk_pages = _round_up(total_pages, unit)
+    else:
+        # 每个进程分到几个任务, 保证负载均衡, 同时避免任务过多带来的开销
+        target_jobs = workers * config.TARGET_JOBS_PER_WORKER
+        chunk_pages = _round_up(total_pages / target_jobs, unit)
+        chunk_pages = max(chunk_pages, _round_up(config.MIN_CHUNK_PAGES, unit))
+        if avg_page_bytes:
+            # 限制单个任务的数据量
+            max_pages = _round_up(config.MAX_CHUNK_BYTES / avg_page_bytes, unit)
+            if chunk_pages > max_pages:
+                chunk_pages = max_pages
+                reasons.append(f"chunk limited to {max_pages} pages by MAX_CHUNK_BYTES")
+        reasons.append(f"{target_jobs} target jobs -> {chunk_pages} pages per job")
+
+    if no_folding:
+        # 不折叠模式下分段不影响结果, 直接按 chunk_pages 切分
+        jobs = [[(start, min(chunk_pages, total_pages - start + 1) // 2)]
+                for start in range(1, total_pages + 1, chunk_pages)]
+    else:
+        jobs = _group_parts(parts, chunk_pages)
+
+    workers = max(1, min(workers, len(jobs)))
+    plan = ChunkPlan(total_pages, avg_page_bytes, cpu_count, workers, chunk_pages, jobs, reasons)
+    record_chunk_plan(plan)
+    return plan
+
+
+def record_chunk_plan(plan):
+    """记录分段决策"""
+    record = plan.as_dict()
+    logger.info("分段决策: %d 个任务, %d 个进程, 每个任务 %d 页",
+                len(plan.jobs), plan.workers, plan.chunk_pages)
+    try:
+        with open(os.path.join(log_dir(), "chunk_plans.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning("无法记录分段决策: %s", e)
@@ -0,0 +1,113 @@
+"""
+虚拟填充页 (Filler pages)
+
+页数需要补齐 (4 的整数倍、整张输出页) 时插入的 "Page for blank." 页面。
+填充页只是占位对象, 排版时以共享的 Form XObject 放到输出页上, 不需要渲染,
+也不需要写出临时文件。
+"""
+
+from pypdf import PageObject
+from pypdf.generic import DictionaryObject, NameObject, RectangleObject
+from reportlab.pdfbase import pdfmetrics
+
+from .xobject import form_xobject, place_xobject, register_object
+
+
+# 填充页上的文字和 XObject 资源名
+FILLER_TEXT = "Page for blank."
+FILLER_FONT_SIZE = 12
+FILLER_XOBJECT_NAME = "/TxFill"
+
+
+class FillerPage:
+    """
+    虚拟填充页 ("Page for blank.")
+
+    不是真实的页面对象, 只记录尺寸。排版时以 Form XObject 的形式放到输出页上,
+    同一个输出文档 (PdfWriter) 中所有填充页共用一个 XObject, 只注册一次。
+    提供 cropbox / mediabox 属性, 排版代码可以像普通页面一样读取尺寸。
+    """
+
+    def __init__(self, page_width, page_height):
+        self.cropbox = RectangleObject([0, 0, page_width, page_height])
+        self.mediabox = self.cropbox
+        # [(writer, XObject 引用)]
+        self._registered = []
+
+    def __getstate__(self):
+        # 传给工作进程时不带已注册的 writer
+        return {"cropbox": list(self.cropbox)}
+
+    def __setstate__(self, state):
+        self.__init__(*state["cropbox"][2:])
+
+    def _content(self):
+        page_width = float(self.cropbox.width)
+        page_height = float(self.cropbox.height)
+        # 与原来 reportlab 绘制的位置相同: 水平居中, 基线在页面中线
+        text_width = pdfmetrics.stringWidth(FILLER_TEXT, "Helvetica", FILLER_FONT_SIZE)
+        text_x = (page_width - text_width) / 2
+        text_y = page_height / 2
+        return (f"BT /F1 {FILLER_FONT_SIZE} Tf 1 0 0 1 {text_x:.4f} {text_y:.4f} Tm "
+                f"({FILLER_TEXT}) Tj ET").encode()
+
+    def xobject(self, writer=None):
+        """填充内容的 Form XObject, 每个 writer 只注册一次"""
+        for registered_writer, ref in self._registered:
+            if registered_writer is writer:
+                return ref
+        font = DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+            NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+        })
+        resources = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+        ref = register_object(form_xobject(self._content(), self.cropbox, resources), writer)
+        if writer is not None:
+            self._registered.append((writer, ref))
+        return ref
+
+    def to_page(self, writer=None):
+        """生成真实的填充页 (需要单独输出填充页时使用)"""
+        page = PageObject.create_blank_page(
+            None, width=float(self.cropbox.width), height=float(self.cropbox.height))
+        place_xobject(page, FILLER_XOBJECT_NAME, self.xobject(writer), (1, 0, 0, 1, 0, 0))
+        return page
+
+
+def as_real_page(page, writer=None):
+    """把虚拟填充页转换为真实页面, 其他页面原样返回"""
+    if isinstance(page, FillerPage):
+        return page.to_page(writer)
+    return page
+
+
+def pad_pages(pages, num_blank_pages):
+    """
+    向页面序列添加指定数量的填充页
+
+    剥离最后一页, 确保变换后最后一页仍然是最后一页。
+    填充页是虚拟的占位对象 (FillerPage), 所有位置共用同一个,
+    不需要渲染, 也不需要写出临时文件。
+
+    :param pages: 源页面序列
+    :param num_blank_pages: 需要添加的填充页数量
+    :return: 新的页面列表
+    """
+    pages = list(pages)
+    if num_blank_pages <= 0:
+        return pages
+
+    # 获取页面尺寸
+    if pages:
+        page_width = pages[0].cropbox.width         # pylint: disable=E1101
+        page_height = pages[0].cropbox.height       # pylint: disable=E1101
+    else:
+        page_width = 595  # A4宽度
+        page_height = 842  # A4高度
+
+    filler = FillerPage(page_width, page_height)
+    return pages[:-1] + [filler] * num_blank_pages + pages[-1:]
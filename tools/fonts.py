@@ -0,0 +1,199 @@
+"""
+字体注册表 (Font registry)
+
+页码字体在进程内只查找、解析和注册一次, 之后所有文档共用:
+
+- font_search_path()  字体目录: config.FONT_SEARCH_PATH、当前目录, 以及
+  Windows / Linux (fontconfig) / macOS 的系统字体目录; 子目录也会被搜索
+- register_font()     按文件名找到 TTF 并注册到 reportlab (每个字体一次)
+- string_width()      页码只用到数字、空格和 "/", 这些字符的宽度按字体缓存,
+  计算结果与 pdfmetrics.stringWidth 完全相同
+- subset_font()       只包含页码字符的子集字体对象, 每个进程只生成和解析一次,
+  嵌入到输出文档中的只是这个子集, 而不是完整的 TTF
+
+用法::
+
+    font_name = page_number_font()
+    width = string_width("12 / 80", font_name, 10.8)
+"""
+
+import io
+import os
+import sys
+import logging
+import functools
+
+from pypdf import PdfReader
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# 页码只会用到这些字符
+NUMBER_GLYPHS = "0123456789 /"
+
+# 找不到 TTF 时使用的标准字体 (不需要嵌入)
+FALLBACK_FONT = "Helvetica"
+
+
+def system_font_dirs():
+    """当前平台的系统字体目录"""
+    home = os.path.expanduser("~")
+    if sys.platform.startswith("win"):
+        windir = os.environ.get("WINDIR", r"C:\Windows")
+        return [os.path.join(windir, "Fonts"), r"C:\Windows\Fonts", r"D:\Windows\Fonts",
+                os.path.join(os.environ.get("LOCALAPPDATA", home), "Microsoft", "Windows", "Fonts")]
+    if sys.platform == "darwin":
+        return [os.path.join(home, "Library", "Fonts"), "/Library/Fonts",
+                "/System/Library/Fonts", "/System/Library/Fonts/Supplemental"]
+    # fontconfig 的默认目录
+    data_home = os.environ.get("XDG_DATA_HOME", os.path.join(home, ".local", "share"))
+    return [os.path.join(data_home, "fonts"), os.path.join(home, ".fonts"),
+            "/usr/local/share/fonts", "/usr/share/fonts"]
+
+
+def font_search_path():
+    """按优先级排列的字体目录 (config.FONT_SEARCH_PATH 优先)"""
+    dirs = list(config.FONT_SEARCH_PATH or []) + [os.getcwd()] + system_font_dirs()
+    seen, result = set(), []
+    for folder in dirs:
+        folder = os.path.abspath(os.path.expanduser(folder))
+        if folder not in seen and os.path.isdir(folder):
+            seen.add(folder)
+            result.append(folder)
+    return result
+
+
+@functools.lru_cache(maxsize=None)
+def _folder_index(folder):
+    """目录 (含子目录) 中的字体文件: 小写文件名 -> 路径, 每个目录只扫描一次"""
+    index = {}
+    for root, _, files in os.walk(folder):
+        for file in files:
+            if file.lower().endswith((".ttf", ".otf", ".ttc")):
+                index.setdefault(file.lower(), os.path.join(root, file))
+    return index
+
+
+@functools.lru_cache(maxsize=None)
+def find_font_file(filename):
+    """
+    在字体搜索路径中查找字体文件
+
+    :param filename: 文件名或路径
+    :return: 找到的路径, 找不到时为 None
+    """
+    if os.path.isfile(filename):
+        return filename
+    for folder in font_search_path():
+        # 先看目录本身, 再查子目录的索引
+        path = os.path.join(folder, filename)
+        if os.path.isfile(path):
+            return path
+        path = _folder_index(folder).get(filename.lower())
+        if path:
+            return path
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def register_font(font_name, filenames):
+    """
+    注册 TTF 字体 (每个进程每个字体只解析一次)
+
+    :param filenames: 依次尝试的文件名元组
+    :return: 注册成功时为 font_name, 否则为 None
+    """
+    for filename in filenames:
+        path = find_font_file(filename)
+        if path is None:
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont(font_name, path))
+            logger.debug("Registered font %s from %s", font_name, path)
+            return font_name
+        except Exception as e:  # pylint: disable=W0718
+            logger.warning("无法加载字体 %s: %s", path, e)
+    return None
+
+
+def page_number_font_file():
+    """纯文字页码使用的字体文件 (绝对路径, 与当前目录等搜索路径有关), 找不到时为 None"""
+    for filename in config.PAGE_NUMBER_FONT_FILES:
+        path = find_font_file(filename)
+        if path is not None:
+            return os.path.abspath(path)
+    return None
+
+
+def page_number_font():
+    """纯文字页码使用的字体名 (config.PAGE_NUMBER_FONT_FILES), 找不到时回退为 Helvetica"""
+    return register_font(config.PAGE_NUMBER_FONT_NAME,
+                         tuple(config.PAGE_NUMBER_FONT_FILES)) or FALLBACK_FONT
+
+
+@functools.lru_cache(maxsize=None)
+def glyph_widths(font_name, glyphs=NUMBER_GLYPHS):
+    """
+    字符宽度 (字体单位, 1000 为一个字号) 和字体类型, 按字体缓存
+
+    :return: ({字符: 宽度}, 是否为 TTF)
+    """
+    font = pdfmetrics.getFont(font_name)
+    if isinstance(font, TTFont):
+        char_widths, default = font.face.charWidths, font.face.defaultWidth
+        return {c: char_widths.get(ord(c), default) for c in glyphs}, True
+    return {c: font.widths[ord(c)] for c in glyphs}, False
+
+
+def string_width(text, font_name, size):
+    """
+    文字宽度, 与 pdfmetrics.stringWidth 的结果完全相同
+
+    只包含缓存字符的文字直接查表, 其他文字交给 pdfmetrics。
+    """
+    widths, ttf = glyph_widths(font_name)
+    try:
+        total = sum([widths[c] for c in text])
+    except KeyError:
+        return pdfmetrics.stringWidth(text, font_name, size)
+    # 与 reportlab 的计算顺序一致, 保证浮点结果相同
+    return 0.001 * size * total if ttf else total * 0.001 * size
+
+
+@functools.lru_cache(maxsize=None)
+def subset_font_pdf(font_name, glyphs=NUMBER_GLYPHS):
+    """
+    用 reportlab 生成一份只包含 glyphs 的文档, 得到子集化嵌入的字体
+
+    reportlab 的 TTF 子集中 ASCII 字符的编码与自身相同,
+    因此之后可以直接用普通 ASCII 字符串引用该字体。
+    """
+    packet = io.BytesIO()
+    c = canvas.Canvas(packet, pagesize=(100, 100))
+    c.setFont(font_name, 10)
+    c.drawString(0, 0, glyphs)
+    c.save()
+    return packet.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def subset_font(font_name, glyphs=NUMBER_GLYPHS):
+    """
+    子集字体的字体字典 (每个进程只解析一次, 导入到各输出文档时复制)
+
+    reportlab 生成的页面上还有默认的 /F1 (Helvetica), 这里按 /BaseFont
+    找到 TTF 的子集 (形如 /AAAAAA+<字体名>)。
+    """
+    face_name = pdfmetrics.getFont(font_name).face.name
+    if isinstance(face_name, bytes):
+        face_name = face_name.decode("latin-1")
+    page = PdfReader(io.BytesIO(subset_font_pdf(font_name, glyphs))).pages[0]
+    for font in page["/Resources"]["/Font"].values():
+        font = font.get_object()
+        if str(font.get("/BaseFont", "")).split("+", 1)[-1] == face_name:
+            return font
+    raise ValueError(f"字体 {font_name} 的子集没有出现在生成的文档中")
@@ -0,0 +1,147 @@
+"""
+页面几何缓存 (Page geometry)
+
+每个页面的 mediabox / cropbox 只读取一次。大多数文档只有一两种页面尺寸,
+因此尺寸和偏移完全相同的页面归为一组: 每页只在 array 中保存一个组号,
+每组保存一份 PageBox。排版用的变换矩阵也按组缓存, 同一组的页面放到同一个
+位置时直接复用计算好的矩阵, 不再为每次放置读取页面框并构建 Transformation。
+
+矩阵使用 PDF 的 (a, b, c, d, e, f) 形式, 可以直接用于 cm 指令,
+也可以用 Transformation(matrix) 交给 merge_transformed_page。
+"""
+
+from array import array
+from typing import NamedTuple
+
+
+class PageBox(NamedTuple):
+    """一个页面组的 mediabox 和 cropbox, 均为 (left, bottom, right, top)"""
+    media: tuple
+    crop: tuple
+
+    @property
+    def media_width(self):
+        return self.media[2] - self.media[0]
+
+    @property
+    def media_height(self):
+        return self.media[3] - self.media[1]
+
+    @property
+    def crop_width(self):
+        return self.crop[2] - self.crop[0]
+
+    @property
+    def crop_height(self):
+        return self.crop[3] - self.crop[1]
+
+
+def read_page_box(page):
+    """读取页面的 PageBox (只在第一次遇到该页时调用)"""
+    return PageBox(tuple(float(v) for v in page.mediabox), tuple(float(v) for v in page.cropbox))
+
+
+class PageGeometry:
+    """一组页面的尺寸缓存和按组缓存的变换矩阵"""
+
+    def __init__(self, pages):
+        """
+        :param pages: 页面序列 (PageObject 或 FillerPage), 每页的框在这里读取一次
+        """
+        # 页面 -> 组号
+        self.group_ids = array("i")
+        # 组号 -> PageBox
+        self.groups = []
+        self._group_index = {}
+        # (组号, 放置方式) -> 矩阵
+        self._matrices = {}
+        for page in pages:
+            box = read_page_box(page)
+            group = self._group_index.get(box)
+            if group is None:
+                group = self._group_index[box] = len(self.groups)
+                self.groups.append(box)
+            self.group_ids.append(group)
+
+    def __len__(self):
+        return len(self.group_ids)
+
+    def box(self, index):
+        """第 index 页的 PageBox"""
+        return self.groups[self.group_ids[index]]
+
+    def matrix(self, index, placement, build):
+        """
+        第 index 页按 placement 放置时的变换矩阵, 同组页面共用
+
+        :param placement: 可哈希的放置参数, 与页面尺寸一起决定矩阵
+        :param build: build(box, *placement) -> (a, b, c, d, e, f), 每组只调用一次
+        """
+        key = (self.group_ids[index], placement)
+        matrix = self._matrices.get(key)
+        if matrix is None:
+            matrix = self._matrices[key] = build(self.groups[key[0]], *placement)
+        return matrix
+
+
+# 旋转角度 (逆时针) -> 把 [0, w] x [0, h] 旋转后仍放在第一象限的矩阵
+ROTATIONS = (0, 90, 180, 270)
+
+
+def rotation_matrix(rotate, width, height):
+    """逆时针旋转 rotate 度, 旋转后的页面仍以原点为左下角"""
+    if rotate == 90:
+        return (0.0, 1.0, -1.0, 0.0, height, 0.0)
+    if rotate == 180:
+        return (-1.0, 0.0, 0.0, -1.0, width, height)
+    if rotate == 270:
+        return (0.0, -1.0, 1.0, 0.0, 0.0, width)
+    raise ValueError(f"Unsupported rotation: {rotate}")
+
+
+def rotated_size(width, height, rotate):
+    """旋转后的 (宽, 高)"""
+    return (height, width) if rotate in (90, 270) else (width, height)
+
+
+def _rotated_placement(left, bottom, width, height, rotate, scale, tx, ty):
+    """translate(-left, -bottom) -> 旋转 -> scale -> translate(tx, ty)"""
+    a, b, c, d, e, f = rotation_matrix(rotate, width, height)
+    return (a * scale, b * scale, c * scale, d * scale,
+            tx + scale * (e - a * left - c * bottom),
+            ty + scale * (f - b * left - d * bottom))
+
+
+def fit_height_matrix(box, x_offset, target_height, y_offset=0.0, rotate=0):
+    """
+    对折排版: 把 cropbox 移到原点, 高度差超过 1% 时缩放到目标高度, 再移到 (x_offset, y_offset)
+
+    不旋转时等价于 Transformation().translate(-left, -bottom).scale(s, s).translate(x_offset, y_offset)
+    """
+    left, bottom, right, top = box.crop
+    width, height = right - left, top - bottom
+    source_height = rotated_size(width, height, rotate)[1]
+    scale = 1.0
+    if abs(source_height - target_height) > target_height * 0.01:
+        scale = target_height / source_height
+    if rotate:
+        return _rotated_placement(left, bottom, width, height, rotate, scale, x_offset, y_offset)
+    # 写成减法, 原点在 0 时得到 0 而不是 -0
+    return (scale, 0.0, 0.0, scale, x_offset - left * scale, y_offset - bottom * scale)
+
+
+def fit_cell_matrix(box, cell_x, cell_y, cell_width, cell_height, rotate=0):
+    """
+    多联排版: 按 mediabox 等比缩放到格子内并居中 (可先逆时针旋转 rotate 度)
+
+    不旋转时等价于 Transformation().translate(-left, -bottom).scale(s, s).translate(tx, ty)
+    """
+    left, bottom, right, top = box.media
+    width, height = right - left, top - bottom
+    placed_width, placed_height = rotated_size(width, height, rotate)
+    scale = min(cell_width / placed_width, cell_height / placed_height)
+    tx = cell_x + (cell_width - placed_width * scale) / 2
+    ty = cell_y + (cell_height - placed_height * scale) / 2
+    if rotate:
+        return _rotated_placement(left, bottom, width, height, rotate, scale, tx, ty)
+    return (scale, 0.0, 0.0, scale, tx - left * scale, ty - bottom * scale)
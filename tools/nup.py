@@ -0,0 +1,308 @@
+"""
+多联排版引擎 (N-up imposition)
+
+把若干个源页面按网格放到一张输出页上, 对折排版 (two_page, 2 联) 和
+4 合 1 (four_paper) 都使用这里的实现:
+
+- 网格: 2 / 4 / 6 / 8 / 9 / 16 联, 见 GRIDS; 页面可以在格子内旋转
+- 页序: normal (顺序), booklet (按 config.NORMAL_PAGE_SPLIT 分成多个册子, 每个册子骑马钉),
+  saddle (整个文档一个骑马钉册子); 页序由 ImpositionPlan 一次算好
+- 输出页尺寸:
+    fit  - 输出页与源页面同样大, 页面等比缩小后居中放入格子 (讲义、4 合 1)
+    grow - 格子与基准页面同样大, 输出页按网格扩大, 高度不同的页面缩放到基准高度 (对折排版)
+
+每个格子的变换矩阵按页面尺寸组只计算一次 (geometry.PageGeometry),
+源页面包装为 Form XObject 后在所有输出页上复用 (xobject.PageXObjects)。
+
+用法::
+
+    nup_pdf("in.pdf", "out.pdf", n=8, order="normal", rotate="auto")
+"""
+
+import logging
+
+from pypdf import PageObject, Transformation
+
+import config
+from .filler import FILLER_XOBJECT_NAME, FillerPage, pad_pages
+from .geometry import (
+    ROTATIONS,
+    PageGeometry,
+    fit_cell_matrix,
+    fit_height_matrix,
+    rotated_size,
+)
+from .imposition_plan import (
+    BLANK,
+    ImpositionPlan,
+    folding_parts,
+    pad_to_sheets,
+    page_sequence,
+    parts_order,
+)
+from .pdf_source import open_pdf_source
+from .profiling import stage, timed_iter
+from .cancel import iter_cancellable
+from .progress import iter_progress
+from .streaming_writer import output_writer
+from .xobject import page_xobjects, place_xobject, resolve_backend
+
+logger = logging.getLogger(__name__)
+
+# 每张输出页的页数 -> (列, 行), 页面不旋转时的网格
+GRIDS = {2: (2, 1), 4: (2, 2), 6: (2, 3), 8: (2, 4), 9: (3, 3), 16: (4, 4)}
+NUP_ORDERS = ("normal", "booklet", "saddle")
+SHEET_MODES = ("fit", "grow")
+
+
+def cell_order(cols, rows, rotate=0):
+    """
+    格子的阅读顺序, 每个格子为 (列, 行), 行 0 在最上面
+
+    页面旋转后, 把输出页转回正向阅读时仍然是从左到右、从上到下;
+    因此骑马钉的左右两页始终位于阅读方向上的左边和右边。
+    """
+    if rotate == 90:
+        # 页面顶部朝左: 转回来后, 左边的列在上, 下面的行在左
+        return tuple((col, row) for col in range(cols) for row in reversed(range(rows)))
+    if rotate == 270:
+        return tuple((col, row) for col in reversed(range(cols)) for row in range(rows))
+    cells = tuple((col, row) for row in range(rows) for col in range(cols))
+    return cells[::-1] if rotate == 180 else cells
+
+
+class NupLayout:
+    """输出页的网格: 列数、行数、格子顺序、页面旋转和输出页尺寸的计算方式"""
+
+    def __init__(self, cols, rows, rotate=0, sheet="fit"):
+        if rotate not in ROTATIONS:
+            raise ValueError(f"Unsupported rotation: {rotate}")
+        if sheet not in SHEET_MODES:
+            raise ValueError(f"Unknown sheet mode: {sheet}")
+        self.cols = cols
+        self.rows = rows
+        self.rotate = rotate
+        self.sheet = sheet
+        self.cells = cell_order(cols, rows, rotate)
+
+    @property
+    def per_sheet(self):
+        return self.cols * self.rows
+
+    def sheet_size(self, geometry, indices):
+        """
+        一张输出页的尺寸
+
+        :param indices: 该页上实际放置的页码 (按格子顺序)
+        """
+        if self.sheet == "fit":
+            # 能容纳该页上所有源页面的最大尺寸
+            return (max(geometry.box(i).media_width for i in indices),
+                    max(geometry.box(i).media_height for i in indices))
+        # 以第一个页面的 cropbox 为基准格子
+        ref = geometry.box(indices[0])
+        width, height = rotated_size(ref.crop_width, ref.crop_height, self.rotate)
+        return width * self.cols, height * self.rows
+
+    def matrix(self, geometry, index, cell, sheet_width, sheet_height):
+        """第 index 页放到格子 cell 时的变换矩阵 (同尺寸组、同格子只计算一次)"""
+        col, row = cell
+        cell_width = sheet_width / self.cols
+        cell_height = sheet_height / self.rows
+        cell_x = col * cell_width
+        cell_y = (self.rows - 1 - row) * cell_height
+        if self.sheet == "fit":
+            return geometry.matrix(index, (cell_x, cell_y, cell_width, cell_height, self.rotate),
+                                   fit_cell_matrix)
+        return geometry.matrix(index, (cell_x, cell_height, cell_y, self.rotate), fit_height_matrix)
+
+    def __repr__(self):
+        return f"NupLayout({self.cols}x{self.rows}, rotate={self.rotate}, sheet={self.sheet!r})"
+
+
+def fit_scale(page_size, sheet_size, cols, rows, rotate):
+    """fit 模式下页面的缩放比例, 用于自动选择网格方向"""
+    width, height = rotated_size(*page_size, rotate)
+    return min(sheet_size[0] / cols / width, sheet_size[1] / rows / height)
+
+
+def choose_layout(n, page_size=None, rotate="auto", sheet="fit"):
+    """
+    选择网格
+
+    :param n: 每张输出页的页数 (GRIDS 的键)
+    :param page_size: 基准页面 (宽, 高), rotate="auto" 时使用
+    :param rotate: 0 / 90 / 180 / 270, 或 "auto": 在网格转置、页面旋转 90 度的组合中
+                   选择页面最大的一种 (fit 模式)
+    :return: NupLayout
+    """
+    if n not in GRIDS:
+        raise ValueError(f"Unsupported pages per sheet: {n} (choose from {sorted(GRIDS)})")
+    cols, rows = GRIDS[n]
+    if rotate != "auto":
+        return NupLayout(cols, rows, int(rotate), sheet)
+    if sheet != "fit" or not page_size:
+        return NupLayout(cols, rows, 0, sheet)
+
+    best, best_scale = (cols, rows, 0), fit_scale(page_size, page_size, cols, rows, 0)
+    for candidate in ((rows, cols, 90), (rows, cols, 0), (cols, rows, 90)):
+        scale = fit_scale(page_size, page_size, *candidate)
+        if scale > best_scale * 1.0001:
+            best, best_scale = candidate, scale
+    return NupLayout(*best, sheet)
+
+
+def nup_plan(page_count, layout, order="normal", split_page_num=None, source_pages=None):
+    """
+    多联排版的完整计划
+
+    :param page_count: 页数 (booklet / saddle 时已补齐为4的整数倍)
+    :param order: normal / booklet / saddle
+    :param split_page_num: booklet 每个册子的页数, 默认 config.NORMAL_PAGE_SPLIT
+    :return: ImpositionPlan
+    """
+    if order not in NUP_ORDERS:
+        raise ValueError(f"Unknown page order: {order}")
+    if order == "normal":
+        parts = []
+        slots = page_sequence(0, page_count)
+    else:
+        if layout.per_sheet % 2:
+            raise ValueError(f"{order} order needs an even number of pages per sheet")
+        if page_count % 4:
+            raise ValueError(f"{order} order needs a multiple of 4 pages, got {page_count}")
+        if order == "saddle":
+            parts = [(1, page_count // 2)]
+        else:
+            parts = folding_parts(page_count, split_page_num or config.NORMAL_PAGE_SPLIT)
+        # 每个骑马钉对页占相邻的两个格子
+        slots = parts_order(parts)
+    return ImpositionPlan(pad_to_sheets(slots, layout.per_sheet), page_count, parts,
+                          source_pages=source_pages, cells=layout.cells,
+                          mode=f"{layout.per_sheet}-up {order}")
+
+
+def place_page(target_page, source_page, matrix, xobjects=None, writer=None, isolate=False):
+    """
+    把一个源页面按变换矩阵放到输出页上
+
+    :param xobjects: PageXObjects (xobject 后端), None 时使用 merge_transformed_page
+    :param isolate: merge 后端先在一个干净的临时页面上做单次变换合并, 再覆盖到输出页,
+                    避免多个页面合并到同一页时互相影响 (原 4 合 1 的 "隔离-组合" 策略)
+    """
+    if isinstance(source_page, FillerPage):
+        # 填充页直接引用共享的 XObject
+        place_xobject(target_page, FILLER_XOBJECT_NAME, source_page.xobject(writer), matrix)
+    elif xobjects is not None:
+        # 源页面只包装一次, 这里只增加一条 cm + Do 指令
+        xobjects.place(target_page, source_page, matrix)
+    elif isolate:
+        temp_page = PageObject.create_blank_page(
+            width=target_page.mediabox.width, height=target_page.mediabox.height)
+        temp_page.merge_transformed_page(source_page, Transformation(matrix))
+        target_page.merge_page(temp_page)
+    else:
+        target_page.merge_transformed_page(source_page, Transformation(matrix))
+
+
+def iter_nup_sheets(pages, slots, layout, writer=None, backend=None, geometry=None, isolate=True):
+    """
+    按页序把页面放到输出页上, 逐张生成
+
+    :param pages: 源页面序列 (PageObject 或 FillerPage)
+    :param slots: 0-based 页码序列 (ImpositionPlan.slots), 每 layout.per_sheet 个一张;
+                  超出范围的页码和 BLANK 为空位
+    :param layout: NupLayout
+    :param writer: 输出文档, 填充页和源页面的 XObject 在其中只注册一次
+    :param backend: 排版后端 xobject / merge, 默认 config.IMPOSITION_BACKEND
+    :param geometry: pages 的 PageGeometry, 默认在这里读取
+    :param isolate: merge 后端是否使用 "隔离-组合" (见 place_page)
+    :return: 新生成的页面 (生成器), 全部为空位的输出页跳过
+    """
+    xobjects = page_xobjects(writer) if resolve_backend(backend) == "xobject" else None
+    # 每页的尺寸只读取一次, 同尺寸页面放到同一格子时复用矩阵
+    geometry = geometry if geometry is not None else PageGeometry(pages)
+    page_count = len(pages)
+    per_sheet = layout.per_sheet
+
+    for start in range(0, len(slots), per_sheet):
+        placements = [(cell, slot) for cell, slot in zip(layout.cells, slots[start:start + per_sheet])
+                      if slot != BLANK and 0 <= slot < page_count]
+        if not placements:
+            continue
+
+        width, height = layout.sheet_size(geometry, [slot for _, slot in placements])
+        if width <= 0 or height <= 0:
+            logger.warning("第 %d 张输出页的尺寸无效，跳过。", start // per_sheet + 1)
+            continue
+        sheet = PageObject.create_blank_page(None, width=width, height=height)
+
+        for cell, slot in placements:
+            try:
+                matrix = layout.matrix(geometry, slot, cell, width, height)
+                place_page(sheet, pages[slot], matrix, xobjects, writer, isolate)
+            except Exception as e:
+                logger.warning("放置第 %d 页到格子 %s 失败: %s", slot + 1, cell, e)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("输出页 %d: %s", start // per_sheet + 1, [slot + 1 for _, slot in placements])
+        yield sheet
+
+
+def prepare_nup(source, n=None, order=None, rotate=None, sheet="fit", split_page_num=None):
+    """
+    为一个输入文档准备多联排版 (不生成任何页面)
+
+    :param source: PdfSource
+    :return: (pages, geometry, layout, plan); booklet / saddle 时 pages 已补齐填充页
+    """
+    n = n or config.NUP_PAGES
+    order = order or config.NUP_ORDER
+    rotate = config.NUP_ROTATE if rotate is None else rotate
+    if order not in NUP_ORDERS:
+        raise ValueError(f"Unknown page order: {order}")
+
+    pages = source.pages
+    source_pages = source.page_count
+    geometry = source.geometry()
+    if order != "normal" and source_pages % 4:
+        pages = pad_pages(pages, 4 - source_pages % 4)
+        geometry = PageGeometry(pages)
+
+    ref = geometry.box(0) if len(geometry) else None
+    page_size = (ref.media_width, ref.media_height) if ref else None
+    layout = choose_layout(n, page_size, rotate, sheet)
+    plan = nup_plan(len(pages), layout, order, split_page_num, source_pages)
+    plan.validate(len(pages))
+    return pages, geometry, layout, plan
+
+
+def nup_pdf(input_pdf_path, output_pdf_path, n=None, order=None, rotate=None, sheet="fit",
+            split_page_num=None, backend=None):
+    """
+    多联排版
+
+    :param n: 每张输出页的页数 2/4/6/8/9/16, 默认 config.NUP_PAGES
+    :param order: normal / booklet / saddle, 默认 config.NUP_ORDER
+    :param rotate: 0/90/180/270/"auto", 默认 config.NUP_ROTATE
+    :param sheet: fit (输出页与源页面同样大) / grow (按网格扩大)
+    :param split_page_num: booklet 每个册子的页数, 默认 config.NORMAL_PAGE_SPLIT
+    :param backend: 排版后端 xobject / merge, 默认 config.IMPOSITION_BACKEND
+    :return: 输出页数
+    """
+    source = open_pdf_source(input_pdf_path)
+    if source.page_count == 0:
+        logger.warning("输入的PDF文件是空的。")
+        return 0
+
+    pages, geometry, layout, plan = prepare_nup(source, n, order, rotate, sheet, split_page_num)
+    logger.info("多联排版: %d 页, %s, %d 张输出页", source.page_count, layout, plan.sheet_count)
+
+    count = 0
+    with output_writer(output_pdf_path, source.size) as writer:
+        sheets = timed_iter(iter_nup_sheets(pages, plan.slots, layout, writer, backend, geometry),
+                            "merge", counter="sheets")
+        for page in iter_progress(iter_cancellable(sheets), "merge", plan.sheet_count):
+            with stage("write"):
+                writer.add_page(page)
+            count += 1
+    return count
@@ -0,0 +1,163 @@
+"""
+批量页码叠加层 (Overlay engine)
+
+原来每一页都要新建一个 reportlab Canvas, 序列化到 BytesIO, 再用 PdfReader
+解析一次。这里把整份文档的页码一次性画进同一个多页 reportlab 文档
+(不同尺寸的页面用 setPageSize 切换), 只解析一次, 然后按页取出叠加层。
+
+不随页码变化的部分会被缓存:
+    - 字体注册和数字宽度 (见 fonts.py, 每个进程只解析一次)
+    - 每种页面尺寸的样式计算 (字号、边距、圆心位置)
+    - 图形页码的圆圈, 每种尺寸/奇偶样式只画一次, 作为 reportlab Form 复用
+"""
+
+import io
+import math
+import functools
+from collections import namedtuple
+
+from pypdf import PdfReader
+from reportlab.pdfgen import canvas
+from reportlab.lib.colors import Color, black, white, gray, slategray
+
+from .fonts import string_width
+
+# A4 对角线参考
+REFERENCE_DIAGONAL = 1008.0
+
+SimpleNumberStyle = namedtuple(
+    "SimpleNumberStyle", ["font_size", "margin_right", "margin_bottom"])
+
+GraphNumberStyle = namedtuple(
+    "GraphNumberStyle", ["font_size", "line_width", "radius", "x_center", "y_center"])
+
+
+def page_size(page):
+    """读取页面 mediabox 尺寸 (float)"""
+    return float(page.mediabox.width), float(page.mediabox.height)
+
+
+@functools.lru_cache(maxsize=None)
+def simple_number_style(page_width, page_height, base_font_size=12, min_font_size=8, max_font_size=48):
+    """计算某一页面尺寸下的纯文字页码样式 (按尺寸缓存)"""
+    # 使用页面对角线长度作为衡量页面大小的指标
+    scale_factor = math.sqrt(page_width**2 + page_height**2) / REFERENCE_DIAGONAL
+
+    # 稍微调小一点基准字体，纯文字不需要太大
+    target_font_size = (base_font_size * 0.9) * scale_factor
+    final_font_size = max(min_font_size, min(target_font_size, max_font_size))
+
+    return SimpleNumberStyle(final_font_size, 20.0 * scale_factor, 15.0 * scale_factor)
+
+
+@functools.lru_cache(maxsize=None)
+def graph_number_style(page_width, page_height, base_font_size=12, min_font_size=8, max_font_size=48):
+    """计算某一页面尺寸下的图形页码样式 (按尺寸缓存)"""
+    scale_factor = math.sqrt(page_width**2 + page_height**2) / REFERENCE_DIAGONAL
+
+    target_font_size = base_font_size * scale_factor
+    final_font_size = max(min_font_size, min(target_font_size, max_font_size))
+
+    # 边距也应该根据页面大小进行缩放，并设置一个最小值
+    final_margin = max(15.0, 35.0 * scale_factor)
+    radius = final_font_size * 1.1
+
+    return GraphNumberStyle(
+        final_font_size,
+        1 * scale_factor,
+        radius,
+        page_width - final_margin - radius,
+        final_margin + radius,
+    )
+
+
+def _parse_overlays(packet):
+    packet.seek(0)
+    return list(PdfReader(packet).pages)
+
+
+def build_simple_number_overlays(page_sizes, font_name, base_font_size=12, min_font_size=8, max_font_size=48):
+    """
+    一次性生成所有页面的纯文字页码叠加层
+
+    :param page_sizes: 每页的 (width, height)
+    :param font_name: 已注册的字体名
+    :return: 与 page_sizes 一一对应的叠加层页面列表
+    """
+    total_pages = len(page_sizes)
+    if total_pages == 0:
+        return []
+
+    packet = io.BytesIO()
+    c = canvas.Canvas(packet)
+
+    # 设置颜色：黑色，50% 透明度
+    fill_color = Color(0, 0, 0, alpha=0.5)
+
+    for i, (page_width, page_height) in enumerate(page_sizes):
+        style = simple_number_style(page_width, page_height, base_font_size, min_font_size, max_font_size)
+        text_content = f"{i + 1} / {total_pages}"
+
+        c.setPageSize((page_width, page_height))
+        c.setFillColor(fill_color)
+        c.setFont(font_name, style.font_size)
+
+        # 获取文字宽度以实现右对齐
+        text_width = string_width(text_content, font_name, style.font_size)
+        c.drawString(page_width - style.margin_right - text_width, style.margin_bottom, text_content)
+        c.showPage()
+
+    c.save()
+    return _parse_overlays(packet)
+
+
+def build_graph_number_overlays(page_sizes, base_font_size=12, min_font_size=8, max_font_size=48):
+    """
+    一次性生成所有页面的图形页码叠加层
+
+    圆圈按 (页面尺寸, 奇偶) 只绘制一次并作为 Form 复用。
+
+    :param page_sizes: 每页的 (width, height)
+    :return: 与 page_sizes 一一对应的叠加层页面列表
+    """
+    if not page_sizes:
+        return []
+
+    font_name = "Helvetica-Bold"
+    packet = io.BytesIO()
+    c = canvas.Canvas(packet)
+    forms = {}
+
+    for i, (page_width, page_height) in enumerate(page_sizes):
+        page_num = i + 1
+        style = graph_number_style(page_width, page_height, base_font_size, min_font_size, max_font_size)
+
+        # --- 智能样式与自动反色 ---
+        is_odd_page = page_num % 2 != 0
+        if is_odd_page: # 奇数页：深色主题
+            bg_color, text_color, border_color = Color(0.2, 0.2, 0.2, alpha=0.9), white, slategray
+        else: # 偶数页：浅色主题
+            bg_color, text_color, border_color = Color(0.9, 0.9, 0.9, alpha=0.9), black, gray
+
+        c.setPageSize((page_width, page_height))
+
+        form_key = (page_width, page_height, is_odd_page)
+        form_name = forms.get(form_key)
+        if form_name is None:
+            form_name = f"pn{len(forms)}"
+            c.beginForm(form_name, 0, 0, page_width, page_height)
+            c.setFillColor(bg_color)
+            c.setStrokeColor(border_color)
+            c.setLineWidth(style.line_width) # 边框也缩放
+            c.circle(style.x_center, style.y_center, style.radius, stroke=1, fill=1)
+            c.endForm()
+            forms[form_key] = form_name
+        c.doForm(form_name)
+
+        c.setFillColor(text_color)
+        c.setFont(font_name, style.font_size)
+        c.drawCentredString(style.x_center, style.y_center - style.font_size * 0.35, f"{page_num}")
+        c.showPage()
+
+    c.save()
+    return _parse_overlays(packet)
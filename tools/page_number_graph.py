@@ -1,15 +1,59 @@
-import io
 import sys
-import math
 import logging
-from pypdf import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.colors import Color, black, white, gray, slategray
 
-# 配置日志记录器
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import config
+from .overlay import build_graph_number_overlays, page_size
+from .stamp import fast_stamp_graph
+from .profiling import count, timed
+from .cancel import iter_cancellable
+from .progress import iter_progress
+from .pdf_source import discard_pdf_source, open_pdf_source
+from .streaming_writer import StreamingPdfWriter, create_output_writer, save_output
+
 logger = logging.getLogger(__name__)
 
+@timed("overlay")
+def stamp_page_numbers_graph(
+    pages,
+    base_font_size: int = 12,
+    min_font_size: int = 8,
+    max_font_size: int = 48,
+    writer=None,
+    mode=None
+):
+    """
+    为页面序列添加设计感强的自适应页码, 直接修改传入的页面对象。
+
+    :param pages: 页面序列 (PageObject)
+    :param base_font_size: 在标准页面（如A4）上的基础字体大小。
+    :param min_font_size: 允许的最小字体大小。
+    :param max_font_size: 允许的最大字体大小。
+    :param writer: 输出文档; 快速模式需要在其中注册共享资源
+    :param mode: "fast" 直接写入内容流, "overlay" 合并叠加层; None 时使用 config.PAGE_NUMBER_MODE
+    :return: 添加页码后的页面列表
+    """
+    pages = list(pages)
+    if mode is None:
+        mode = config.PAGE_NUMBER_MODE
+    total_pages = len(pages)
+    count("stamped_pages", total_pages)
+
+    logger.info("开始为PDF添加自适应尺寸的页码，共 %d 页。", total_pages)
+
+    if mode == "fast" and writer is not None:
+        return fast_stamp_graph(pages, writer, base_font_size, min_font_size, max_font_size)
+
+    # 所有页码一次性画进同一个文档, 只解析一次
+    overlays = build_graph_number_overlays(
+        [page_size(page) for page in pages],
+        base_font_size, min_font_size, max_font_size)
+
+    for page, overlay in zip(iter_progress(iter_cancellable(pages), "overlay", total_pages), overlays):
+        page.merge_page(overlay)
+
+    return pages
+
+
 def add_page_numbers_graph(
     input_pdf_path: str,
     output_pdf_path: str,
@@ -27,87 +71,37 @@ def add_page_numbers_graph(
     :param max_font_size: 允许的最大字体大小。
     """
     try:
-        reader = PdfReader(input_pdf_path)
-        writer = PdfWriter()
-        total_pages = len(reader.pages)
-        
-        logger.info("开始为PDF添加自适应尺寸的页码，共 %d 页。", total_pages)
-
-        # 遍历原始PDF的每一页
-        for i, page in enumerate(reader.pages):
-            page_num = i + 1
-            
-            packet = io.BytesIO()
-            c = canvas.Canvas(packet, pagesize=page.mediabox.upper_right)
+        source = open_pdf_source(input_pdf_path)
+        writer = create_output_writer(output_pdf_path, source.size)
 
-            # --- 1. 动态尺寸计算 ---
-            page_width = float(page.mediabox.width)
-            page_height = float(page.mediabox.height)
-            
-            # 使用页面对角线长度作为衡量页面大小的稳健指标
-            page_diagonal = math.sqrt(page_width**2 + page_height**2)
-            
-            # 以 A4 纸的对角线长度 (约 1008.0) 作为参考基准
-            # US Letter 的对角线约为 1000.0，两者相近
-            reference_diagonal = 1008.0
-            
-            # 计算缩放因子
-            scale_factor = page_diagonal / reference_diagonal
-            
-            # 根据缩放因子计算最终字体大小，并限制在最小和最大值之间
-            target_font_size = base_font_size * scale_factor
-            final_font_size = max(min_font_size, min(target_font_size, max_font_size))
-
-            # 边距也应该根据页面大小进行缩放，并设置一个最小值
-            base_margin = 35.0
-            final_margin = max(15.0, base_margin * scale_factor)
-
-            # --- 2. 智能样式与自动反色 ---
-            is_odd_page = page_num % 2 != 0
-            if is_odd_page: # 奇数页：深色主题
-                bg_color, text_color, border_color = Color(0.2, 0.2, 0.2, alpha=0.9), white, slategray
-            else: # 偶数页：浅色主题
-                bg_color, text_color, border_color = Color(0.9, 0.9, 0.9, alpha=0.9), black, gray
-
-            # 3. 定义样式和位置 (所有尺寸都使用动态计算的值)
-            font_name = "Helvetica-Bold"
-            page_text = f"{page_num}"
-            
-            radius = final_font_size * 1.1 
-            
-            x_center = page_width - final_margin - radius
-            y_center = final_margin + radius
-            
-            # 4. 绘制图形
-            c.setFillColor(bg_color)
-            c.setStrokeColor(border_color)
-            c.setLineWidth(1 * scale_factor) # 边框也缩放
-            c.circle(x_center, y_center, radius, stroke=1, fill=1)
-            
-            c.setFillColor(text_color)
-            c.setFont(font_name, final_font_size)
-            c.drawCentredString(x_center, y_center - final_font_size * 0.35, page_text)
-            
-            # 5. 保存并合并
-            c.save()
-            packet.seek(0)
-            overlay_pdf = PdfReader(packet)
-            page.merge_page(overlay_pdf.pages[0])
-            writer.add_page(page)
-
-        with open(output_pdf_path, "wb") as f:
-            writer.write(f)
+        if isinstance(writer, StreamingPdfWriter):
+            # 流式输出: 直接在源页面上添加页码, 然后逐页写出
+            pages = stamp_page_numbers_graph(source.pages, base_font_size, min_font_size, max_font_size, writer=writer)
+            for page in iter_progress(iter_cancellable(pages), "write", len(pages)):
+                writer.add_page(page)
+            # 源页面已被修改, 不再复用
+            discard_pdf_source(input_pdf_path)
+        else:
+            pages = [writer.add_page(page) for page in source.pages]
+            stamp_page_numbers_graph(pages, base_font_size, min_font_size, max_font_size, writer=writer)
+
+        save_output(writer, output_pdf_path)
             
         logger.info("页码添加成功！已保存到文件：%s", output_pdf_path)
 
     except FileNotFoundError:
         logger.error("找不到输入文件 '%s'", input_pdf_path)
+        raise
     except Exception as e:
         logger.error("处理过程中发生错误：%s", e)
+        # 交给调用方 (如 batch_processor) 记录为失败
+        raise
 
 
 # --- 使用示例 ---
 if __name__ == "__main__":
+    # 单独运行时才配置日志输出 (作为模块导入时由程序统一配置)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     if len(sys.argv) != 3:
         logger.error("使用方法: python your_script_name.py <input.pdf> <output.pdf>")
     else:
@@ -0,0 +1,167 @@
+"""
+共享输入文档 (Shared PDF source)
+
+PdfReader(path) 会把整个文件读入内存中的 BytesIO。PdfSource 改为对输入文件做
+内存映射 (mmap), 交给 PdfReader 按需读取, xref 只解析一次:
+
+- page_count 优先读取页树根节点的 /Count, 不需要展开全部页面
+- geometry() 一次性读出所有页面的 mediabox / cropbox (见 geometry.PageGeometry)
+- pages 按需解析页面对象
+
+同一个命令内, 页数统计、分段规划和排版通过 open_pdf_source 共用同一个 PdfSource,
+文件不会被完整读取第二次。命令结束后调用 close_pdf_sources 释放映射
+(Windows 上映射中的文件不能被移动或删除)。
+
+已打开的文档按线程分别记录: 多个文件在同一进程的不同线程中处理时
+(见 worker_pool), 一个文件结束时不会关闭其他文件的映射。
+"""
+
+import os
+import mmap
+import atexit
+import logging
+import threading
+
+from pypdf import PdfReader
+
+from .geometry import PageGeometry
+from .profiling import count, stage
+
+logger = logging.getLogger(__name__)
+
+
+class PdfSource:
+    """内存映射的输入PDF"""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._file = open(path, "rb")  # pylint: disable=R1732
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # 空文件或不支持映射的文件系统, 直接从文件读取
+            self._map = None
+        with stage("parse"):
+            self.reader = PdfReader(self._map if self._map is not None else self._file)
+        self._geometry = None
+        count("input_bytes", self.size)
+
+    @property
+    def pages(self):
+        """页面对象 (按需解析)"""
+        return self.reader.pages
+
+    @property
+    def page_count(self):
+        """总页数; 页面尚未展开时直接读取页树的 /Count"""
+        if self.reader.flattened_pages is None:
+            try:
+                total = self.reader.trailer["/Root"]["/Pages"]["/Count"]
+                if isinstance(total, int) and total >= 0:
+                    return int(total)
+            except (KeyError, TypeError, AttributeError):
+                pass
+        return len(self.reader.pages)
+
+    def geometry(self):
+        """所有页面的尺寸 (PageGeometry), 只读取一次, 之后使用缓存"""
+        if self._geometry is None:
+            with stage("parse"):
+                self._geometry = PageGeometry(self.reader.pages)
+        return self._geometry
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # 仍有对象引用映射中的数据, 交给垃圾回收
+                logger.debug("mmap of %s still exported, leaving it open", self.path)
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# 每个线程: 绝对路径 -> ((大小, 修改时间), PdfSource)
+_local = threading.local()
+# 所有线程打开的文档, 用于退出时关闭
+_all_sources = set()
+_all_lock = threading.Lock()
+
+
+def _sources():
+    sources = getattr(_local, "sources", None)
+    if sources is None:
+        sources = _local.sources = {}
+    return sources
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def open_pdf_source(path):
+    """
+    打开 (或复用已打开的) 输入文档
+
+    文件大小或修改时间变化后重新打开。
+    """
+    key = os.path.abspath(path)
+    stamp = _stamp(path)
+    sources = _sources()
+    cached = sources.get(key)
+    if cached is not None:
+        if cached[0] == stamp:
+            return cached[1]
+        _close(cached[1])
+    source = PdfSource(path)
+    sources[key] = (stamp, source)
+    with _all_lock:
+        _all_sources.add(source)
+    return source
+
+
+def _close(source):
+    with _all_lock:
+        _all_sources.discard(source)
+    source.close()
+
+
+def discard_pdf_source(path):
+    """
+    不再复用该文档
+
+    在源页面对象上直接修改 (如添加页码) 的步骤结束后调用,
+    避免之后的命令读到被修改过的页面。
+    """
+    cached = _sources().pop(os.path.abspath(path), None)
+    if cached is not None:
+        _close(cached[1])
+
+
+def close_pdf_sources():
+    """关闭当前线程打开的输入文档 (每个命令或文件处理结束后调用)"""
+    sources = _sources()
+    while sources:
+        _, (_, source) = sources.popitem()
+        _close(source)
+
+
+def _close_all_sources():
+    with _all_lock:
+        sources = list(_all_sources)
+        _all_sources.clear()
+    for source in sources:
+        source.close()
+
+
+atexit.register(_close_all_sources)
@@ -0,0 +1,167 @@
+"""
+内存流水线 (In-memory pipeline)
+
+把 "加页码 -> 补空白页 -> 折叠排版" 等步骤串成一条流水线,
+各步骤之间直接传递 pypdf 的页面对象, 整个流程只在开始时解析一次输入,
+在结束时序列化一次输出, 不再写出 _temp.pdf / _temp_with_blanks.pdf 中间文件。
+大文件使用流式输出 (见 streaming_writer.output_writer), 折叠排版的结果边生成边写出。
+
+用法::
+
+    pipeline = PdfPipeline([
+        number_pages_simple(),
+        pad_to_multiple(4),
+        impose_for_folding(split_page_num=80),
+    ])
+    pipeline.run("in.pdf", "out.pdf")
+
+每个步骤 (stage) 都是一个可调用对象 ``stage(pages, context) -> pages``,
+接收页面列表并返回新的页面序列 (折叠排版返回生成器, 并设置 context.page_count)。
+"""
+
+import logging
+
+from .cancel import iter_cancellable
+from .checkpoint import open_checkpoint
+from .pdf_source import discard_pdf_source, open_pdf_source
+from .profiling import stage
+from .progress import iter_progress
+from .streaming_writer import output_writer
+from .page_number_simple import stamp_page_numbers_simple
+from .page_number_graph import stamp_page_numbers_graph
+from .two_page import (
+    as_real_page,
+    folding_plan,
+    impose_chunked,
+    pad_pages,
+    plan_folding,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineContext:
+    """流水线运行时的共享状态"""
+
+    def __init__(self, input_pdf_path, output_pdf_path):
+        self.input_pdf_path = input_pdf_path
+        self.output_pdf_path = output_pdf_path
+        # 最终输出文档 (run 中按输入大小创建), 快速盖章等步骤在其中注册共享资源
+        self.writer = None
+        # 源文档的原始页数 (补空白页之前)
+        self.source_page_count = 0
+        # 源文件大小, 用于估算平均每页字节数和选择流式输出
+        self.source_bytes = 0
+        # 最后一个步骤输出的页数 (返回生成器的步骤自己设置)
+        self.page_count = 0
+        # 由哪些步骤组成, 用于区分同一输入不同命令的检查点
+        self.command = ""
+        # 折叠排版步骤的分段检查点, 输出写完后删除
+        self.checkpoint = None
+
+
+class PdfPipeline:
+    """由若干个 stage 组成的 PDF 处理流水线"""
+
+    def __init__(self, stages=None):
+        self.stages = list(stages) if stages else []
+
+    def add_stage(self, stage):
+        """追加一个步骤, 返回自身以便链式调用"""
+        self.stages.append(stage)
+        return self
+
+    def process(self, pages, context):
+        """依次执行所有步骤, 返回最终的页面序列 (页数见 context.page_count)"""
+        pages = list(pages)
+        context.source_page_count = context.page_count = len(pages)
+        for stage in self.stages:
+            logger.debug("执行步骤: %s", getattr(stage, "__name__", stage))
+            pages = stage(pages, context)
+            if hasattr(pages, "__len__"):
+                context.page_count = len(pages)
+        return pages
+
+    def run(self, input_pdf_path, output_pdf_path):
+        """
+        解析一次输入, 执行全部步骤, 序列化一次输出
+
+        :param input_pdf_path: 输入PDF路径
+        :param output_pdf_path: 输出PDF路径
+        :return: 输出PDF路径
+        """
+        context = PipelineContext(input_pdf_path, output_pdf_path)
+        context.command = "+".join(getattr(stage, "__name__", str(stage)) for stage in self.stages)
+        source = open_pdf_source(input_pdf_path)
+        context.source_bytes = source.size
+        try:
+            # 出错或取消时删除不完整的输出
+            with output_writer(output_pdf_path, source.size) as writer:
+                context.writer = writer
+                pages = self.process(source.pages, context)
+                for page in iter_progress(iter_cancellable(pages), "write", context.page_count):
+                    with stage("write"):
+                        # 未经排版的虚拟填充页在这里才生成真实页面
+                        writer.add_page(as_real_page(page, writer))
+        finally:
+            # 步骤可能直接修改了源页面 (如添加页码), 失败或取消时也不再复用
+            discard_pdf_source(input_pdf_path)
+        if context.checkpoint is not None:
+            context.checkpoint.finish()
+
+        logger.info("流水线处理完成: '%s'", output_pdf_path)
+        return output_pdf_path
+
+
+def number_pages_simple(base_font_size=12, min_font_size=8, max_font_size=48):
+    """步骤: 添加简单页码 (current/total)"""
+    def stage(pages, context):
+        return stamp_page_numbers_simple(
+            pages, base_font_size, min_font_size, max_font_size, writer=context.writer)
+    stage.__name__ = "number_pages_simple"
+    return stage
+
+
+def number_pages_graph(base_font_size=12, min_font_size=8, max_font_size=48):
+    """步骤: 添加图形页码 (圆圈)"""
+    def stage(pages, context):
+        return stamp_page_numbers_graph(
+            pages, base_font_size, min_font_size, max_font_size, writer=context.writer)
+    stage.__name__ = "number_pages_graph"
+    return stage
+
+
+def pad_to_multiple(multiple=4):
+    """步骤: 用虚拟填充页把页数补齐到 multiple 的整数倍 (不生成中间文件)"""
+    def stage(pages, context):
+        remainder = len(pages) % multiple
+        if remainder == 0:
+            return pages
+        blank_pages_needed = multiple - remainder
+        logger.info("总页数不是%d的整数倍，需要添加 %d 个空白页", multiple, blank_pages_needed)
+        return pad_pages(pages, blank_pages_needed)
+    stage.__name__ = "pad_to_multiple"
+    return stage
+
+
+def impose_for_folding(split_page_num=80, no_folding=False, unipage=False):
+    """
+    步骤: 折叠排版, 每两页合并为一张
+
+    与 process_pdf_for_folding 使用相同的分段规则,
+    每个分段独立折叠, 按 chunking.plan_chunks 的决策并行处理, 结果按顺序拼接。
+    并行时完成的分段保存到检查点 (见 checkpoint.py)。
+    """
+    def stage(pages, context):
+        imposition = folding_plan(len(pages), split_page_num, no_folding, unipage,
+                                  source_pages=context.source_page_count)
+        imposition.validate(len(pages))
+        plan = plan_folding(pages, split_page_num, no_folding, unipage,
+                            source_bytes=context.source_bytes)
+        context.checkpoint = open_checkpoint(
+            context.input_pdf_path, context.command, plan, imposition)
+        context.page_count = imposition.sheet_count
+        return impose_chunked(pages, plan, imposition, writer=context.writer,
+                              checkpoint=context.checkpoint)
+    stage.__name__ = "impose_for_folding"
+    return stage
@@ -0,0 +1,335 @@
+"""
+性能分析 (Profiling)
+
+按文件、按阶段记录耗时和计数, 吞吐量下降时可以看出是哪个阶段变慢了:
+
+- parse      解析输入 (xref、页面尺寸) 和工作进程返回的分段结果
+- overlay    生成并添加页码
+- merge      排版: 把源页面放到输出页上 (包括源页面的按需解析)
+- write      输出: 添加输出页、序列化并写出文件
+- temp_io    与工作进程交换的中间数据 (分段的小PDF)
+- pool_wait  等待共享进程池 (排队、分段任务未完成)
+
+只在 file_profile() 内记录 (config.PROFILE 打开时由 batch_processor 为每个文件开启),
+否则 stage() / timed() / count() 几乎没有开销。同名阶段嵌套时只计外层一次。
+分段任务在工作进程中的耗时单独记在 workers 中 (多个进程的耗时之和)。
+
+config.PROFILE = "full" 时另外为每个文件运行 cProfile (.prof 文件和耗时最多的函数)
+和 tracemalloc (内存峰值; 同一进程中同时处理多个文件时为它们共同的峰值)。
+cProfile 本身会拖慢处理, 只看各阶段耗时时使用 "stages"。
+
+用法::
+
+    with stage("write"):
+        save_output(writer, path)
+    count("sheets")
+
+ProfileReport 把每个文件和整次运行的汇总写成 JSON lines (默认在 logs/ 下)。
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+import contextlib
+import functools
+
+import config
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("parse", "overlay", "merge", "write", "temp_io", "pool_wait")
+
+_local = threading.local()
+
+
+class StageRecord:
+    """一个文件的阶段耗时和计数"""
+
+    def __init__(self, label=""):
+        self.label = label
+        # 阶段名 -> [秒数, 次数]
+        self.stages = {}
+        # 工作进程中的阶段 (分段任务)
+        self.workers = {}
+        self.counters = {}
+        # 正在计时的阶段, 用于忽略嵌套的同名阶段
+        self.active = set()
+        self.peak_memory = None
+        self.cprofile = None
+        self.top = None
+
+    def add(self, name, seconds, calls=1, target=None):
+        entry = (self.stages if target is None else target).setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge_worker(self, data):
+        """合并工作进程返回的记录 (as_dict 的结果)"""
+        for name, entry in data["stages"].items():
+            self.add(name, entry["seconds"], entry["calls"], target=self.workers)
+        for name, value in data["counters"].items():
+            self.count(name, value)
+
+    def as_dict(self):
+        data = {"stages": _stage_dict(self.stages), "counters": dict(self.counters)}
+        if self.workers:
+            data["workers"] = _stage_dict(self.workers)
+        if self.peak_memory is not None:
+            data["peak_memory"] = self.peak_memory
+        if self.cprofile is not None:
+            data["cprofile"] = self.cprofile
+            data["top"] = self.top
+        return data
+
+
+def _stage_dict(stages):
+    return {name: {"seconds": round(seconds, 6), "calls": calls}
+            for name, (seconds, calls) in stages.items()}
+
+
+def current_record():
+    """当前线程正在记录的 StageRecord, 没有时为 None"""
+    return getattr(_local, "record", None)
+
+
+class _StageTimer:
+    __slots__ = ("name", "record", "start")
+
+    def __init__(self, name, record):
+        self.name = name
+        self.record = record
+        self.start = 0.0
+
+    def __enter__(self):
+        if self.name in self.record.active:
+            self.record = None
+        else:
+            self.record.active.add(self.name)
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.record is not None:
+            self.record.add(self.name, time.perf_counter() - self.start)
+            self.record.active.discard(self.name)
+
+
+def stage(name):
+    """给一个阶段计时的上下文管理器"""
+    record = current_record()
+    if record is None:
+        return contextlib.nullcontext()
+    return _StageTimer(name, record)
+
+
+def timed(name):
+    """装饰器: 整个函数调用计入阶段 name"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            record = current_record()
+            if record is None:
+                return function(*args, **kwargs)
+            with _StageTimer(name, record):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_iter(iterable, name, counter=None):
+    """
+    给生成器计时: 只计取下一项的时间, 不计调用方处理每一项的时间
+
+    :param counter: 同时按项计数的计数器名
+    """
+    record = current_record()
+    if record is None:
+        return iterable
+    return _timed_iter(iter(iterable), name, counter, record)
+
+
+def _timed_iter(iterator, name, counter, record):
+    while True:
+        with _StageTimer(name, record):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        if counter is not None:
+            record.count(counter)
+        yield item
+
+
+def count(name, value=1):
+    """计数器加 value (没有在记录时忽略)"""
+    record = current_record()
+    if record is not None:
+        record.count(name, value)
+
+
+def add_stage_time(profile, name, seconds):
+    """给已完成的记录 (as_dict 的结果) 加上一段阶段耗时, 如等待进程池"""
+    entry = profile["stages"].setdefault(name, {"seconds": 0.0, "calls": 0})
+    entry["seconds"] = round(entry["seconds"] + seconds, 6)
+    entry["calls"] += 1
+
+
+def profile_dir():
+    """分析结果的目录: config.PROFILE_DIR, 默认为程序目录下的 logs/"""
+    directory = config.PROFILE_DIR or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+@contextlib.contextmanager
+def file_profile(label):
+    """
+    为一个文件记录各阶段 (config.PROFILE 关闭时不记录, 得到 None)
+
+    :param label: 文件名, 用于 .prof 文件名
+    :return: StageRecord 或 None; 退出后才包含 cProfile 和内存峰值
+    """
+    if not config.PROFILE:
+        yield None
+        return
+    record = StageRecord(label)
+    previous, _local.record = current_record(), record
+    profiler = None
+    started_tracing = False
+    if config.PROFILE == "full":
+        # pylint: disable=C0415
+        import cProfile
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        _local.record = previous
+        if profiler is not None:
+            profiler.disable()
+            import tracemalloc  # pylint: disable=C0415
+            record.peak_memory = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+            _save_cprofile(record, profiler)
+
+
+def _save_cprofile(record, profiler):
+    """保存 .prof 文件, 并在记录中列出累计耗时最多的函数"""
+    import pstats  # pylint: disable=C0415
+    stem = re.sub(r"[^\w.-]+", "_", os.path.splitext(record.label)[0]) or "file"
+    path = os.path.join(profile_dir(), f"{time.strftime('%Y%m%d-%H%M%S')}-{stem}-{os.getpid()}.prof")
+    profiler.dump_stats(path)
+    stats = pstats.Stats(profiler).sort_stats("cumulative")
+    top = []
+    for func in stats.fcn_list[:config.PROFILE_TOP_FUNCTIONS]:
+        _, calls, tottime, cumtime, _ = stats.stats[func]
+        filename, line, name = func
+        top.append({"function": f"{os.path.basename(filename)}:{line}({name})", "calls": calls,
+                    "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)})
+    record.cprofile = path
+    record.top = top
+
+
+def call_recorded(function, *args, **kwargs):
+    """工作进程: 在一条新记录中运行 function, 返回 (结果, 记录)"""
+    record = StageRecord()
+    previous, _local.record = current_record(), record
+    try:
+        return function(*args, **kwargs), record.as_dict()
+    finally:
+        _local.record = previous
+
+
+def submit_recorded(pool, function, *args):
+    """提交任务; 正在记录时由工作进程记录各阶段, 用 recorded_result 取回"""
+    if current_record() is None:
+        return pool.submit(function, *args)
+    future = pool.submit(call_recorded, function, *args)
+    future.recorded = True
+    return future
+
+
+def recorded_result(future):
+    """submit_recorded 任务的结果, 工作进程的记录合并到当前记录"""
+    result = future.result()
+    if getattr(future, "recorded", False):
+        result, data = result
+        record = current_record()
+        if record is not None:
+            record.merge_worker(data)
+    return result
+
+
+class ProfileReport:
+    """
+    一次运行的分析摘要, 每个文件完成后写一行 JSON, 结束时写出整次运行的合计
+
+    每行都带有 "event": "file" 或 "run"。
+    """
+
+    def __init__(self, command, directory=None):
+        self.command = command
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(directory or profile_dir(), f"profile-{self.run_id}.jsonl")
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.workers = {}
+        self.counters = {}
+        self.files = 0
+        self.failed = 0
+        self.cached = 0
+        self._lock = threading.Lock()
+
+    def _write(self, data):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+    def add_file(self, result):
+        """记录一个 FileResult"""
+        profile = result.profile or {"stages": {}, "counters": {}}
+        accounted = sum(entry["seconds"] for entry in profile["stages"].values())
+        line = {"event": "file", "run": self.run_id, "command": self.command, "file": result.file,
+                "ok": result.ok, "cached": result.cached, "seconds": round(result.seconds, 6),
+                "unaccounted": round(max(0.0, result.seconds - accounted), 6)}
+        if result.error:
+            line["error"] = result.error
+        line.update(profile)
+        with self._lock:
+            self.files += 1
+            self.failed += not result.ok
+            self.cached += result.cached
+            for target, stages in ((self.stages, profile["stages"]),
+                                   (self.workers, profile.get("workers", {}))):
+                for name, entry in stages.items():
+                    total = target.setdefault(name, [0.0, 0])
+                    total[0] += entry["seconds"]
+                    total[1] += entry["calls"]
+            for name, value in profile["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self._write(line)
+
+    def close(self):
+        """写出整次运行的合计并记录到日志"""
+        seconds = time.perf_counter() - self.started
+        with self._lock:
+            self._write({"event": "run", "run": self.run_id, "command": self.command,
+                         "files": self.files, "failed": self.failed, "cached": self.cached,
+                         "seconds": round(seconds, 6), "stages": _stage_dict(self.stages),
+                         "workers": _stage_dict(self.workers), "counters": dict(self.counters)})
+        ranked = sorted(self.stages.items(), key=lambda item: item[1][0], reverse=True)
+        logger.info("Stage totals: %s", ", ".join(
+            f"{name} {total:.2f}s" for name, (total, _) in ranked) or "none")
+        logger.info("Profile summary written to %s", self.path)
@@ -0,0 +1,163 @@
+"""
+进度事件 (Progress events)
+
+处理函数在逐页/逐张的循环中报告进度, 订阅者 (GUI、命令行) 收到结构化的
+ProgressEvent, 不需要从日志文本中解析:
+
+- progress_scope(file)  batch_processor 为每个文件开启, 范围外的报告直接忽略
+- report_progress() / iter_progress()  报告 "阶段 已完成/总数"; 同一文件按
+  config.PROGRESS_INTERVAL 节流, 每个阶段的第一项和最后一项总会发出
+- set_progress_sink(fn)  本进程的订阅者, 在报告进度的线程中调用, 应尽快返回
+
+工作进程中的事件通过跨进程队列发回主进程 (见 worker_pool), 再交给主进程的订阅者。
+
+用法::
+
+    for page in iter_progress(pages, "overlay", len(pages)):
+        ...
+"""
+
+import time
+import logging
+import threading
+import contextlib
+from typing import NamedTuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressEvent(NamedTuple):
+    """一个文件 (或整个批次) 某个阶段的进度"""
+    file: str
+    # overlay / merge / write, 整个批次为 batch
+    stage: str
+    done: int
+    total: int
+    # 该阶段已用时间和预计剩余时间 (秒), 还无法估计时为 None
+    elapsed: float
+    eta: float | None
+    # 整个批次的事件: 该文件失败时的错误信息
+    error: str | None = None
+
+    @property
+    def fraction(self):
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+
+# 本进程的订阅者
+_sink = None
+_local = threading.local()
+# 工作进程发回事件的队列和转发线程
+_worker_queue = None
+_forwarder = None
+_forward_lock = threading.Lock()
+
+
+def set_progress_sink(sink):
+    """设置本进程的订阅者 fn(ProgressEvent), None 为取消, 返回原来的订阅者"""
+    global _sink  # pylint: disable=W0603
+    previous, _sink = _sink, sink
+    return previous
+
+
+def emit(event):
+    """把事件交给订阅者; 订阅者出错不影响处理"""
+    sink = _sink
+    if sink is None:
+        return
+    try:
+        sink(event)
+    except Exception as e:  # pylint: disable=W0718
+        logger.debug("Progress sink failed: %s", e)
+
+
+class _Scope:
+    def __init__(self, file):
+        self.file = file
+        # 阶段 -> [开始时间, 上次发出的时间]
+        self.stages = {}
+
+
+@contextlib.contextmanager
+def progress_scope(file):
+    """为一个文件开启当前线程的进度报告"""
+    previous = getattr(_local, "scope", None)
+    _local.scope = _Scope(file)
+    try:
+        yield
+    finally:
+        _local.scope = previous
+
+
+def make_event(file, stage, done, total, started, now=None, error=None):
+    """按已用时间估计剩余时间, 生成事件"""
+    now = time.monotonic() if now is None else now
+    elapsed = now - started
+    eta = elapsed * (total - done) / done if done and total else None
+    return ProgressEvent(file, stage, done, total, round(elapsed, 3),
+                         None if eta is None else round(eta, 3), error)
+
+
+def report_progress(stage, done, total):
+    """
+    报告当前文件 stage 阶段已完成 done / total (节流)
+
+    没有 progress_scope 或没有订阅者时几乎没有开销。
+    """
+    scope = getattr(_local, "scope", None)
+    if scope is None or _sink is None:
+        return
+    now = time.monotonic()
+    timing = scope.stages.get(stage)
+    if timing is None:
+        timing = scope.stages[stage] = [now, now]
+    elif done < total and now - timing[1] < config.PROGRESS_INTERVAL:
+        return
+    timing[1] = now
+    emit(make_event(scope.file, stage, done, total, timing[0], now))
+
+
+def iter_progress(iterable, stage, total):
+    """逐项报告进度的迭代器; 没有在报告进度时原样返回 iterable"""
+    if getattr(_local, "scope", None) is None or _sink is None:
+        return iterable
+    return _iter_progress(iterable, stage, total)
+
+
+def _iter_progress(iterable, stage, total):
+    report_progress(stage, 0, total)
+    done = 0
+    for item in iterable:
+        yield item
+        done += 1
+        report_progress(stage, done, total)
+
+
+def worker_progress_queue():
+    """
+    工作进程发回进度事件的队列 (传给进程池的 initializer)
+
+    第一次调用时创建, 并启动把事件交给本进程订阅者的转发线程。
+    """
+    global _worker_queue, _forwarder  # pylint: disable=W0603
+    with _forward_lock:
+        if _worker_queue is None:
+            import multiprocessing  # pylint: disable=C0415
+            # spawn 上下文的队列也可以传给 fork 的进程
+            _worker_queue = multiprocessing.get_context("spawn").Queue()
+            _forwarder = threading.Thread(target=_forward, args=(_worker_queue,),
+                                          name="progress-forwarder", daemon=True)
+            _forwarder.start()
+    return _worker_queue
+
+
+def _forward(events):
+    while True:
+        emit(ProgressEvent(*events.get()))
+
+
+def attach_worker_progress(events):
+    """工作进程: 事件放入 events 队列, 由主进程交给订阅者"""
+    set_progress_sink(lambda event: events.put(tuple(event)))
@@ -0,0 +1,197 @@
+"""
+页码快速盖章模式 (Fast stamp)
+
+不再生成叠加层 PDF 并调用 page.merge_page, 而是把文字和圆圈的绘图指令
+直接写成一个很小的内容流, 追加到每一页的 /Contents 末尾。
+字体和透明度 (ExtGState) 资源每个文档只注册一次, 各页共享同一个对象,
+每页只增加几百字节。
+
+页面原有内容被包在 q ... Q 中, 避免其图形状态影响页码的绘制,
+效果与 merge_page 相同。
+"""
+
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    FloatObject,
+    NameObject,
+)
+from reportlab.lib.colors import white, black, gray, slategray
+
+from .fonts import string_width, subset_font
+from .overlay import simple_number_style, graph_number_style, page_size
+from .cancel import iter_cancellable
+from .progress import iter_progress
+from .streaming_writer import import_object
+
+# 资源名使用统一前缀, 避免与页面已有资源冲突
+RESOURCE_PREFIX = "/TxPN"
+
+# 标准 14 字体不需要嵌入
+STANDARD_FONTS = {"Helvetica", "Helvetica-Bold", "Courier", "Times-Roman"}
+
+# 贝塞尔曲线近似圆的系数
+CIRCLE_KAPPA = 0.5522847498
+
+
+def _fmt(value):
+    return f"{value:.4f}".rstrip("0").rstrip(".")
+
+
+def _rgb(color):
+    return " ".join(_fmt(v) for v in (color.red, color.green, color.blue))
+
+
+def _circle_path(cx, cy, r):
+    k = CIRCLE_KAPPA * r
+    points = [
+        f"{_fmt(cx + r)} {_fmt(cy)} m",
+        f"{_fmt(cx + r)} {_fmt(cy + k)} {_fmt(cx + k)} {_fmt(cy + r)} {_fmt(cx)} {_fmt(cy + r)} c",
+        f"{_fmt(cx - k)} {_fmt(cy + r)} {_fmt(cx - r)} {_fmt(cy + k)} {_fmt(cx - r)} {_fmt(cy)} c",
+        f"{_fmt(cx - r)} {_fmt(cy - k)} {_fmt(cx - k)} {_fmt(cy - r)} {_fmt(cx)} {_fmt(cy - r)} c",
+        f"{_fmt(cx + k)} {_fmt(cy - r)} {_fmt(cx + r)} {_fmt(cy - k)} {_fmt(cx + r)} {_fmt(cy)} c",
+        "h",
+    ]
+    return "\n".join(points)
+
+
+class PageNumberStamper:
+    """
+    把页码绘图指令直接追加到页面内容流中
+
+    一个 stamper 对应一个输出文档 (PdfWriter), 共享资源只注册一次。
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self._fonts = {}
+        self._gstates = {}
+        self._open_ref = self._register_stream(b"q\n")
+
+    def _register(self, obj):
+        return self.writer._add_object(obj)  # pylint: disable=W0212
+
+    def _register_stream(self, data):
+        stream = DecodedStreamObject()
+        stream.set_data(data)
+        return self._register(stream)
+
+    def font(self, font_name):
+        """注册字体 (每个文档一次), 返回资源名和引用"""
+        if font_name not in self._fonts:
+            if font_name in STANDARD_FONTS:
+                font = DictionaryObject({
+                    NameObject("/Type"): NameObject("/Font"),
+                    NameObject("/Subtype"): NameObject("/Type1"),
+                    NameObject("/BaseFont"): NameObject("/" + font_name),
+                    NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+                })
+                ref = self._register(font)
+            else:
+                # 只嵌入页码字符的子集 (每个进程只生成一次, 见 fonts.subset_font)
+                ref = self._register(import_object(subset_font(font_name), self.writer))
+            self._fonts[font_name] = (f"{RESOURCE_PREFIX}F{len(self._fonts)}", ref)
+        return self._fonts[font_name]
+
+    def fill_alpha(self, alpha):
+        """注册填充透明度 ExtGState (每个文档一次), 返回资源名和引用"""
+        if alpha not in self._gstates:
+            gstate = DictionaryObject({
+                NameObject("/Type"): NameObject("/ExtGState"),
+                NameObject("/ca"): FloatObject(alpha),
+            })
+            self._gstates[alpha] = (f"{RESOURCE_PREFIX}G{len(self._gstates)}", self._register(gstate))
+        return self._gstates[alpha]
+
+    @staticmethod
+    def _add_resource(page, category, name, ref):
+        if "/Resources" not in page:
+            page[NameObject("/Resources")] = DictionaryObject()
+        resources = page["/Resources"].get_object()
+        if category not in resources:
+            resources[NameObject(category)] = DictionaryObject()
+        resources[category].get_object()[NameObject(name)] = ref
+
+    def stamp(self, page, operators, fonts=(), gstates=()):
+        """
+        追加一段绘图指令到页面
+
+        :param page: 页面对象
+        :param operators: 内容流指令 (str)
+        :param fonts: 用到的字体 [(资源名, 引用)]
+        :param gstates: 用到的 ExtGState [(资源名, 引用)]
+        """
+        for name, ref in fonts:
+            self._add_resource(page, "/Font", name, ref)
+        for name, ref in gstates:
+            self._add_resource(page, "/ExtGState", name, ref)
+
+        contents = page.get("/Contents")
+        if contents is None:
+            items = []
+        elif isinstance(contents.get_object(), ArrayObject):
+            items = list(contents.get_object())
+        else:
+            items = [contents if hasattr(contents, "idnum") else self._register(contents)]
+
+        stamp_ref = self._register_stream(("Q\nq\n" + operators + "\nQ\n").encode("latin-1"))
+        page[NameObject("/Contents")] = ArrayObject([self._open_ref, *items, stamp_ref])
+
+
+def fast_stamp_simple(pages, writer, font_name, base_font_size=12, min_font_size=8, max_font_size=48):
+    """快速模式: 添加半透明纯文字页码 (current/total)"""
+    stamper = PageNumberStamper(writer)
+    font = stamper.font(font_name)
+    gstate = stamper.fill_alpha(0.5)
+    total_pages = len(pages)
+
+    for i, page in enumerate(iter_progress(iter_cancellable(pages), "overlay", total_pages)):
+        page_width, page_height = page_size(page)
+        style = simple_number_style(page_width, page_height, base_font_size, min_font_size, max_font_size)
+        text_content = f"{i + 1} / {total_pages}"
+
+        # 右对齐
+        text_width = string_width(text_content, font_name, style.font_size)
+        x_pos = page_width - style.margin_right - text_width
+
+        operators = (
+            f"{gstate[0]} gs 0 0 0 rg\n"
+            f"BT {font[0]} {_fmt(style.font_size)} Tf 1 0 0 1 {_fmt(x_pos)} {_fmt(style.margin_bottom)} Tm "
+            f"({text_content}) Tj ET"
+        )
+        stamper.stamp(page, operators, [font], [gstate])
+    return pages
+
+
+def fast_stamp_graph(pages, writer, base_font_size=12, min_font_size=8, max_font_size=48):
+    """快速模式: 添加圆圈图形页码"""
+    font_name = "Helvetica-Bold"
+    stamper = PageNumberStamper(writer)
+    font = stamper.font(font_name)
+    gstate = stamper.fill_alpha(0.9)
+
+    for i, page in enumerate(iter_progress(iter_cancellable(pages), "overlay", len(pages))):
+        page_num = i + 1
+        page_width, page_height = page_size(page)
+        style = graph_number_style(page_width, page_height, base_font_size, min_font_size, max_font_size)
+
+        # 奇数页：深色主题; 偶数页：浅色主题
+        if page_num % 2 != 0:
+            bg_rgb, text_color, border_color = "0.2 0.2 0.2", white, slategray
+        else:
+            bg_rgb, text_color, border_color = "0.9 0.9 0.9", black, gray
+
+        page_text = f"{page_num}"
+        text_width = string_width(page_text, font_name, style.font_size)
+
+        operators = (
+            f"q {gstate[0]} gs {bg_rgb} rg {_rgb(border_color)} RG {_fmt(style.line_width)} w\n"
+            f"{_circle_path(style.x_center, style.y_center, style.radius)}\nB Q\n"
+            f"{_rgb(text_color)} rg\n"
+            f"BT {font[0]} {_fmt(style.font_size)} Tf 1 0 0 1 "
+            f"{_fmt(style.x_center - text_width / 2)} {_fmt(style.y_center - style.font_size * 0.35)} Tm "
+            f"({page_text}) Tj ET"
+        )
+        stamper.stamp(page, operators, [font], [gstate])
+    return pages
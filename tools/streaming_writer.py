@@ -0,0 +1,352 @@
+"""
+流式PDF输出 (Streaming writer)
+
+PdfWriter 在 write() 之前把整个输出文档保存在内存中, 内存随页数增长。
+StreamingPdfWriter 在每次 add_page 时立即把该页和它引用的、尚未写出的对象
+写入输出文件, 之后只保留对象编号, 最后在 close() 时写出页树、xref 和 trailer。
+
+- 被多页共享的对象 (字体、XObject、图像) 只写一次, 之后只引用编号
+- 来自输入文档 (PdfReader) 的对象直接写出, 不需要先 clone 到输出文档,
+  写出后从 reader 的对象缓存中释放
+- 提供 _add_object, 可以像 PdfWriter 一样注册共享资源 (快速盖章、填充页 XObject)
+- 链接目标等对输入页面的引用指向输出中的同一页; 没有写出的页面为 null,
+  不会把输入的页树复制到输出中
+
+因此峰值内存基本与页数无关。输入文件超过 config.STREAMING_MIN_BYTES 时
+(或 config.STREAMING_OUTPUT 为 True) 自动使用, 见 create_output_writer。
+"""
+
+import os
+import logging
+import contextlib
+from io import BytesIO
+from collections import deque
+
+from pypdf import PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    StreamObject,
+)
+
+import config
+from .profiling import count, current_record, timed
+
+logger = logging.getLogger(__name__)
+
+# 页面中指向原文档结构的键, 写出时丢弃 (页树由本类重新生成)
+PAGE_SKIP_KEYS = {"/Parent"}
+# 注释指回原页面的键
+ANNOT_SKIP_KEYS = {"/P"}
+
+CATALOG_NUMBER = 1
+PAGES_NUMBER = 2
+
+
+class StreamingPdfWriter:
+    """边处理边写出的PDF输出文档"""
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self._file = open(output_path, "wb")  # pylint: disable=R1732
+        self._offset = 0
+        # 对象编号 -> 文件偏移
+        self._offsets = {}
+        # 已分配编号但尚未写出的本文档对象
+        self._pending = {}
+        # (id(源文档), idnum, generation) -> 输出中的编号
+        self._imported = {}
+        self._next_number = PAGES_NUMBER + 1
+        self._page_numbers = []
+        # 被引用但尚未 (或永远不会) 作为页面写出的输入页面的编号
+        self._reserved_pages = set()
+        self._write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    # ---- 与 PdfWriter 兼容的接口 ----
+
+    def _add_object(self, obj):
+        """注册一个共享对象, 在第一次被某一页引用时写出"""
+        number = self._allocate()
+        self._pending[number] = obj
+        return IndirectObject(number, 0, self)
+
+    def get_object(self, indirect_reference):
+        number = indirect_reference if isinstance(indirect_reference, int) else indirect_reference.idnum
+        return self._pending.get(number)
+
+    @timed("write")
+    def add_page(self, page):
+        """
+        写出一页及其引用的所有新对象, 返回页面的对象编号
+
+        写出后页面对象不再被本类引用, 调用方释放后即可回收内存。
+        """
+        source = getattr(page, "indirect_reference", None)
+        number = None
+        if source is not None and source.pdf is not self:
+            # 其他对象 (如链接目标) 引用该页时指向同一个编号, 之前已被引用时沿用预留的编号
+            key = (id(source.pdf), source.idnum, source.generation)
+            number = self._imported.get(key)
+            if number in self._reserved_pages:
+                self._reserved_pages.discard(number)
+            else:
+                number = self._imported[key] = self._allocate()
+        if number is None:
+            number = self._allocate()
+        self._page_numbers.append(number)
+        self._write_objects(number, page, is_page=True)
+        return number
+
+    def close(self):
+        """写出页树、目录、xref 和 trailer"""
+        if self._file is None:
+            return
+        # 注册了但从未被引用的对象也写出, 保证 xref 完整
+        while self._pending:
+            number, obj = self._pending.popitem()
+            self._write_objects(number, obj)
+        # 引用了不在输出中的页面 (如指向未选用页面的链接目标)
+        for number in sorted(self._reserved_pages):
+            self._write_raw_object(number, b"null")
+        self._reserved_pages.clear()
+
+        kids = " ".join(f"{n} 0 R" for n in self._page_numbers)
+        self._write_raw_object(PAGES_NUMBER, (
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_numbers)} >>").encode())
+        self._write_raw_object(CATALOG_NUMBER, f"<< /Type /Catalog /Pages {PAGES_NUMBER} 0 R >>".encode())
+
+        xref_offset = self._offset
+        lines = [f"xref\n0 {self._next_number}\n", "0000000000 65535 f \n"]
+        for number in range(1, self._next_number):
+            offset = self._offsets.get(number)
+            lines.append(f"{offset:010d} 00000 n \n" if offset is not None else "0000000000 65535 f \n")
+        lines.append(f"trailer\n<< /Size {self._next_number} /Root {CATALOG_NUMBER} 0 R >>\n")
+        lines.append(f"startxref\n{xref_offset}\n%%EOF\n")
+        self._write("".join(lines).encode())
+        self._file.close()
+        self._file = None
+
+    def abort(self):
+        """出错时关闭并删除不完整的输出"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.output_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # ---- 内部实现 ----
+
+    def _allocate(self):
+        number = self._next_number
+        self._next_number += 1
+        return number
+
+    def _write(self, data):
+        self._file.write(data)
+        self._offset += len(data)
+
+    def _write_raw_object(self, number, body):
+        self._offsets[number] = self._offset
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def _write_objects(self, number, obj, is_page=False):
+        """写出一个对象以及它引用的所有尚未写出的对象"""
+        queue = deque([(number, obj, is_page)])
+        written_sources = []
+        while queue:
+            number, obj, is_page = queue.popleft()
+            refs = []
+            out = BytesIO()
+            self._serialize(obj, out, refs, top_level=True, is_page=is_page)
+            self._write_raw_object(number, out.getvalue())
+            for ref_number, ref_obj, source_key in refs:
+                queue.append((ref_number, ref_obj, False))
+                if source_key is not None:
+                    written_sources.append(source_key)
+        self._release(written_sources)
+
+    def _reference(self, ref, refs):
+        """把间接引用转换为输出中的编号, 新对象加入待写队列"""
+        if ref.pdf is self:
+            obj = self._pending.pop(ref.idnum, None)
+            if obj is not None:
+                refs.append((ref.idnum, obj, None))
+            return ref.idnum
+        key = (id(ref.pdf), ref.idnum, ref.generation)
+        number = self._imported.get(key)
+        if number is None:
+            number = self._allocate()
+            self._imported[key] = number
+            obj = ref.get_object()
+            if isinstance(obj, DictionaryObject) and obj.get("/Type") == "/Page":
+                # 输入页面只能通过 add_page 写出, 这里只预留编号;
+                # 按普通字典写出会经 /Parent 复制整个输入页树
+                self._reserved_pages.add(number)
+            else:
+                refs.append((number, obj, (ref.pdf, ref.generation, ref.idnum)))
+        return number
+
+    def _serialize(self, obj, out, refs, top_level=False, is_page=False):
+        if obj is None:
+            # 损坏的引用
+            out.write(b"null")
+
+        elif isinstance(obj, IndirectObject):
+            out.write(b"%d 0 R" % self._reference(obj, refs))
+
+        elif isinstance(obj, StreamObject):
+            if not top_level:
+                # 直接嵌套的流必须成为独立对象
+                number = self._allocate()
+                refs.append((number, obj, None))
+                out.write(b"%d 0 R" % number)
+                return
+            data = obj._data  # pylint: disable=W0212
+            self._serialize_dict(obj, out, refs, skip={"/Length"}, extra=b"/Length %d" % len(data))
+            out.write(b"\nstream\n")
+            out.write(data)
+            out.write(b"\nendstream")
+
+        elif isinstance(obj, DictionaryObject):
+            if is_page:
+                self._serialize_dict(obj, out, refs, skip=PAGE_SKIP_KEYS,
+                                     extra=b"/Parent %d 0 R" % PAGES_NUMBER)
+            else:
+                skip = ANNOT_SKIP_KEYS if obj.get("/Type") == "/Annot" else ()
+                self._serialize_dict(obj, out, refs, skip=skip)
+
+        elif isinstance(obj, ArrayObject):
+            out.write(b"[")
+            for index, item in enumerate(obj):
+                if index:
+                    out.write(b" ")
+                self._serialize(item, out, refs)
+            out.write(b"]")
+
+        else:
+            obj.write_to_stream(out)
+
+    def _serialize_dict(self, obj, out, refs, skip=(), extra=b""):
+        out.write(b"<<")
+        for key, value in obj.items():
+            if key in skip:
+                continue
+            NameObject(key).write_to_stream(out)
+            out.write(b" ")
+            self._serialize(value, out, refs)
+            out.write(b"\n")
+        out.write(extra)
+        out.write(b">>")
+
+    @staticmethod
+    def _release(sources):
+        """从输入文档的对象缓存中释放已写出的对象"""
+        for pdf, generation, idnum in sources:
+            cache = getattr(pdf, "resolved_objects", None)
+            if cache is not None:
+                cache.pop((generation, idnum), None)
+
+
+def release_source_object(ref, writer):
+    """
+    流式输出时, 内容已经复制走的输入对象可以从 reader 的缓存中释放
+
+    普通 PdfWriter 保留缓存, 避免重复解析。
+    """
+    if isinstance(writer, StreamingPdfWriter) and isinstance(ref, IndirectObject):
+        StreamingPdfWriter._release([(ref.pdf, ref.generation, ref.idnum)])  # pylint: disable=W0212
+
+
+def import_object(obj, writer):
+    """
+    把来自其他文档的对象引入输出文档
+
+    PdfWriter 需要 clone; StreamingPdfWriter 在写出时直接复制, 原样返回即可。
+    """
+    if isinstance(writer, PdfWriter):
+        return obj.clone(writer)
+    return obj
+
+
+def use_streaming_output(source_bytes=0):
+    """是否对该大小的输入使用流式输出"""
+    mode = config.STREAMING_OUTPUT
+    if mode == "auto":
+        return source_bytes >= config.STREAMING_MIN_BYTES
+    return bool(mode)
+
+
+def create_output_writer(output_path, source_bytes=0):
+    """
+    按输入大小选择输出文档: 大文件使用 StreamingPdfWriter, 其他使用 PdfWriter
+
+    :return: writer, 处理完成后调用 save_output(writer, output_path)
+    """
+    if use_streaming_output(source_bytes):
+        logger.info("使用流式输出: %s", output_path)
+        return StreamingPdfWriter(output_path)
+    return PdfWriter()
+
+
+@timed("write")
+def save_output(writer, output_path):
+    """完成输出: 流式输出写出 xref, 普通 PdfWriter 一次性写出整个文件"""
+    try:
+        if isinstance(writer, StreamingPdfWriter):
+            writer.close()
+        else:
+            with open(output_path, "wb") as f:
+                writer.write(f)
+    except BaseException:
+        abort_output(writer, output_path, written=True)
+        raise
+    if current_record() is not None:
+        count("output_bytes", os.path.getsize(output_path))
+
+
+def abort_output(writer, output_path, written=False):
+    """
+    处理失败或被取消: 关闭并删除不完整的输出
+
+    :param written: 普通 PdfWriter 已开始写出文件; 否则输出文件还没有被动过, 保留原样
+    """
+    if isinstance(writer, StreamingPdfWriter):
+        writer.abort()
+    elif written:
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+
+
+@contextlib.contextmanager
+def output_writer(output_path, source_bytes=0):
+    """
+    create_output_writer 和 save_output 的上下文管理器
+
+    正常退出时写出输出文件; 出错或被取消 (包括 JobCancelled) 时关闭并删除不完整的输出::
+
+        with output_writer(output_path, source.size) as writer:
+            for sheet in sheets:
+                writer.add_page(sheet)
+    """
+    writer = create_output_writer(output_path, source_bytes)
+    try:
+        yield writer
+    except BaseException:
+        abort_output(writer, output_path)
+        raise
+    save_output(writer, output_path)
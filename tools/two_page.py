@@ -1,16 +1,46 @@
 import os
 import logging
+import functools
 import concurrent.futures
 from io import BytesIO
 
 
-from pypdf import PdfReader, PdfWriter, Transformation
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
+from pypdf import PdfReader, PdfWriter
+
+from .cancel import (
+    CANCEL_POLL_INTERVAL,
+    JobCancelled,
+    cancel_requested,
+    cancel_scope,
+    current_token,
+    iter_cancellable,
+)
+from .checkpoint import open_checkpoint
+from .chunking import plan_chunks
+from .filler import (  # noqa: F401  填充页原来定义在这里, 保留导入路径
+    FILLER_FONT_SIZE,
+    FILLER_TEXT,
+    FILLER_XOBJECT_NAME,
+    FillerPage,
+    as_real_page,
+    pad_pages,
+)
+from .imposition_plan import (  # noqa: F401
+    ImpositionPlan,
+    fold_order,
+    folding_parts,
+    part_order,
+    parts_order,
+    print_order,
+    unipage_order,
+)
+from .nup import NupLayout, iter_nup_sheets
+from .pdf_source import discard_pdf_source, open_pdf_source
+from .profiling import count, recorded_result, stage, submit_recorded, timed, timed_iter
+from .progress import iter_progress, report_progress
+from .streaming_writer import output_writer
+from .worker_pool import worker_pool
 
-# 配置日志
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
@@ -21,10 +51,7 @@ def get_pdf_pages(pdf_path):
     :param pdf_path: PDF文件路径
     :return: PDF页数
     """
-    with open(pdf_path, 'rb') as file:
-        reader = PdfReader(file)
-        return len(reader.pages)
-    return None
+    return open_pdf_source(pdf_path).page_count
 
 
 INIT_PAGE = 4
@@ -42,12 +69,7 @@ def generate_print_page_numbers(init_page, pages, page_per_square=2, mode="first
     :return: 页码列表
     """
     offset = 0 if mode == "first" else 1
-    seperation = page_per_square
-    numbers = []
-    for i in range(init_page, init_page+pages*seperation, seperation):
-        numbers.append(i+offset)
-        numbers.append(i+1+offset)
-    return numbers
+    return print_order(init_page, pages, page_per_square, offset).tolist()
 
 
 FOLD_PAGE_PER_SQUARE = 2
@@ -63,226 +85,291 @@ def generate_fold_pages(start_page, pages_log, reverse=False, last_skip=False):
     :param last_skip: 是否跳过最后一页（如需空白页）
     :return: 页码列表
     """
-    total_physical_pages = pages_log * FOLD_PAGE_PER_SQUARE
-    numbers = []
-
-    for i in range(pages_log):
-        left = start_page + i
-        right = start_page + total_physical_pages - 1 - i
-
-        if (i % 2 == 0 and reverse) or (i % 2 == 1 and not reverse):
-            numbers.extend([left, right])
-        else:
-            numbers.extend([right, left])
-
-    if last_skip and numbers:
-        idx = 1 if reverse else 0
-        numbers[idx] = 0  # 0 表示空白页
-
-    return numbers
+    # 0 表示空白页
+    return fold_order(start_page, pages_log, reverse, last_skip, blank=0).tolist()
 
 
 def generate_unipage_pages(start_page, total_pages):
     """
     每四页变成4123排列
     """
-    output_pages = []
-    for i in range(total_pages):
-        output_pages.append(start_page + i*4 + 3)
-        output_pages.append(start_page + i*4)
-        output_pages.append(start_page + i*4 + 1)
-        output_pages.append(start_page + i*4 + 2)
-    return output_pages
+    return unipage_order(start_page, total_pages).tolist()
 
 
-def merge_pages_for_folding(input_pdf_path, output_pdf_path, start_page, total_pages, reverse=False, last_skip=False, no_folding=False, unipage=False):
+def folding_page_order(start_page, total_pages, reverse=False, last_skip=False, no_folding=False, unipage=False):
     """
-    将PDF的页面按照折叠方式两两合并为一页。
-    (修复了坐标偏移导致的空白页问题，以及尺寸不匹配导致的大小问题)
-    """
-    if not os.path.exists(input_pdf_path):
-        logger.error("输入文件 '%s' 不存在。", input_pdf_path)
-        return
+    计算一次折叠排版的页码顺序 (0-based)
 
-    if no_folding:
-        page_numbers = list[int](range(start_page, start_page+total_pages*2))
-    elif unipage:
-        page_numbers = generate_unipage_pages(start_page, int(total_pages/2))
-    else:
-        page_numbers = generate_fold_pages(
-            start_page, total_pages, reverse, last_skip)
-
-    # 页数下标调整 因为原来是从1开始的
-    # because PyPDF2 uses 0-based indexing
-    page_numbers = [page - 1 for page in page_numbers]
-
-    try:
-        reader = PdfReader(input_pdf_path)
-        writer = PdfWriter()
-
-        if max(page_numbers) > len(reader.pages):
-            logger.error("错误: 请求的页码 (%d) 超出了PDF的总页数 (%d)。",
-                         max(page_numbers), len(reader.pages))
-
-        for i in range(0, len(page_numbers), 2):
-            page1_num = page_numbers[i]
-            page2_num = page_numbers[i + 1]
-
-            # 获取页面对象，如果索引无效则为None（代表空白页）
-            p1 = reader.pages[page1_num] if 0 <= page1_num < len(
-                reader.pages) else None
-            p2 = reader.pages[page2_num] if 0 <= page2_num < len(
-                reader.pages) else None
-
-            # --- 1. 确定基准尺寸 ---
-            # 优先取左页尺寸，如果没有左页则取右页，都为None则跳过
-            ref_page = p1 if p1 else p2
-            if not ref_page:
-                continue
-
-            # 使用 cropbox 获取真实的可见区域尺寸 (解决部分页面看起来很小或留白过多的问题)
-            # float() 转换是为了防止 decimal 类型报错
-            base_w = float(ref_page.cropbox.width)
-            base_h = float(ref_page.cropbox.height)
+    :param start_page: 起始页码（1-based）
+    :param total_pages: 单面物理页数
+    :return: 0-based 页码列表, 每两个一组构成一张输出页 (-1 为空白)
+    """
+    return part_order(start_page, total_pages, reverse, last_skip, no_folding, unipage).tolist()
 
-            # 创建新的空白页：宽度 x 2，高度保持基准高度
-            new_page = writer.add_blank_page(width=base_w * 2, height=base_h)
 
-            # --- 2. 定义合并辅助函数 (包含坐标归一化和缩放) ---
-            def merge_page_content(target_page, source_page, x_offset, target_h):
-                if not source_page:
-                    return
+@functools.lru_cache(maxsize=64)
+def folding_plan(total_page, split_page_num, no_folding=False, unipage=False, source_pages=None):
+    """
+    整个文档的折叠排版计划 (按参数缓存, 返回的计划不要修改)
 
-                # 获取源页面的起始坐标 (解决内容跑偏/空白的关键)
-                src_x = float(source_page.cropbox.left)
-                src_y = float(source_page.cropbox.bottom)
-                src_w = float(source_page.cropbox.width)
-                src_h = float(source_page.cropbox.height)
+    :param total_page: 总页数（已补齐为4的整数倍）
+    :param split_page_num: 每部分的逻辑页数
+    :param source_pages: 补齐前的页数, 用于区分填充页
+    :return: ImpositionPlan
+    """
+    parts = folding_parts(total_page, split_page_num, unipage)
+    mode = "nofold" if no_folding else "unipage" if unipage else "fold"
+    plan = ImpositionPlan(parts_order(parts, no_folding, unipage), total_page, parts,
+                          source_pages=source_pages, mode=mode)
+    missing, duplicated = plan.check_coverage()
+    if missing or duplicated:
+        logger.warning("排版计划: %d 页未使用, %d 页重复 (split_page_num=%d)",
+                       missing, duplicated, split_page_num)
+    return plan
+
+
+def folding_output_path(file_name, output_path=None, part_index=None):
+    """折叠排版输出文件名, 与 process_pdf_for_folding 的命名保持一致"""
+    base = file_name if output_path is None else output_path
+    if part_index is None:
+        return base.replace(".pdf", "_modified.pdf")
+    return base.replace(".pdf", f"_modified_{part_index}.pdf")
+
+
+def impose_pages_for_folding(pages, page_numbers, writer=None, backend=None, geometry=None):
+    """
+    将页面按照 page_numbers 两两合并为一页, 返回全部结果页面的列表。
+    参数见 iter_sheets_for_folding。
+    """
+    return list(iter_sheets_for_folding(pages, page_numbers, writer, backend, geometry))
 
-                # 计算缩放比例：如果源页面高度与基准高度差异超过 1%，则进行缩放
-                scale_factor = 1.0
-                if abs(src_h - target_h) > target_h * 0.01:
-                    scale_factor = target_h / src_h
 
-                # 构建变换矩阵
-                # 1. translate(-src_x, -src_y): 将页面内容移回 (0,0) 原点 -> 解决空白页
-                # 2. scale(scale_factor): 缩放至匹配高度 -> 解决页面忽大忽小
-                # 3. translate(x_offset, 0): 移到目标位置 (左边还是右边)
+# 对折排版的网格: 左右两格, 格子与基准页面 (左页, 没有左页时为右页) 的 cropbox 同样大,
+# 高度差异超过 1% 的页面缩放到基准高度
+FOLDING_LAYOUT = NupLayout(2, 1, sheet="grow")
 
-                # 注意：pypdf 的变换顺序通常是从右向左应用，或者逻辑上的叠加
-                tf = Transformation().translate(tx=-src_x, ty=-src_y).scale(sx=scale_factor,
-                                                                            sy=scale_factor).translate(tx=x_offset, ty=0)
 
-                # 如果缩放导致宽度溢出半边，可以考虑居中 (这里暂不做复杂居中，默认靠左/靠中线)
-                # 简单的居中修正(可选):
-                # final_w = src_w * scale_factor
-                # center_adjust = (base_w - final_w) / 2
-                # tf = tf.translate(tx=center_adjust, ty=0)
+def iter_sheets_for_folding(pages, page_numbers, writer=None, backend=None, geometry=None):
+    """
+    将页面按照 page_numbers 两两合并为一页, 逐张生成 (流式输出时不需要保留全部结果)。
+    (修复了坐标偏移导致的空白页问题，以及尺寸不匹配导致的大小问题)
 
-                target_page.merge_transformed_page(source_page, tf)
+    由多联排版引擎 (nup.iter_nup_sheets) 以 FOLDING_LAYOUT 完成。
 
-            # --- 3. 执行合并 ---
+    :param pages: 源页面序列 (PageObject 或 FillerPage)
+    :param page_numbers: 0-based 页码序列 (folding_page_order 或 ImpositionPlan.slots),
+                         调用前已用 ImpositionPlan.validate 检查过
+    :param writer: 输出文档, 填充页和源页面的 XObject 在其中只注册一次
+    :param backend: 排版后端 xobject / merge, 默认 config.IMPOSITION_BACKEND
+    :param geometry: pages 的 PageGeometry, 默认在这里读取
+    :return: 新生成的页面 (生成器)
+    """
+    # merge 后端直接合并到输出页, 与原来的对折排版相同
+    sheets = timed_iter(iter_nup_sheets(pages, page_numbers, FOLDING_LAYOUT, writer, backend, geometry,
+                                        isolate=False), "merge", counter="sheets")
+    return iter_progress(iter_cancellable(sheets), "merge", len(page_numbers) // FOLDING_LAYOUT.per_sheet)
 
-            # 处理左页 (放在 x=0 处)
-            if p1:
-                try:
-                    merge_page_content(new_page, p1, 0, base_h)
-                except Exception as e:
-                    logger.warning("合并左页 %d 失败: %s", page1_num, e)
 
-            # 处理右页 (放在 x=base_w 处)
-            if p2:
-                try:
-                    merge_page_content(new_page, p2, base_w, base_h)
-                except Exception as e:
-                    logger.warning("合并右页 %d 失败: %s", page2_num, e)
+def merge_pages_for_folding(input_pdf_path, output_pdf_path, start_page, total_pages, reverse=False, last_skip=False, no_folding=False, unipage=False):
+    """
+    将PDF的页面按照折叠方式两两合并为一页。
+    (修复了坐标偏移导致的空白页问题，以及尺寸不匹配导致的大小问题)
+    """
+    if not os.path.exists(input_pdf_path):
+        logger.error("输入文件 '%s' 不存在。", input_pdf_path)
+        raise FileNotFoundError(input_pdf_path)
 
-        # 写入文件
-        with open(output_pdf_path, "wb") as output_file:
-            writer.write(output_file)
+    try:
+        source = open_pdf_source(input_pdf_path)
+        plan = ImpositionPlan(
+            part_order(start_page, total_pages, reverse, last_skip, no_folding, unipage),
+            source.page_count, [(start_page, total_pages)])
+        try:
+            plan.validate()
+        except ValueError as e:
+            # 在创建输出文件之前发现页码超出范围
+            logger.error("错误: %s", e)
+            raise
+
+        # 退出时写入文件 (流式输出时只剩 xref 和 trailer); 出错或取消时删除不完整的输出
+        with output_writer(output_pdf_path, source.size) as writer:
+            for sheet in iter_sheets_for_folding(source.pages, plan.slots, writer,
+                                                 geometry=source.geometry()):
+                with stage("write"):
+                    writer.add_page(sheet)
         logger.info("成功创建: '%s'", output_pdf_path)
 
     except Exception as e:
         import traceback
         logger.error("处理PDF错误: %s", e)
         logger.error(traceback.format_exc())
+        # 交给调用方 (如 batch_processor) 记录为失败
+        raise
+    finally:
+        discard_pdf_source(input_pdf_path)
 
 
 def get_pdf_total_pages(file_name):
-    """获取PDF文件的总页数"""
-    with open(file_name, "rb") as f:
-        reader = PdfReader(f)
-        return len(reader.pages)
+    """获取PDF文件的总页数 (与之后的处理共用同一个 PdfSource)"""
+    return open_pdf_source(file_name).page_count
 
 
 def add_blank_pages_to_pdf(input_pdf_path, output_pdf_path, num_blank_pages):
     """向PDF添加指定数量的空白页"""
-    reader = PdfReader(input_pdf_path)
+    source = open_pdf_source(input_pdf_path)
     writer = PdfWriter()
 
-    source_page_count = len(reader.pages)
-
-    # 复制所有现有页面 剥离最后一页 确保变换后最后一页仍然是最后一页
-    for page_num in range(source_page_count-1):
-        writer.add_page(reader.pages[page_num])
-
-    # 获取页面尺寸
-    if len(reader.pages) > 0:
-        page_width = reader.pages[0].cropbox.width         # pylint: disable=E1101
-        page_height = reader.pages[0].cropbox.height       # pylint: disable=E1101
-    else:
-        page_width = 595  # A4宽度
-        page_height = 842  # A4高度
-
-    # 添加空白页并在其中添加居中文字
-    for _ in range(num_blank_pages):
-        # 创建一个内存中的PDF文件，用于生成包含文本的空白页
-        packet = BytesIO()
-
-        # 创建一个Canvas对象，设置页面大小
-        c = canvas.Canvas(packet, pagesize=(page_width, page_height))
+    for page in pad_pages(source.pages, num_blank_pages):
+        writer.add_page(as_real_page(page, writer))
 
-        # 在空白页上添加居中文字
-        text = "Page for blank."
-
-        # 设置字体和大小
-        c.setFont("Helvetica", 12)
+    # 写入新文件
+    with open(output_pdf_path, "wb") as output_file:
+        writer.write(output_file)
 
-        # 计算文本宽度并居中
-        text_width = c.stringWidth(text, "Helvetica", 12)
-        text_x = (page_width - text_width) / 2
-        text_y = page_height / 2
+    return output_pdf_path
 
-        # 添加文本
-        c.drawString(text_x, text_y, text)
 
-        # 保存Canvas
-        c.save()
+@timed("temp_io")
+def pages_to_pdf_bytes(pages, writer=None):
+    """把一组页面序列化为一个独立的小PDF"""
+    writer = writer or PdfWriter()
+    for page in pages:
+        writer.add_page(as_real_page(page, writer))
+    buffer = BytesIO()
+    writer.write(buffer)
+    count("temp_bytes", buffer.tell())
+    return buffer.getvalue()
 
-        # 重置 BytesIO 指针到开头
-        packet.seek(0)
 
-        # 读取生成的PDF
-        text_pdf = PdfReader(packet)
-        text_page = text_pdf.pages[0]
+def impose_job_bytes(job_bytes, job_slots, fillers=None, cancel=None):
+    """
+    工作进程: 对一个任务 (一个或多个连续分段) 做折叠排版
 
-        # 将包含文本的页面添加到 writer
-        writer.add_page(text_page)
+    :param job_bytes: 只包含本任务真实页面的PDF数据
+    :param job_slots: 本任务的页序 (ImpositionPlan.job_slots), 页码相对于任务起始页
+    :param fillers: {任务内位置: FillerPage}, 虚拟填充页不经过序列化
+    :param cancel: 提交方的 CancelToken, 请求取消后在下一张停止
+    :return: 排版结果PDF数据
+    """
+    with cancel_scope(cancel):
+        with stage("parse"):
+            pages = list(PdfReader(BytesIO(job_bytes)).pages)
+        for index, filler in sorted((fillers or {}).items()):
+            pages.insert(index, filler)
+        writer = PdfWriter()
+        return pages_to_pdf_bytes(impose_pages_for_folding(pages, job_slots, writer), writer)
 
-    # 添加最后一页
-    if source_page_count > 0:
-        writer.add_page(reader.pages[-1])
-    # 写入新文件
-    with open(output_pdf_path, "wb") as output_file:
-        writer.write(output_file)
 
-    return output_pdf_path
+def impose_chunked(pages, plan, imposition, writer=None, checkpoint=None):
+    """
+    按分段决策和排版计划做折叠排版
+
+    输入只在调用方解析一次; 并行时每个工作进程只拿到自己任务的页面
+    (预先切好的小PDF) 和计划中对应的一段页序, 结果按任务顺序逐张生成,
+    调用方可以边生成边写出 (流式输出时不需要保留全部结果)。
+    任务提交到共享进程池 (worker_pool), 可以与其他文件的任务交错执行。
+
+    请求取消后不再提交新的任务, 工作进程中的任务在下一张停止。
+    某个任务出错时等待其余已开始的任务完成, 使它们都能保存到检查点。
+
+    :param pages: 全部源页面 (已补齐)
+    :param plan: chunking.plan_chunks 的返回值
+    :param imposition: 已检查过的 ImpositionPlan
+    :param checkpoint: checkpoint.open_checkpoint 的返回值; 已完成的分段直接读取,
+                       新完成的分段立即保存
+    :return: 按顺序排列的排版结果页面 (生成器, 共 imposition.sheet_count 张)
+    """
+    if not plan.parallel:
+        yield from iter_sheets_for_folding(pages, imposition.slots, writer)
+        return
 
+    job_sheets = imposition.job_sheets(plan.jobs)
+    results = [None] * len(plan.jobs)
+    done_sheets = 0
+    if checkpoint is not None:
+        for index in checkpoint.done:
+            results[index] = checkpoint.load(index)
+            if results[index] is not None:
+                done_sheets += job_sheets[index][1]
+
+    with worker_pool(plan.workers) as pool:
+        pending = {}
+        for index, (job, (first_sheet, sheet_count)) in enumerate(zip(plan.jobs, job_sheets)):
+            if results[index] is not None:
+                continue
+            if cancel_requested():
+                # 已提交的任务在下面取消, 已完成的照常保存到检查点
+                break
+            job_start = job[0][0] - 1
+            job_pages = sum(n * 2 for _, n in job)
+            job_slots = imposition.job_slots(first_sheet, sheet_count, page_offset=job_start)
+            job_slice = pages[job_start:job_start + job_pages]
+            fillers = {i: page for i, page in enumerate(job_slice) if isinstance(page, FillerPage)}
+            real_pages = [page for page in job_slice if not isinstance(page, FillerPage)]
+            future = submit_recorded(pool, impose_job_bytes, pages_to_pdf_bytes(real_pages),
+                                     job_slots, fillers, current_token())
+            pending[future] = index
+        count("chunks", len(pending))
+
+        # 按完成顺序收集并保存到检查点, 最后按任务顺序拼接
+        report_progress("merge", done_sheets, imposition.sheet_count)
+        error = None
+        while pending:
+            if error is None and cancel_requested():
+                error = JobCancelled()
+                for future in pending:
+                    future.cancel()
+            with stage("pool_wait"):
+                finished, _ = concurrent.futures.wait(
+                    pending, timeout=CANCEL_POLL_INTERVAL,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                index = pending.pop(future)
+                if future.cancelled():
+                    continue
+                try:
+                    results[index] = recorded_result(future)
+                except (Exception, JobCancelled) as e:  # pylint: disable=W0718
+                    if error is None:
+                        error = e
+                        # 未开始的任务不再处理, 已开始的继续完成
+                        for other in pending:
+                            other.cancel()
+                    continue
+                sheet_count = job_sheets[index][1]
+                if checkpoint is not None:
+                    checkpoint.save(index, results[index], sheet_count)
+                done_sheets += sheet_count
+                # 每个分段一条进度, 不按页输出
+                logger.info("分段 %d/%d 完成, 共 %d 张",
+                            sum(data is not None for data in results), len(results), done_sheets)
+                report_progress("merge", done_sheets, imposition.sheet_count)
+        if error is not None:
+            raise error
+
+    for index, data in enumerate(results):
+        with stage("parse"):
+            sheets = list(PdfReader(BytesIO(data)).pages)
+        # 已生成的分段不再保留
+        results[index] = None
+        yield from sheets
+
+
+def plan_folding(pages_or_count, split_page_num, no_folding=False, unipage=False, source_bytes=0):
+    """
+    计算折叠排版的分段决策
 
-def process_single_part(file_name, output_filename, start_page, one_side_phy_page_num, last_skip, no_folding):
-    """处理单个部分的PDF合并"""
-    merge_pages_for_folding(file_name, output_filename, start_page, one_side_phy_page_num,
-                            last_skip=last_skip, no_folding=no_folding, unipage=False)
+    :param pages_or_count: 总页数 (已补齐为4的整数倍)
+    :param source_bytes: 源文件大小, 用于估算平均每页字节数
+    :return: ChunkPlan
+    """
+    total_page = pages_or_count if isinstance(pages_or_count, int) else len(pages_or_count)
+    parts = folding_parts(total_page, split_page_num, unipage)
+    if unipage:
+        # unipage 只有一个分段, 不并行
+        return plan_chunks(total_page, parts, workers=1)
+    return plan_chunks(total_page, parts, no_folding,
+                       avg_page_bytes=source_bytes / max(total_page, 1))
 
 
 def process_pdf_for_folding(file_name="", split_page_num=80, output_path: str | None = None, no_folding=False, unipage=False):
@@ -294,76 +381,51 @@ def process_pdf_for_folding(file_name="", split_page_num=80, output_path: str |
     # 检查文件是否存在
     if not os.path.exists(file_name):
         logger.error("文件 '%s' 不存在。", file_name)
-        return
-
-    # get total page
-    total_page = get_pdf_total_pages(file_name)
-    logger.info("总页数: %d", total_page)
-
-    # 检查是否为4的整数倍，如果不是则添加空白页
-    if total_page % 4 != 0:
-        blank_pages_needed = 4 - (total_page % 4)
-        logger.info("总页数不是4的整数倍，需要添加 %d 个空白页", blank_pages_needed)
-
-        # 创建临时文件名
-        temp_file = file_name.replace(".pdf", "_temp_with_blanks.pdf")
-
-        # 添加空白页
-        add_blank_pages_to_pdf(file_name, temp_file, blank_pages_needed)
-
-        # 递归调用process_pdf_for_folding处理新文件
-        logger.info("使用添加空白页后的文件递归处理...")
-        process_pdf_for_folding(temp_file, split_page_num,
-                                output_path, no_folding, unipage)
+        raise FileNotFoundError(file_name)
 
-        # 删除临时文件（可选，或者保留供用户检查）
-        try:
-            os.remove(temp_file)
-            logger.info("已删除临时文件")
-        except OSError as e:
-            logger.warning("警告：无法删除临时文件，请手动删除：%s, errinfo: %s", temp_file, e)
-        return
-
-    if output_path is None:
-        modified_filename = file_name.replace(".pdf", "_modified_(index).pdf")
-    else:
-        modified_filename = output_path.replace(
-            ".pdf", "_modified_(index).pdf")
-
-    if total_page > split_page_num and not unipage:
-        with concurrent.futures.ProcessPoolExecutor(max_workers=(os.cpu_count() if os.cpu_count() else 1)) as executor:
-            futures = []
-            for i in range(1, total_page + 1, split_page_num):
-                end_page = min(i + split_page_num, total_page)
-                page_num = end_page - i
-                part_index = (i - 1) // split_page_num + 1
-
-                one_side_phy_page_num = int(
-                    page_num/2) if page_num % 2 == 0 else int(page_num/2)+1
-                output_filename = modified_filename.replace(
-                    "(index)", f"{part_index}")
-                future = executor.submit(
-                    process_single_part, file_name, output_filename, i, one_side_phy_page_num, False, no_folding)
-                futures.append(future)
-
-            # 等待所有任务完成
-            for future in concurrent.futures.as_completed(futures):
-                future.result()
-    else:
-        # 修复参数传递
-        last_skip = False
-        one_side_phy_page_num = int(total_page/2) + \
-            1 if last_skip else int(total_page/2)
-        merge_pages_for_folding(
-            file_name,
-            modified_filename.replace("_(index)", ""),
-            1,
-            one_side_phy_page_num,
-            last_skip=False,
-            no_folding=no_folding,
-            unipage=unipage
-        )
+    try:
+        source = open_pdf_source(file_name)
+        pages = source.pages
+        total_page = len(pages)
+        logger.info("总页数: %d", total_page)
+
+        # 检查是否为4的整数倍，如果不是则在内存中添加虚拟填充页
+        if total_page % 4 != 0:
+            blank_pages_needed = 4 - (total_page % 4)
+            logger.info("总页数不是4的整数倍，需要添加 %d 个空白页", blank_pages_needed)
+            pages = pad_pages(pages, blank_pages_needed)
+            total_page = len(pages)
+
+        # 先算好并检查完整的排版计划, 再开始处理页面
+        imposition = folding_plan(total_page, split_page_num, no_folding, unipage,
+                                  source_pages=source.page_count)
+        imposition.validate(total_page)
+        plan = plan_folding(total_page, split_page_num, no_folding, unipage,
+                            source_bytes=source.size)
+        output_filename = folding_output_path(file_name, output_path)
+        # 并行时完成的分段保存到检查点, 中断后重新运行只处理缺少的分段
+        checkpoint = open_checkpoint(
+            file_name, f"fold:{split_page_num}:{no_folding}:{unipage}", plan, imposition)
+
+        # 大文件流式输出, 排好一张写出一张; 出错或取消时删除不完整的输出
+        with output_writer(output_filename, source.size) as writer:
+            sheets = impose_chunked(pages, plan, imposition, writer=writer, checkpoint=checkpoint)
+            for sheet in iter_progress(iter_cancellable(sheets), "write", imposition.sheet_count):
+                with stage("write"):
+                    writer.add_page(sheet)
+        if checkpoint is not None:
+            checkpoint.finish()
+        logger.info("成功创建: '%s'", output_filename)
 
+    except Exception as e:
+        import traceback
+        logger.error("处理PDF错误: %s", e)
+        logger.error(traceback.format_exc())
+        # 交给调用方 (如 batch_processor) 记录为失败
+        raise
+    finally:
+        # 成功、失败或取消后都关闭输入, 不占用文件 (Windows 上才能归档或删除)
+        discard_pdf_source(file_name)
 
 if __name__ == "__main__":
     import sys
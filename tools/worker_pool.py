@@ -0,0 +1,160 @@
+"""
+共享工作进程池 (Shared worker pool)
+
+折叠排版原来每个文件都新建并关闭一个 ProcessPoolExecutor, 每个工作进程都要
+重新导入 pypdf、reportlab 和 tools。这里改为由批处理、监视守护进程或任务服务
+持有一个长期运行的进程池:
+
+- 工作进程启动时预先导入处理模块并注册字体 (warm_worker)
+- 工作进程的日志记录和进度事件发回主进程, 取消标记与主进程共享
+- 同一次运行中的所有文件、所有命令共用这个进程池
+- 多个文件的折叠任务 (chunk) 可以同时提交, 在进程池中交错执行
+
+没有持有者时 (直接调用 tools 中的函数), worker_pool() 退回为临时进程池,
+用完即关闭, 行为与原来相同。
+
+用法::
+
+    with shared_worker_pool(workers=8, initializer=..., initargs=...):
+        ...  # 这里的 impose_chunked 都提交到同一个进程池
+"""
+
+import os
+import logging
+import threading
+import contextlib
+import concurrent.futures
+
+import config
+from logger import attach_worker_logging, worker_log_queue
+from .cancel import attach_worker_cancel_flags, worker_cancel_flags
+from .progress import attach_worker_progress, worker_progress_queue
+
+logger = logging.getLogger(__name__)
+
+
+def warm_worker():
+    """
+    预热工作进程: 导入处理模块、注册字体
+
+    放在进程池的 initializer 中, 之后的任务不再承担导入开销。
+    """
+    # pylint: disable=C0415,W0611
+    import pypdf  # noqa: F401
+    import reportlab.pdfgen.canvas  # noqa: F401
+    from . import pipeline, nup, four_paper  # noqa: F401
+    from .fonts import FALLBACK_FONT, glyph_widths, page_number_font, subset_font
+    font_name = page_number_font()
+    glyph_widths(font_name)
+    if font_name != FALLBACK_FONT:
+        subset_font(font_name)
+    try:
+        import custom_module  # noqa: F401
+    except ImportError:
+        # 作为库使用时没有 custom_module
+        pass
+
+
+def _init_worker(initializer, initargs, log_queue, progress_queue, cancel_flags):
+    if initializer is not None:
+        initializer(*initargs)
+    # 日志记录和进度事件发回主进程 (见 logger.py / progress.py)
+    attach_worker_logging(log_queue)
+    attach_worker_progress(progress_queue)
+    # 主进程请求取消时, 工作进程中的处理也会停止 (见 cancel.py)
+    attach_worker_cancel_flags(cancel_flags)
+    # 工作进程内不再创建进程池, 折叠任务只由持有者提交
+    config.CHUNK_WORKERS = 1
+    warm_worker()
+
+
+def resolve_pool_size(jobs=1):
+    """
+    进程池大小: config.CHUNK_WORKERS (未设置时为CPU核数), 至少为同时处理的文件数
+    """
+    workers = config.CHUNK_WORKERS or os.cpu_count() or 1
+    return max(int(workers), int(jobs))
+
+
+class WorkerPool:
+    """预热的进程池, 可以同时接收多个文件的任务"""
+
+    def __init__(self, workers=None, initializer=None, initargs=(), max_tasks_per_child=None):
+        """
+        :param workers: 进程数, 默认 resolve_pool_size()
+        :param initializer: 额外的初始化函数 (如同步配置), 在预热之前调用
+        :param max_tasks_per_child: 每个进程处理多少个任务后重启, None 为不重启
+        """
+        self.workers = workers or resolve_pool_size()
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(initializer, initargs, worker_log_queue(), worker_progress_queue(),
+                      worker_cancel_flags()),
+            max_tasks_per_child=max_tasks_per_child)
+        self.submitted = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            self.submitted += 1
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def warm_up(self):
+        """提前启动全部工作进程, 不等第一个任务到达"""
+        futures = [self.executor.submit(os.getpid) for _ in range(self.workers)]
+        concurrent.futures.wait(futures)
+
+    def close(self, wait=True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# 当前持有者提供的共享进程池
+_shared_pool = None
+
+
+def get_shared_worker_pool():
+    """当前的共享进程池, 没有持有者时为 None"""
+    return _shared_pool
+
+
+@contextlib.contextmanager
+def shared_worker_pool(workers=None, initializer=None, initargs=(), max_tasks_per_child=None,
+                       warm=True):
+    """
+    创建并发布共享进程池, 退出时关闭
+
+    :param warm: 是否立即启动并预热全部工作进程
+    """
+    global _shared_pool  # pylint: disable=W0603
+    pool = WorkerPool(workers, initializer, initargs, max_tasks_per_child)
+    previous, _shared_pool = _shared_pool, pool
+    logger.info("Started shared worker pool with %d processes", pool.workers)
+    try:
+        if warm:
+            pool.warm_up()
+        yield pool
+    finally:
+        _shared_pool = previous
+        pool.close()
+        logger.debug("Shared worker pool closed after %d tasks", pool.submitted)
+
+
+@contextlib.contextmanager
+def worker_pool(workers):
+    """
+    给一次折叠排版使用的进程池
+
+    有共享进程池时直接使用 (不关闭), 否则创建一个 workers 个进程的临时进程池。
+    """
+    if _shared_pool is not None:
+        yield _shared_pool
+        return
+    with WorkerPool(workers) as pool:
+        yield pool
@@ -0,0 +1,175 @@
+"""
+Form XObject 辅助函数
+
+把一段绘图指令 (或一整页源页面) 包装成 Form XObject, 然后在页面上用
+``cm`` + ``Do`` 放置。同一个 XObject 注册到输出文档 (PdfWriter) 后,
+多个页面可以引用同一个对象, 输出中只保存一份内容。
+
+排版后端 (config.IMPOSITION_BACKEND):
+    xobject - 每个源页面只包装一次, 之后每次放置只增加一条 Do 指令
+    merge   - 原来的 merge_transformed_page, 复制并改写源页面的内容流
+"""
+
+import weakref
+
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    EncodedStreamObject,
+    FloatObject,
+    NameObject,
+)
+
+import config
+from .streaming_writer import import_object, release_source_object
+
+IMPOSITION_BACKENDS = ("xobject", "merge")
+
+# 源页面 XObject 的资源名前缀
+PAGE_XOBJECT_PREFIX = "/TxPg"
+
+
+def _fmt(value):
+    return f"{value:.4f}".rstrip("0").rstrip(".") or "0"
+
+
+def form_xobject(content, bbox, resources=None):
+    """
+    创建一个 Form XObject
+
+    :param content: 绘图指令 (bytes)
+    :param bbox: (left, bottom, right, top)
+    :param resources: 绘图指令使用的资源字典
+    :return: StreamObject
+    """
+    stream = DecodedStreamObject()
+    stream.set_data(content)
+    stream.update({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Form"),
+        NameObject("/BBox"): ArrayObject(FloatObject(v) for v in bbox),
+        NameObject("/Resources"): resources if resources is not None else DictionaryObject(),
+    })
+    return stream
+
+
+def register_object(obj, writer=None):
+    """注册为输出文档中的间接对象, 没有 writer 时原样返回 (每页各自复制一份)"""
+    if writer is None:
+        return obj
+    return writer._add_object(obj)  # pylint: disable=W0212
+
+
+def place_xobject(page, name, xobject, matrix):
+    """
+    在页面上放置一个 Form XObject
+
+    :param page: 目标页面
+    :param name: 资源名, 如 "/TxFill"
+    :param xobject: XObject (或其间接引用)
+    :param matrix: 变换矩阵 (a, b, c, d, e, f)
+    """
+    if NameObject("/Resources") not in page:
+        page[NameObject("/Resources")] = DictionaryObject()
+    resources = page["/Resources"].get_object()
+    if NameObject("/XObject") not in resources:
+        resources[NameObject("/XObject")] = DictionaryObject()
+    resources["/XObject"].get_object()[NameObject(name)] = xobject
+
+    operators = f"q {' '.join(_fmt(v) for v in matrix)} cm {name} Do Q\n".encode()
+    contents = page.get_contents()
+    stream = DecodedStreamObject()
+    stream.set_data((contents.get_data() + b"\n" if contents is not None else b"") + operators)
+    page[NameObject("/Contents")] = stream
+
+
+def resolve_backend(backend=None):
+    """返回排版后端名称, None 时使用 config.IMPOSITION_BACKEND"""
+    backend = backend or config.IMPOSITION_BACKEND
+    if backend not in IMPOSITION_BACKENDS:
+        raise ValueError(f"Unknown imposition backend: {backend}")
+    return backend
+
+
+def page_to_xobject(page, writer=None):
+    """
+    把一个源页面包装为 Form XObject
+
+    只有一个内容流时直接复用其压缩后的数据, 不解压也不重新压缩;
+    多个内容流 (如加过页码的页面) 拼接后用 FlateDecode 压缩。
+    BBox 使用 mediabox, 与 merge_transformed_page 一样不裁剪到 cropbox。
+    """
+    contents_ref = page.get("/Contents")
+    contents = contents_ref.get_object() if contents_ref is not None else None
+    if isinstance(contents, EncodedStreamObject):
+        stream = EncodedStreamObject()
+        stream._data = contents._data  # pylint: disable=W0212
+        for key in ("/Filter", "/DecodeParms"):
+            if key in contents:
+                stream[NameObject(key)] = contents[key]
+        release_source_object(contents_ref, writer)
+    else:
+        stream = DecodedStreamObject()
+        page_contents = page.get_contents() if contents is not None else None
+        stream.set_data(page_contents.get_data() if page_contents is not None else b"")
+        stream = stream.flate_encode()
+
+    resources = page.get("/Resources")
+    if resources is None:
+        resources = DictionaryObject()
+    elif writer is not None:
+        # 复制到输出文档, 同一来源的对象只复制一次
+        resources = import_object(resources, writer)
+
+    mediabox = page.mediabox
+    stream.update({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Form"),
+        NameObject("/BBox"): ArrayObject(FloatObject(v) for v in
+                                         (mediabox.left, mediabox.bottom, mediabox.right, mediabox.top)),
+        NameObject("/Resources"): resources,
+    })
+    return register_object(stream, writer)
+
+
+class PageXObjects:
+    """
+    源页面 -> Form XObject 的缓存
+
+    一个实例对应一个输出文档。同一个源页面无论放置多少次、出现在多少种版式中,
+    都引用同一个 XObject。
+    """
+
+    def __init__(self, writer=None):
+        self.writer = writer
+        # id(page) -> (page, 资源名, XObject)
+        self._entries = {}
+
+    def get(self, page):
+        """返回 (资源名, XObject), 第一次遇到该页面时包装"""
+        entry = self._entries.get(id(page))
+        if entry is None:
+            name = f"{PAGE_XOBJECT_PREFIX}{len(self._entries)}"
+            # 保留页面引用, 避免 id 被其他对象复用
+            entry = (page, name, page_to_xobject(page, self.writer))
+            self._entries[id(page)] = entry
+        return entry[1], entry[2]
+
+    def place(self, target_page, source_page, matrix):
+        """把源页面按变换矩阵放到目标页面上"""
+        name, xobject = self.get(source_page)
+        place_xobject(target_page, name, xobject, matrix)
+
+
+_page_xobjects = weakref.WeakKeyDictionary()
+
+
+def page_xobjects(writer=None):
+    """获取输出文档对应的 XObject 缓存 (没有 writer 时每次新建, 不共享)"""
+    if writer is None:
+        return PageXObjects()
+    cache = _page_xobjects.get(writer)
+    if cache is None:
+        cache = _page_xobjects[writer] = PageXObjects(writer)
+    return cache
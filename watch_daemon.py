@@ -0,0 +1,286 @@
+"""
+监视文件夹守护进程 (Watch-folder daemon)
+
+常驻运行, 监视 input/ 目录, 有新的 PDF 到达时立即用预热好的共享进程池处理
+(见 tools/worker_pool.py, 大文件的折叠任务与其他文件交错执行),
+处理结果原子地写入 output/ (先写到 output/.partial/, 完成后 os.replace)。
+
+命令的选择规则 (按顺序):
+    1. 子文件夹名: input/suit_normal_envelop/a.pdf -> suit_normal_envelop
+    2. config.WATCH_RULES 中的文件名规则 (fnmatch 模式 -> 命令)
+    3. config.WATCH_DEFAULT_COMMAND (为 None 时忽略该文件)
+
+Linux 上使用 inotify 监听文件写入完成事件, 其他平台回退为定时轮询,
+轮询时只处理大小和修改时间在两次扫描之间保持不变的文件。
+
+用法::
+
+    python batch_processor.py watch
+    python watch_daemon.py
+"""
+
+import os
+import sys
+import time
+import errno
+import fnmatch
+import select
+import struct
+import ctypes
+import ctypes.util
+import concurrent.futures
+
+import config
+from logger import default_logger as logger
+from result_cache import ResultCache, output_candidates
+from batch_processor import (
+    COMMANDS,
+    FileResult,
+    batch_worker_pool,
+    get_folders,
+    get_output_filename,
+    report_file_result,
+    run_pdf_job,
+)
+
+# inotify 事件掩码
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_ISDIR = 0x40000000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """定时扫描目录, 返回已经写完 (两次扫描间未变化) 的 PDF"""
+
+    def __init__(self, folder, interval=None):
+        self.folder = folder
+        self.interval = config.WATCH_POLL_INTERVAL if interval is None else interval
+        self._last_seen = {}
+        self._reported = {}
+
+    def _scan(self):
+        found = {}
+        for root, _, files in os.walk(self.folder):
+            for file in files:
+                if file.lower().endswith(".pdf"):
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    found[path] = (stat.st_size, stat.st_mtime_ns)
+        return found
+
+    def poll(self, timeout=None):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self._scan()
+        ready = []
+        for path, stamp in current.items():
+            if self._last_seen.get(path) == stamp and self._reported.get(path) != stamp:
+                self._reported[path] = stamp
+                ready.append(path)
+        self._last_seen = current
+        return ready
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """基于 Linux inotify 的监视器, 文件关闭写入或移动进来时返回"""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        for root, _, _ in os.walk(folder):
+            self._add_watch(root)
+
+    def _add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {path}")
+        self.watches[wd] = path
+
+    def poll(self, timeout=None):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+
+        ready = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            path = os.path.join(self.watches.get(wd, self.folder), name)
+            if mask & IN_ISDIR:
+                # 新建的子文件夹 (新命令) 也要监视
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_watch(path)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and name.lower().endswith(".pdf"):
+                ready.append(path)
+        return ready
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_watcher(folder):
+    """Linux 上优先使用 inotify, 失败时回退为轮询"""
+    if sys.platform.startswith("linux") and not config.WATCH_FORCE_POLLING:
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError) as e:
+            logger.warning("inotify unavailable, falling back to polling: %s", e)
+    return PollingWatcher(folder)
+
+
+def command_for(path, input_folder):
+    """根据子文件夹或文件名规则决定处理命令"""
+    relative = os.path.relpath(path, input_folder)
+    parts = relative.split(os.sep)
+    if len(parts) > 1 and parts[0] in COMMANDS:
+        return parts[0]
+    for pattern, command in config.WATCH_RULES:
+        if fnmatch.fnmatch(parts[-1].lower(), pattern.lower()):
+            return command
+    return config.WATCH_DEFAULT_COMMAND
+
+
+class WatchDaemon:
+    """监视 input/ 并用常驻的共享进程池处理新文件"""
+
+    def __init__(self, input_folder=None, output_folder=None, jobs=None):
+        default_input, default_output = get_folders()
+        self.input_folder = input_folder or default_input
+        self.output_folder = output_folder or default_output
+        self.partial_folder = os.path.join(self.output_folder, ".partial")
+        jobs = config.BATCH_JOBS if jobs is None else jobs
+        self.jobs = os.cpu_count() or 1 if jobs == "auto" else max(1, int(jobs))
+        self.cache = ResultCache() if config.RESULT_CACHE_ENABLED else None
+        self.pending = {}
+        # 已提交的文件: 路径 -> (大小, 修改时间), 同一版本的文件只处理一次
+        self.submitted = {}
+        self.done_count = 0
+
+    def output_path_for(self, path):
+        return os.path.join(self.output_folder, get_output_filename(os.path.basename(path), "custom"))
+
+    def submit(self, executor, path):
+        """提交一个文件; 缓存命中时直接写出结果"""
+        command = command_for(path, self.input_folder)
+        if command is None:
+            logger.debug("No command for %s, ignored", path)
+            return
+        if path in self.pending.values():
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            logger.debug("%s disappeared before processing", path)
+            return
+        # 启动时已有的文件, 之后还会被监视器 (特别是轮询) 再报告一次
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if self.submitted.get(path) == stamp:
+            return
+        self.submitted[path] = stamp
+
+        output_path = self.output_path_for(path)
+        if self.cache is not None:
+            key = self.cache.make_key(path, command)
+            if self.cache.get(key, output_path):
+                self.cache.save()
+                self.done_count += 1
+                report_file_result(FileResult(os.path.basename(path), True, 0.0, cached=True),
+                                   self.done_count, self.done_count + len(self.pending))
+                return
+
+        logger.info("Queued %s -> %s", os.path.basename(path), command)
+        partial_path = os.path.join(self.partial_folder, os.path.basename(output_path))
+        future = executor.submit(run_pdf_job, path, partial_path, COMMANDS[command])
+        future.job = (path, command, output_path, partial_path, time.time())
+        self.pending[future] = path
+
+    def finish(self, future):
+        """把完成的结果原子地移动到 output/"""
+        path, command, output_path, partial_path, started = future.job
+        del self.pending[future]
+        try:
+            result = future.result()
+        except Exception as e:  # pylint: disable=W0718
+            result = FileResult(os.path.basename(path), False, 0.0, str(e))
+
+        if result.ok:
+            finals = output_candidates(output_path)
+            for suffix, partial in output_candidates(partial_path).items():
+                if os.path.exists(partial):
+                    os.replace(partial, finals[suffix])
+            if self.cache is not None:
+                self.cache.put(self.cache.make_key(path, command), output_path, since=started)
+                self.cache.save()
+
+        self.done_count += 1
+        report_file_result(result, self.done_count, self.done_count + len(self.pending))
+
+    def existing_files(self):
+        """启动时 input/ 中已有的文件"""
+        for root, _, files in os.walk(self.input_folder):
+            for file in sorted(files):
+                if file.lower().endswith(".pdf"):
+                    yield os.path.join(root, file)
+
+    def run(self, stop_after=None):
+        """
+        运行守护进程, 直到 Ctrl+C
+
+        :param stop_after: 仅用于调试, 运行指定秒数后退出
+        """
+        os.makedirs(self.input_folder, exist_ok=True)
+        os.makedirs(self.partial_folder, exist_ok=True)
+        deadline = time.time() + stop_after if stop_after else None
+
+        watcher = create_watcher(self.input_folder)
+        logger.info("Watching %s with %s, %d workers", self.input_folder,
+                    type(watcher).__name__, self.jobs)
+        try:
+            # 每个处理中的文件占用一个线程, 实际工作在共享进程池中完成
+            with batch_worker_pool(self.jobs), \
+                    concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                for path in self.existing_files():
+                    self.submit(executor, path)
+                while deadline is None or time.time() < deadline:
+                    for path in watcher.poll(timeout=0.5):
+                        self.submit(executor, path)
+                    for future in [f for f in self.pending if f.done()]:
+                        self.finish(future)
+                for future in list(self.pending):
+                    future.result()
+                    self.finish(future)
+        except KeyboardInterrupt:
+            logger.info("Stopping watch daemon.")
+        finally:
+            watcher.close()
+
+
+def run_daemon():
+    """命令行入口"""
+    WatchDaemon().run()
+
+
+if __name__ == "__main__":
+    run_daemon()